@@ -0,0 +1,76 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Shared utilities for the unit tests
+"""
+
+import asyncio
+import importlib
+import unittest
+
+
+def run_async(coro):
+    """
+    Run a coroutine to completion on a fresh event loop, cancelling any tasks
+    it leaves behind before the loop is closed
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        all_tasks = getattr(asyncio, 'all_tasks', None) or asyncio.Task.all_tasks
+        pending = [task for task in all_tasks(loop) if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def optional_import(name: str):
+    """
+    Import a module which depends on packages that may not be installed
+
+    Returns:
+        the module, or None if it could not be imported
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def requires(module, description: str):
+    """
+    Skip a test case when a module imported by :func:`optional_import` is unavailable
+    """
+    return unittest.skipIf(
+        module is None, '{} dependencies are not installed'.format(description))
+
+
+def service_stub(cls, **attrs):
+    """
+    Create an instance of a service class without running its constructor, so that
+    individual methods can be tested with only the attributes they use. Attributes
+    may also replace methods of the class
+    """
+    instance = cls.__new__(cls)
+    instance.__dict__.update(attrs)
+    return instance
@@ -0,0 +1,85 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import tempfile
+import unittest
+
+from vonx.services.artifacts import LedgerArtifactCache
+
+
+class TestLedgerArtifactCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = self._tmp.name
+        self.genesis_path = os.path.join(self.path, 'genesis')
+        with open(self.genesis_path, 'w') as genesis_file:
+            genesis_file.write('{"txn": 1}\n')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def cache(self, name=None):
+        return LedgerArtifactCache(os.path.join(self.path, 'cache'), self.genesis_path, name)
+
+    def test_save_load(self):
+        cache = self.cache()
+        self.assertFalse(cache.load())
+        cache.set_nym('did', {'did': 'did', 'verkey': 'key'})
+        self.assertTrue(cache.dirty)
+        cache.save()
+        self.assertFalse(cache.dirty)
+
+        cache = self.cache()
+        self.assertTrue(cache.load())
+        self.assertEqual(cache.get_nym('did'), {'did': 'did', 'verkey': 'key'})
+
+    def test_snapshot(self):
+        cache = self.cache()
+        cache.set_schema('did', 'schema', '1.0', {'id': 1})
+        data = cache.snapshot()
+        self.assertFalse(cache.dirty)
+        # changes made while a snapshot is being written are saved by the next write
+        cache.set_schema('did', 'schema', '2.0', {'id': 2})
+        self.assertTrue(cache.dirty)
+        cache.write(data)
+
+        loaded = self.cache()
+        loaded.load()
+        self.assertEqual(loaded.get_schema('did', 'schema', '1.0'), {'id': 1})
+        self.assertIsNone(loaded.get_schema('did', 'schema', '2.0'))
+        self.assertEqual(os.listdir(os.path.join(self.path, 'cache')), [loaded.path.name])
+
+    def test_worker_files(self):
+        first = self.cache('indy-ledger-1')
+        second = self.cache('indy-ledger-2')
+        self.assertNotEqual(first.path, second.path)
+        first.set_cred_def('did', 'schema', '1.0', {'id': 1})
+        second.set_cred_def('did', 'other', '1.0', {'id': 2})
+        first.save()
+        second.save()
+
+        # each worker keeps the artifacts of its own issuers
+        first = self.cache('indy-ledger-1')
+        first.load()
+        self.assertEqual(first.get_cred_def('did', 'schema', '1.0'), {'id': 1})
+        self.assertIsNone(first.get_cred_def('did', 'other', '1.0'))
+
+
+if __name__ == '__main__':
+    unittest.main()
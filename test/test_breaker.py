@@ -0,0 +1,218 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from types import SimpleNamespace
+import unittest
+from unittest import mock
+
+from helpers import optional_import, requires, run_async
+
+tob = optional_import('vonx.services.tob')
+
+
+@requires(tob, 'API client')
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(tob, 'time', SimpleNamespace(monotonic=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = tob.CircuitBreaker(threshold=3, reset_timeout=30)
+
+    def open_breaker(self):
+        for _idx in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+
+    def test_threshold(self):
+        breaker = self.breaker
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        # a success resets the count of consecutive failures
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.status['rejected'], 1)
+        self.assertEqual(breaker.status['opened'], 1)
+
+    def test_trial_success(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.assertTrue(self.breaker.allow())
+        # only a single trial request is allowed
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+    def test_trial_failure(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.breaker.status['opened'], 2)
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+        self.now += 1
+        self.assertTrue(self.breaker.allow())
+
+
+@requires(tob, 'API client')
+class TestCallPolicy(unittest.TestCase):
+
+    def policy(self, **kwargs):
+        kwargs.setdefault('backoff', 0)
+        kwargs.setdefault('breaker', tob.CircuitBreaker(threshold=2, reset_timeout=30))
+        return tob.TobCallPolicy(timeout=5, **kwargs)
+
+    @staticmethod
+    def attempts(*outcomes):
+        """
+        Create a request attempt function returning or raising each outcome in turn
+        """
+        calls = []
+
+        async def attempt(_timeout):
+            outcome = outcomes[len(calls)]
+            calls.append(outcome)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+
+        attempt.calls = calls
+        return attempt
+
+    def test_retry_idempotent(self):
+        policy = self.policy()
+        attempt = self.attempts(asyncio.TimeoutError(), 'ok')
+        result = run_async(policy.call('indy/register-issuer', attempt))
+        self.assertEqual(result, 'ok')
+        self.assertEqual(len(attempt.calls), 2)
+        self.assertEqual(policy.status['retries'], 1)
+        self.assertEqual(policy.breaker.state, 'closed')
+
+    def test_no_retry_not_idempotent(self):
+        policy = self.policy()
+        attempt = self.attempts(asyncio.TimeoutError(), 'ok')
+        with self.assertRaises(asyncio.TimeoutError):
+            run_async(policy.call('indy/store-credential', attempt))
+        self.assertEqual(len(attempt.calls), 1)
+
+    def test_client_error_healthy(self):
+        policy = self.policy()
+        attempt = self.attempts(tob.TobClientError(400, 'Bad request', None), 'ok')
+        with self.assertRaises(tob.TobClientError):
+            run_async(policy.call('indy/register-issuer', attempt))
+        self.assertEqual(len(attempt.calls), 1)
+        self.assertEqual(policy.breaker.status['failures'], 0)
+
+    def test_breaker_open(self):
+        policy = self.policy(retries=0)
+        for _idx in range(2):
+            with self.assertRaises(asyncio.TimeoutError):
+                run_async(policy.call(
+                    'indy/store-credential', self.attempts(asyncio.TimeoutError())))
+        attempt = self.attempts('ok')
+        with self.assertRaises(tob.TobClientError) as raised:
+            run_async(policy.call('indy/store-credential', attempt))
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(attempt.calls, [])
+
+    def test_cancelled_trial(self):
+        breaker = tob.CircuitBreaker(threshold=1, reset_timeout=0)
+        policy = self.policy(breaker=breaker, retries=0)
+        with self.assertRaises(asyncio.TimeoutError):
+            run_async(policy.call(
+                'indy/store-credential', self.attempts(asyncio.TimeoutError())))
+        self.assertEqual(breaker.state, 'half-open')
+
+        async def hang(_timeout):
+            await asyncio.sleep(10)
+
+        async def run():
+            trial = asyncio.ensure_future(policy.call('indy/store-credential', hang))
+            await asyncio.sleep(0)
+            # the trial is in progress, so no other request is allowed
+            self.assertFalse(breaker.allow())
+            trial.cancel()
+            await asyncio.wait([trial])
+
+        run_async(run())
+        # neither closed by a success nor reopened by a failure, and a new trial is allowed
+        self.assertEqual(breaker.state, 'half-open')
+        self.assertEqual(run_async(policy.call('indy/store-credential', self.attempts('ok'))), 'ok')
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_hedge(self):
+        policy = self.policy(hedge_delay=0.01)
+        started = []
+
+        async def attempt(_timeout):
+            started.append(len(started))
+            if len(started) == 1:
+                await asyncio.sleep(10)
+                return 'slow'
+            return 'fast'
+
+        result = run_async(policy.call('indy/generate-credential-request', attempt))
+        self.assertEqual(result, 'fast')
+        self.assertEqual(started, [0, 1])
+        self.assertEqual(policy.status['hedged'], 1)
+
+    def test_no_hedge_not_idempotent(self):
+        policy = self.policy(hedge_delay=0.001)
+        started = []
+
+        async def attempt(_timeout):
+            started.append(len(started))
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        result = run_async(policy.call('indy/store-credential', attempt))
+        self.assertEqual(result, 'done')
+        self.assertEqual(started, [0])
+
+
+@requires(tob, 'API client')
+class TestRetryBudget(unittest.TestCase):
+
+    def test_budget(self):
+        budget = tob.RetryBudget(ratio=0.5, max_tokens=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        for _idx in range(10):
+            budget.deposit()
+        self.assertEqual(budget.tokens, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import unittest
+
+from vonx.services.cache import TTLCache
+from vonx.services.dedup import IssueDedup
+
+from helpers import optional_import, requires, run_async, service_stub
+
+issuer = optional_import('vonx.services.issuer')
+
+
+class TestDedupCache(unittest.TestCase):
+
+    def test_coalesced_load(self):
+        cache = TTLCache(10, 60)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'issued'
+
+        async def run():
+            return await asyncio.gather(
+                cache.load('key', loader), cache.load('key', loader))
+
+        self.assertEqual(run_async(run()), ['issued', 'issued'])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get('key'), 'issued')
+
+    def test_from_env(self):
+        dedup = IssueDedup.from_env({'ISSUER_DEDUP_TTL': '', 'ISSUER_DEDUP_ATTRIBUTES': 'true'})
+        self.assertIsNone(dedup._issued._ttl)
+        self.assertTrue(dedup._attributes)
+        self.assertFalse(IssueDedup.from_env({})._attributes)
+
+    def test_failed_load_not_stored(self):
+        cache = TTLCache(10, 60)
+
+        async def loader():
+            return 'error'
+
+        result = run_async(cache.load('key', loader, store=lambda value: value != 'error'))
+        self.assertEqual(result, 'error')
+        self.assertIsNone(cache.get('key'))
+
+
+@requires(issuer, 'issuer service')
+class TestIdempotencyKey(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = service_stub(issuer.IssuerManager, _dedup=IssueDedup(10, 60))
+
+    def check(self, request):
+        return self.manager._check_idempotency_key(request)
+
+    def test_same_payload(self):
+        request = issuer.IssueCredRequest('schema', '1.0', {'a': 1}, idempotency_key='k1')
+        self.assertIsNone(self.check(request))
+        repeat = issuer.IssueCredRequest('schema', '1.0', {'a': 1}, idempotency_key='k1')
+        self.assertIsNone(self.check(repeat))
+        self.assertEqual(request.dedup_key, repeat.dedup_key)
+
+    def test_different_payload(self):
+        request = issuer.IssueCredRequest('schema', '1.0', {'a': 1}, idempotency_key='k1')
+        self.assertIsNone(self.check(request))
+        changed = issuer.IssueCredRequest('schema', '1.0', {'a': 2}, idempotency_key='k1')
+        self.assertIsInstance(self.check(changed), issuer.IdempotencyConflict)
+
+    def test_without_key(self):
+        request = issuer.IssueCredRequest('schema', '1.0', {'a': 1})
+        self.assertIsNone(self.check(request))
+        self.assertTrue(request.dedup_key.startswith('digest:'))
+
+
+@requires(issuer, 'issuer service')
+class TestIssueDedup(unittest.TestCase):
+
+    def issue(self, requests, dedup_attributes=False):
+        issued = []
+
+        async def issue_cred_request(request):
+            issued.append(request)
+            return issuer.IssueCredResponse('issuer', None, len(issued))
+
+        manager = service_stub(
+            issuer.IssuerManager,
+            _dedup=IssueDedup(10, 60, dedup_attributes),
+            _issue_cred_request=issue_cred_request)
+        for request in requests:
+            run_async(manager._handle_issue_cred(request))
+        return issued
+
+    def test_repeat_with_key(self):
+        issued = self.issue([
+            issuer.IssueCredRequest('schema', '1.0', {'a': 1}, idempotency_key='k1'),
+            issuer.IssueCredRequest('schema', '1.0', {'a': 1}, idempotency_key='k1'),
+        ])
+        self.assertEqual(len(issued), 1)
+
+    def test_repeat_without_key(self):
+        # a deliberate re-issue of the same credential is not dropped by default
+        requests = [
+            issuer.IssueCredRequest('schema', '1.0', {'a': 1}),
+            issuer.IssueCredRequest('schema', '1.0', {'a': 1}),
+        ]
+        self.assertEqual(len(self.issue(requests)), 2)
+        self.assertEqual(len(self.issue(requests, dedup_attributes=True)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
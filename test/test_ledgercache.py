@@ -0,0 +1,95 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from types import SimpleNamespace
+import time
+import unittest
+
+from vonx.services.ledgercache import LedgerReadCache, LedgerStatusCache
+
+from helpers import run_async
+
+
+class TestLedgerReadCache(unittest.TestCase):
+
+    def test_from_config(self):
+        cache = LedgerReadCache.from_config({'nym_cache_ttl': '60', 'schema_cache_ttl': ''})
+        self.assertEqual(cache.ttl('nym'), 60.0)
+        self.assertIsNone(cache.ttl('cred_def'))
+
+    def test_read(self):
+        cache = LedgerReadCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return 'value-{}'.format(len(calls))
+
+        async def run():
+            first = await cache.read('schema', 'key', loader)
+            cached = await cache.read('schema', 'key', loader)
+            # the cached value is replaced when the ledger is read directly
+            refreshed = await cache.read('schema', 'key', loader, use_cache=False)
+            return first, cached, refreshed, await cache.read('schema', 'key', loader)
+
+        self.assertEqual(run_async(run()), ('value-1', 'value-1', 'value-2', 'value-2'))
+        self.assertEqual(len(calls), 2)
+
+
+class TestLedgerStatusCache(unittest.TestCase):
+
+    def test_shared_refresh(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return SimpleNamespace(fetched=time.time(), ttl=60)
+
+        cache = LedgerStatusCache(fetch)
+
+        async def run():
+            first, second = await asyncio.gather(cache.get(), cache.get())
+            self.assertIs(first, second)
+            self.assertIs(await cache.get(), first)
+
+        run_async(run())
+        self.assertEqual(len(calls), 1)
+
+    def test_refresh_ahead(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return SimpleNamespace(fetched=time.time(), ttl=60)
+
+        cache = LedgerStatusCache(fetch)
+
+        async def run():
+            cache.current = stale = SimpleNamespace(fetched=time.time() - 40, ttl=60)
+            # the current copy is returned while it is refreshed in the background
+            self.assertIs(await cache.get(), stale)
+            await asyncio.sleep(0.01)
+            self.assertIsNot(cache.current, stale)
+
+        run_async(run())
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,270 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from vonx.services.outbox import CredentialOutbox
+
+from helpers import optional_import, requires, run_async
+
+delivery = optional_import('vonx.services.delivery')
+
+
+class TestCredentialOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def open_outbox(self, **kwargs):
+        outbox = CredentialOutbox(self.path, flush_interval=0, **kwargs)
+        outbox.open()
+        return outbox
+
+    def test_replay(self):
+        outbox = self.open_outbox()
+
+        async def run():
+            first = await outbox.add('issuer', {'cred_data': 1})
+            second = await outbox.add('issuer', {'cred_data': 2})
+            await outbox.ack([first])
+            return second
+
+        second = run_async(run())
+        outbox.close()
+
+        # without a saved index, the journal is scanned from the start
+        outbox = self.open_outbox()
+        self.assertEqual(outbox.due(10), [second])
+        records = run_async(outbox.read([second]))
+        self.assertEqual(records[0]['cred'], {'cred_data': 2})
+        self.assertEqual(records[0]['issuer_id'], 'issuer')
+        outbox.close()
+
+    def test_replay_after_index(self):
+        outbox = self.open_outbox()
+
+        async def run():
+            first = await outbox.add('issuer', {'cred_data': 1})
+            await outbox.save_index()
+            second = await outbox.add('issuer', {'cred_data': 2})
+            await outbox.ack([first])
+            return second
+
+        second = run_async(run())
+        outbox.close()
+        outbox = self.open_outbox()
+        self.assertEqual(outbox.due(10), [second])
+        outbox.close()
+
+    def test_truncate_partial_record(self):
+        outbox = self.open_outbox()
+        rec_id = run_async(outbox.add('issuer', {'cred_data': 1}))
+        outbox.close()
+        with open(str(outbox._segment_path(0)), 'ab') as seg_file:
+            seg_file.write(b'{"op":"add","id":"torn"')
+
+        outbox = self.open_outbox()
+        self.assertEqual(outbox.due(10), [rec_id])
+        # records written after the truncation are replayed normally
+        later = run_async(outbox.add('issuer', {'cred_data': 2}))
+        outbox.close()
+        outbox = self.open_outbox()
+        self.assertEqual(outbox.due(10), [rec_id, later])
+        outbox.close()
+
+    def test_failed_write_discarded(self):
+        outbox = self.open_outbox()
+        first = run_async(outbox.add('issuer', {'cred_data': 1}))
+        seg_file = outbox._file
+
+        class FailingFile:
+            """
+            Write the first record of a batch, then fail
+            """
+            def __init__(self):
+                self.writes = 0
+
+            def write(self, data):
+                self.writes += 1
+                if self.writes > 1:
+                    raise OSError('No space left on device')
+                seg_file.write(data)
+                seg_file.flush()
+
+            def close(self):
+                seg_file.close()
+
+        outbox._file = FailingFile()
+
+        async def run():
+            results = await asyncio.gather(
+                outbox.add('issuer', {'cred_data': 2}),
+                outbox.add('issuer', {'cred_data': 3}),
+                return_exceptions=True)
+            self.assertTrue(all(isinstance(result, OSError) for result in results))
+            return await outbox.add('issuer', {'cred_data': 4})
+
+        later = run_async(run())
+        outbox.close()
+        # the part of the failed batch which was written is not replayed
+        outbox = self.open_outbox()
+        self.assertEqual(outbox.due(10), [first, later])
+        records = run_async(outbox.read([later]))
+        self.assertEqual(records[0]['cred'], {'cred_data': 4})
+        outbox.close()
+
+    def test_checkpoint(self):
+        outbox = self.open_outbox(index_interval=60)
+        index_path = str(outbox._index_path)
+
+        async def run():
+            await outbox.add('issuer', {'cred_data': 1})
+            await outbox.checkpoint()
+            self.assertFalse(os.path.exists(index_path))
+            await outbox.save_index()
+            self.assertTrue(os.path.exists(index_path))
+
+        run_async(run())
+        outbox.close()
+
+    def test_ack_removes_segments(self):
+        outbox = self.open_outbox(segment_size=4096)
+
+        async def run():
+            rec_ids = []
+            for idx in range(100):
+                rec_ids.append(await outbox.add('issuer', {'cred_data': 'x' * 100, 'idx': idx}))
+            await outbox.ack(rec_ids)
+            await outbox.save_index()
+
+        run_async(run())
+        self.assertEqual(outbox.pending, 0)
+        self.assertEqual(len(outbox._segments()), 1)
+        outbox.close()
+        outbox = self.open_outbox(segment_size=4096)
+        self.assertEqual(outbox.due(10), [])
+        outbox.close()
+
+    def test_retry_persisted(self):
+        outbox = self.open_outbox()
+
+        async def run():
+            rec_id = await outbox.add('issuer', {'cred_data': 1})
+            await outbox.retry([rec_id], 1, 300)
+            await outbox.retry([rec_id], 1, 300)
+            return rec_id
+
+        rec_id = run_async(run())
+        self.assertEqual(outbox.attempts(rec_id), 2)
+        self.assertEqual(outbox.due(10), [])
+        outbox.close()
+
+        # replayed from the journal
+        outbox = self.open_outbox()
+        self.assertEqual(outbox.attempts(rec_id), 2)
+        run_async(outbox.save_index())
+        outbox.close()
+
+        # loaded from the index
+        outbox = self.open_outbox()
+        self.assertEqual(outbox.attempts(rec_id), 2)
+        run_async(outbox.ack([rec_id]))
+        self.assertEqual(outbox.attempts(rec_id), 0)
+        outbox.close()
+
+
+@requires(delivery, 'outbox delivery')
+class TestOutboxDelivery(unittest.TestCase):
+
+    def test_stop(self):
+        with tempfile.TemporaryDirectory() as path:
+            outbox = CredentialOutbox(path, flush_interval=0, index_interval=60)
+            sender = delivery.OutboxDelivery(outbox, None, lambda issuer_id: False)
+
+            async def run():
+                await sender.start()
+                await outbox.add('issuer', {'cred_data': 1})
+                await sender.stop()
+
+            run_async(run())
+            # the index is saved and the journal closed when delivery stops
+            self.assertTrue(outbox._index_path.exists())
+            self.assertIsNone(outbox._file)
+
+    def test_stop_while_woken(self):
+        with tempfile.TemporaryDirectory() as path:
+            outbox = CredentialOutbox(path, flush_interval=0)
+            sender = delivery.OutboxDelivery(outbox, None, lambda issuer_id: False, interval=60)
+
+            async def run():
+                await sender.start()
+                await asyncio.sleep(0.01)
+                # the delivery loop is woken as it is cancelled
+                sender._wake.set()
+                await asyncio.sleep(0)
+                await asyncio.wait_for(sender.stop(), 5)
+
+            run_async(run())
+            self.assertIsNone(outbox._file)
+
+    def test_deliver_batch(self):
+        class ApiClient:
+            def __init__(self, error=None):
+                self.error = error
+
+            async def store_credentials(self, creds):
+                if self.error:
+                    raise self.error
+                return [delivery.IndyStoredCredential(None, cred, {}) for cred in creds]
+
+        clients = {
+            'good': ApiClient(),
+            'bad': ApiClient(delivery.TobClientError(503, 'Unavailable', None)),
+        }
+        cred = {
+            'issuer_id': None, 'schema_name': 'schema', 'issuer_did': 'did',
+            'cred_data': {}, 'cred_def': {}, 'cred_req_metadata': {}, 'cred_revoc_id': None,
+        }
+        with tempfile.TemporaryDirectory() as path:
+            outbox = CredentialOutbox(path, flush_interval=0)
+            outbox.open()
+            sender = delivery.OutboxDelivery(outbox, clients.get, lambda issuer_id: True)
+
+            async def run():
+                good = await outbox.add('good', cred)
+                bad = await outbox.add('bad', cred)
+                self.assertEqual(await sender.deliver_batch(), 1)
+                return good, bad
+
+            good, bad = run_async(run())
+            self.assertEqual(outbox.attempts(good), 0)
+            self.assertEqual(outbox.attempts(bad), 1)
+            self.assertEqual(outbox.pending, 1)
+            # the failed delivery is deferred
+            self.assertEqual(outbox.due(10), [])
+            outbox.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import unittest
+
+from vonx.services.pipeline import Pipeline, PipelineStage
+
+from helpers import run_async
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_stages(self):
+        async def add_one(item):
+            return item + 1
+
+        async def double(item):
+            await asyncio.sleep(0.001)
+            return item * 2
+
+        async def run():
+            pipeline = Pipeline([
+                PipelineStage('add', add_one, 2, 4),
+                PipelineStage('double', double, 2, 4),
+            ])
+            try:
+                return await asyncio.gather(*(pipeline.submit(idx) for idx in range(10)))
+            finally:
+                pipeline.stop()
+
+        self.assertEqual(run_async(run()), [(idx + 1) * 2 for idx in range(10)])
+
+    def test_workers(self):
+        active = []
+        peak = []
+
+        async def work(item):
+            active.append(item)
+            peak.append(len(active))
+            await asyncio.sleep(0.001)
+            active.remove(item)
+            return item
+
+        async def run():
+            pipeline = Pipeline([PipelineStage('work', work, 3, 2)])
+            try:
+                await asyncio.gather(*(pipeline.submit(idx) for idx in range(12)))
+                return pipeline.status['work']
+            finally:
+                pipeline.stop()
+
+        status = run_async(run())
+        self.assertEqual(max(peak), 3)
+        self.assertEqual(status['processed'], 12)
+        self.assertLessEqual(status['peak_queued'], 2)
+
+    def test_error(self):
+        seen = []
+
+        async def check(item):
+            if item == 'bad':
+                raise ValueError('bad item')
+            return item
+
+        async def record(item):
+            seen.append(item)
+            return item
+
+        async def run():
+            pipeline = Pipeline([
+                PipelineStage('check', check), PipelineStage('record', record)])
+            try:
+                # assertRaises would clear the traceback frames, including the worker's
+                try:
+                    await pipeline.submit('bad')
+                except ValueError:
+                    pass
+                else:
+                    self.fail('Pipeline error was not raised')
+                self.assertEqual(await pipeline.submit('good'), 'good')
+                return pipeline.status
+            finally:
+                pipeline.stop()
+
+        status = run_async(run())
+        self.assertEqual(seen, ['good'])
+        self.assertEqual(status['check']['errors'], 1)
+
+    def test_cancelled_handler(self):
+        async def check(item):
+            if item == 'cancel':
+                raise asyncio.CancelledError()
+            return item
+
+        async def run():
+            pipeline = Pipeline([PipelineStage('check', check)])
+            try:
+                cancelled = asyncio.ensure_future(pipeline.submit('cancel'))
+                await asyncio.wait([cancelled], timeout=1)
+                self.assertTrue(cancelled.cancelled())
+                # the worker carries on with the next item
+                self.assertEqual(await asyncio.wait_for(pipeline.submit('good'), 1), 'good')
+                return pipeline.status
+            finally:
+                pipeline.stop()
+
+        status = run_async(run())
+        self.assertEqual(status['check']['errors'], 1)
+        self.assertEqual(status['check']['active'], 0)
+
+    def test_cancelled_caller(self):
+        handled = []
+
+        async def run():
+            blocked = asyncio.Event()
+
+            async def first(item):
+                await blocked.wait()
+                return item
+
+            async def second(item):
+                handled.append(item)
+                return item
+
+            pipeline = Pipeline([
+                PipelineStage('first', first), PipelineStage('second', second)])
+            try:
+                active = asyncio.ensure_future(pipeline.submit('active'))
+                queued = asyncio.ensure_future(pipeline.submit('queued'))
+                await asyncio.sleep(0)
+                queued.cancel()
+                blocked.set()
+                self.assertEqual(await active, 'active')
+                await asyncio.sleep(0.001)
+            finally:
+                pipeline.stop()
+
+        run_async(run())
+        # the cancelled request is dropped rather than processed
+        self.assertEqual(handled, ['active'])
+
+    def test_no_stages(self):
+        with self.assertRaises(ValueError):
+            Pipeline([])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+from vonx.services.artifacts import RegistrationCache
+
+from helpers import optional_import, requires, run_async, service_stub
+
+issuer = optional_import('vonx.services.issuer')
+
+
+class TestRegistrationCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_registered(self):
+        cache = RegistrationCache(self.path)
+        self.assertFalse(cache.load())
+        self.assertFalse(cache.registered('issuer', 'abc'))
+        cache.set('issuer', 'abc')
+        cache.save()
+
+        cache = RegistrationCache(self.path)
+        self.assertTrue(cache.load())
+        self.assertTrue(cache.registered('issuer', 'abc'))
+        self.assertFalse(cache.registered('issuer', 'def'))
+        self.assertFalse(cache.registered('other', 'abc'))
+        self.assertFalse(cache.registered('issuer', None))
+
+    def test_snapshot(self):
+        cache = RegistrationCache(self.path)
+        cache.set('issuer', 'abc')
+        data = cache.snapshot()
+        # later changes do not affect a snapshot being written
+        cache.set('other', 'def')
+        cache.write(data)
+        cache = RegistrationCache(self.path)
+        cache.load()
+        self.assertTrue(cache.registered('issuer', 'abc'))
+        self.assertIsNone(cache.get('other'))
+
+    def test_concurrent_writes(self):
+        cache = RegistrationCache(self.path)
+        snapshots = []
+        for idx in range(20):
+            cache.set('issuer-{}'.format(idx), str(idx))
+            snapshots.append(cache.snapshot())
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(cache.write, snapshots))
+        cache = RegistrationCache(self.path)
+        self.assertTrue(cache.load())
+
+    def test_corrupt_file(self):
+        cache = RegistrationCache(self.path)
+        cache.set('issuer', 'abc')
+        cache.save()
+        with cache.path.open('r+') as cache_file:
+            cache_file.write('{"checksum": "x", ')
+
+        cache = RegistrationCache(self.path)
+        self.assertFalse(cache.load())
+        self.assertFalse(cache.registered('issuer', 'abc'))
+
+
+class FakeApiClient:
+
+    def __init__(self):
+        self.registered = []
+
+    async def register_issuer(self, cfg):
+        self.registered.append(cfg)
+
+
+@requires(issuer, 'issuer service')
+class TestIssuerRegistration(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.api_client = FakeApiClient()
+        schema = SimpleNamespace(name='schema', version='1.0')
+
+        async def save_registrations():
+            self.manager._registrations.save()
+
+        self.manager = service_stub(
+            issuer.IssuerManager,
+            _issuers={'issuer': SimpleNamespace(
+                api_url='http://tob/api/v2',
+                config={'email': 'issuer@example.com', 'name': 'Issuer'},
+                cred_types=[{'schema': schema}],
+                did='did')},
+            _force_register=False,
+            _registrations=RegistrationCache(self._tmp.name),
+            _api_client=lambda _issuer_id: self.api_client,
+            _save_registrations=save_registrations,
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def register(self):
+        cfg, fingerprint = self.manager._issuer_registration('issuer')
+        run_async(self.manager._register_issuer('issuer', cfg, fingerprint))
+        return len(self.api_client.registered)
+
+    def test_unchanged_skipped(self):
+        self.assertEqual(self.register(), 1)
+        self.assertEqual(self.register(), 1)
+        # a restarted manager loads the saved registrations
+        self.manager._registrations = RegistrationCache(self._tmp.name)
+        self.manager._registrations.load()
+        self.assertEqual(self.register(), 1)
+
+    def test_changed_registered(self):
+        self.assertEqual(self.register(), 1)
+        self.manager._issuers['issuer'].config['name'] = 'Renamed Issuer'
+        self.assertEqual(self.register(), 2)
+        self.manager._issuers['issuer'].did = 'new-did'
+        self.assertEqual(self.register(), 3)
+
+    def test_force_register(self):
+        self.assertEqual(self.register(), 1)
+        self.manager._force_register = True
+        self.assertEqual(self.register(), 2)
+        self.manager._force_register = False
+        self.manager._issuers['issuer'].config['force_register'] = True
+        self.assertEqual(self.register(), 3)
+
+    def test_concurrent_saves(self):
+        manager = service_stub(
+            issuer.IssuerManager,
+            _registrations=RegistrationCache(self._tmp.name),
+            _registrations_lock=None)
+
+        async def register(idx):
+            manager._registrations.set('issuer-{}'.format(idx), str(idx))
+            await manager._save_registrations()
+
+        async def run():
+            await asyncio.gather(*(register(idx) for idx in range(20)))
+
+        run_async(run())
+        cache = RegistrationCache(self._tmp.name)
+        self.assertTrue(cache.load())
+        for idx in range(20):
+            self.assertTrue(cache.registered('issuer-{}'.format(idx), str(idx)))
+
+    def test_invalid_definition(self):
+        del self.manager._issuers['issuer'].config['email']
+        with self.assertRaises(ValueError):
+            self.manager._issuer_registration('issuer')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import unittest
+
+from vonx.services.scheduler import FairScheduler
+
+from helpers import run_async
+
+
+async def run_queued(scheduler, counts):
+    """
+    Queue work for several keys on a busy scheduler, then release it one slot at a time,
+    returning the order in which the keys were served
+    """
+    order = []
+    release = asyncio.Event()
+    await scheduler.acquire('blocker')
+
+    async def work(key):
+        async with scheduler.slot(key):
+            order.append(key)
+            await release.wait()
+
+    tasks = [
+        asyncio.ensure_future(work(key))
+        for key, count in counts.items() for _idx in range(count)]
+    await asyncio.sleep(0)
+    scheduler.release('blocker')
+    release.set()
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestFairScheduler(unittest.TestCase):
+
+    def test_round_robin(self):
+        scheduler = FairScheduler(1)
+        order = run_async(run_queued(scheduler, {'a': 6, 'b': 2}))
+        # a busy queue does not hold back the other
+        self.assertEqual(order[:4], ['a', 'b', 'a', 'b'])
+        self.assertEqual(order.count('a'), 6)
+
+    def test_weights(self):
+        scheduler = FairScheduler(1)
+        scheduler.configure('a', weight=3)
+        order = run_async(run_queued(scheduler, {'a': 9, 'b': 9}))
+        self.assertEqual(order[:8].count('a'), 6)
+        self.assertEqual(order[:8].count('b'), 2)
+
+    def test_max_inflight(self):
+        scheduler = FairScheduler(4)
+        scheduler.configure('a', max_inflight=1)
+        peak = {'a': 0, 'b': 0}
+        active = {'a': 0, 'b': 0}
+
+        async def work(key):
+            async with scheduler.slot(key):
+                active[key] += 1
+                peak[key] = max(peak[key], active[key])
+                await asyncio.sleep(0.001)
+                active[key] -= 1
+
+        async def run():
+            await asyncio.gather(*(work(key) for key in 'aaaabbbb'))
+
+        run_async(run())
+        self.assertEqual(peak['a'], 1)
+        self.assertEqual(peak['b'], 3)
+        self.assertEqual(scheduler.status['inflight'], 0)
+
+    def test_cancel_waiting(self):
+        scheduler = FairScheduler(1)
+
+        async def run():
+            await scheduler.acquire('a')
+            waiting = asyncio.ensure_future(scheduler.acquire('a'))
+            other = asyncio.ensure_future(scheduler.acquire('b'))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.sleep(0)
+            scheduler.release('a')
+            # the slot passes to the next live waiter, not the cancelled one
+            await asyncio.wait_for(other, 1)
+            scheduler.release('b')
+            return waiting
+
+        waiting = run_async(run())
+        self.assertTrue(waiting.cancelled())
+        status = scheduler.status
+        self.assertEqual(status['inflight'], 0)
+        self.assertEqual(status['queues']['a']['inflight'], 0)
+
+    def test_cancel_granted(self):
+        scheduler = FairScheduler(1)
+
+        async def run():
+            await scheduler.acquire('a')
+            waiting = asyncio.ensure_future(scheduler.acquire('a'))
+            await asyncio.sleep(0)
+            # the slot is granted and the waiter cancelled before it resumes
+            scheduler.release('a')
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            await asyncio.wait_for(scheduler.acquire('b'), 1)
+            scheduler.release('b')
+
+        run_async(run())
+        self.assertEqual(scheduler.status['inflight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+
+from vonx.services.schema import Schema, SchemaRoutes
+
+
+class TestSchema(unittest.TestCase):
+
+    def test_compare(self):
+        schema = Schema('schema', '1.0', ['a', 'b'])
+        self.assertTrue(schema.compare(Schema('schema', '1.0', ['a', 'b'])))
+        self.assertTrue(schema.compare(Schema('schema', '1.0')))
+        self.assertFalse(schema.compare(Schema('schema', '1.0', ['a'])))
+        self.assertFalse(schema.compare(Schema('schema', '2.0', ['a', 'b'])))
+
+
+class TestSchemaRoutes(unittest.TestCase):
+
+    def test_find(self):
+        routes = SchemaRoutes()
+        routes.add('first', 'schema', '1.0', 'one', 'did:1')
+        routes.add('second', 'schema', '2.0', 'two', 'did:2')
+        self.assertEqual(routes.find('schema'), 'one')
+        self.assertEqual(routes.find('schema', '2.0'), 'two')
+        self.assertEqual(routes.find('schema', None, 'did:2'), 'two')
+        self.assertIsNone(routes.find('schema', '3.0'))
+
+    def test_replace_keeps_order(self):
+        routes = SchemaRoutes()
+        routes.add('first', 'schema', '1.0', 'first')
+        routes.add('second', 'schema', '1.0', 'second')
+        # replacing the entries of the first owner (such as after a status update)
+        # does not move it behind the second
+        routes.remove_owner('first')
+        self.assertEqual(routes.find('schema', '1.0'), 'second')
+        routes.add('first', 'schema', '1.0', 'updated')
+        self.assertEqual(routes.find_entry('schema', '1.0'), ('first', 'updated'))
+        routes.remove_owner('second')
+        routes.add('second', 'schema', '1.0', 'second')
+        self.assertEqual(routes.find('schema', '1.0'), 'updated')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import json
+import unittest
+
+from helpers import optional_import, requires, run_async
+
+tob = optional_import('vonx.services.tob')
+
+
+class FakeRequest:
+    """
+    A pending HTTP request which records whether its response was released
+    """
+
+    def __init__(self, status: int, body, delay: float = 0):
+        self.status = status
+        self.body = body
+        self.delay = delay
+        self.released = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.released = True
+
+    async def text(self):
+        return json.dumps(self.body)
+
+    async def json(self):
+        await asyncio.sleep(self.delay)
+        return self.body
+
+
+@requires(tob, 'API client')
+class TestTobRequest(unittest.TestCase):
+
+    def test_success(self):
+        request = FakeRequest(201, {'success': True})
+        result = run_async(tob.TobClient._request('post_json', request, (200, 201)))
+        self.assertEqual(result, {'success': True})
+        self.assertTrue(request.released)
+
+    def test_error_status(self):
+        request = FakeRequest(406, {'detail': 'No matching credentials'})
+        with self.assertRaises(tob.TobClientError) as raised:
+            run_async(tob.TobClient._request('post_json', request, (200, 201)))
+        self.assertTrue(request.released)
+        self.assertEqual(raised.exception.status_code, 406)
+        # the error holds the response body rather than the response itself
+        self.assertEqual(json.loads(raised.exception.response)['detail'], 'No matching credentials')
+
+    def test_timeout(self):
+        request = FakeRequest(200, [], delay=10)
+        with self.assertRaises(asyncio.TimeoutError):
+            run_async(asyncio.wait_for(
+                tob.TobClient._request('fetch_list', request, (200,)), 0.01))
+        self.assertTrue(request.released)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+
+from vonx.services.util import url_allowed
+
+
+class TestUrlAllowed(unittest.TestCase):
+
+    def test_host(self):
+        self.assertTrue(url_allowed('https://hooks.example.com/job', 'hooks.example.com'))
+        self.assertTrue(url_allowed('http://HOOKS.example.com:8080/', 'hooks.example.com'))
+        self.assertTrue(url_allowed('https://hooks.example.com:8443/', 'hooks.example.com:8443'))
+        self.assertFalse(url_allowed('https://hooks.example.com:9000/', 'hooks.example.com:8443'))
+        self.assertFalse(url_allowed('https://hooks.example.com.evil.net/', 'hooks.example.com'))
+        self.assertFalse(url_allowed('https://169.254.169.254/', 'hooks.example.com'))
+
+    def test_prefix(self):
+        allowed = 'other.example.com, https://client.example.com/vonx/'
+        self.assertTrue(url_allowed('https://client.example.com/vonx/done', allowed))
+        self.assertTrue(url_allowed('https://other.example.com/', allowed))
+        self.assertFalse(url_allowed('http://client.example.com/vonx/done', allowed))
+        self.assertFalse(url_allowed('https://client.example.com/vonxy', allowed))
+        self.assertFalse(url_allowed('https://client.example.com/', allowed))
+
+    def test_refused(self):
+        self.assertFalse(url_allowed('https://hooks.example.com/', None))
+        self.assertFalse(url_allowed('https://hooks.example.com/', ''))
+        self.assertFalse(url_allowed('ftp://hooks.example.com/', ['hooks.example.com']))
+        self.assertFalse(url_allowed('https://user@hooks.example.com/', ['hooks.example.com']))
+        self.assertFalse(url_allowed('not a url', ['hooks.example.com']))
+
+
+if __name__ == '__main__':
+    unittest.main()
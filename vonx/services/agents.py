@@ -0,0 +1,444 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import logging
+import time
+import uuid
+
+from von_agent.agents import _BaseAgent, HolderProver as VonHolderProver
+from von_agent.nodepool import NodePool
+from von_agent.wallet import Wallet
+
+from .schema import Schema, SchemaRoutes
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WalletConfig:
+    """
+    Manage configuration settings for an Indy wallet
+    """
+    def __init__(self, **params):
+        self.name = params.get("name")
+        if not self.name:
+            raise ValueError("Missing wallet name")
+        self.seed = params.get("seed")
+        if not self.seed:
+            raise ValueError("Missing seed for wallet '{}'".format(self.name))
+        if len(self.seed) != 32:
+            raise ValueError(
+                "Wallet seed length is not 32 characters: {}".format(self.seed)
+            )
+        self.genesis_path = params.get("genesis_path")
+        self.type = params.get("type", None)  # or virtual?
+        self.params = params.get("params", {})
+        if "freshness_time" not in self.params:
+            self.params["freshness_time"] = 0
+        self.creds = {"key": ""}
+
+
+class NodePoolRegistry:
+    """
+    A set of shared, reference-counted connections to the ledger node pool, one per
+    genesis transaction file. Each connection is opened when first acquired and closed
+    when the last agent using it is closed
+
+    Args:
+        name: the base name for the pool ledger configurations
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._pools = {}
+
+    def get(self, genesis_path: str) -> NodePool:
+        """
+        Fetch or create the (possibly unopened) node pool for a genesis transaction file
+        """
+        genesis_path = str(genesis_path)
+        if genesis_path not in self._pools:
+            name = self._name
+            if self._pools:
+                name += "-{}".format(len(self._pools))
+            self._pools[genesis_path] = {
+                "lock": None,
+                "opened": False,
+                "pool": NodePool(name, genesis_path),
+                "refs": 0,
+            }
+        return self._pools[genesis_path]["pool"]
+
+    async def acquire(self, genesis_path: str) -> NodePool:
+        """
+        Add a reference to the node pool for a genesis transaction file, opening it if required
+        """
+        pool = self.get(genesis_path)
+        entry = self._pools[str(genesis_path)]
+        if not entry["lock"]:
+            entry["lock"] = asyncio.Lock()
+        async with entry["lock"]:
+            if not entry["opened"]:
+                LOGGER.info("Opening shared node pool: %s", pool.name)
+                await pool.open()
+                entry["opened"] = True
+            entry["refs"] += 1
+        return pool
+
+    async def release(self, genesis_path: str) -> None:
+        """
+        Remove a reference to the node pool for a genesis transaction file, closing it
+        when it is no longer in use
+        """
+        entry = self._pools.get(str(genesis_path))
+        if not entry or not entry["refs"]:
+            return
+        async with entry["lock"]:
+            entry["refs"] -= 1
+            if not entry["refs"] and entry["opened"]:
+                LOGGER.info("Closing shared node pool: %s", entry["pool"].name)
+                await entry["pool"].close()
+                entry["opened"] = False
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the reference counts of the node pools
+        """
+        return {
+            entry["pool"].name: {"opened": entry["opened"], "refs": entry["refs"]}
+            for entry in self._pools.values()
+        }
+
+
+class AgentWrapper:
+    """
+    A wrapper for the :class:`_BaseAgent` instance which handles configuration loading
+    and allows the wallet to be kept open between requests
+    """
+
+    def __init__(self, wallet_config: WalletConfig, instance_cls,
+                 issuer_type: str, ext_cfg=None, pools: NodePoolRegistry = None):
+        if not wallet_config.genesis_path:
+            raise ValueError("Missing genesis_path for wallet configuration")
+
+        self._genesis_path = wallet_config.genesis_path
+        self._pools = pools
+        if pools:
+            self._pool = pools.get(self._genesis_path)
+        else:
+            self._pool = NodePool(
+                wallet_config.name + "-" + issuer_type, wallet_config.genesis_path
+            )
+
+        self._instance_cls = instance_cls
+        self._instance = None
+        self._wallet = Wallet(
+            self._pool,
+            wallet_config.seed,
+            wallet_config.name + "-" + issuer_type + "-Wallet",
+            wallet_config.type,
+            wallet_config.params,
+            wallet_config.creds,
+        )
+        self._ext_cfg = ext_cfg
+        self._opened = None
+        self._keep_open = False
+
+    @property
+    def opened(self) -> bool:
+        """
+        Return current state of the :class:`_BaseAgent` instance
+        """
+        return self._opened is not None
+
+    @property
+    def instance(self):
+        """
+        Accessor for the opened :class:`_BaseAgent` instance
+        """
+        return self._instance
+
+    def keep_open(self, flag=True):
+        """
+        Set the keep-open flag to keep the wallet open between requests
+        """
+        self._keep_open = flag
+
+    async def open(self, keep_open=True) -> _BaseAgent:
+        """
+        Open the connection to the transaction pool and wallet
+        """
+        if keep_open:
+            self._keep_open = True
+        if self._opened:
+            return self._opened
+        if self._pools:
+            await self._pools.acquire(self._genesis_path)
+        else:
+            await self._pool.open()
+        self._instance = self._instance_cls(
+            await self._wallet.create(), self._ext_cfg
+        )
+        self._opened = await self._instance.open()
+        if isinstance(self._instance, VonHolderProver):
+            # NOTE: should only create this once,
+            # and only in the root wallet (virtual_wallet == None)
+            await self._instance.create_link_secret(str(uuid.uuid4()))
+        return self._opened
+
+    async def close(self):
+        """
+        Close the wallet and transaction pool connections
+        """
+        if self._opened:
+            await self._instance.close()
+            if self._pools:
+                await self._pools.release(self._genesis_path)
+            else:
+                await self._pool.close()
+        self._opened = None
+        self._keep_open = False
+
+    async def __aenter__(self):
+        return await self.open(False)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            LOGGER.exception("Exception in VON %s:", self._wallet.name)
+        if not self._keep_open:
+            await self.close()
+
+
+class AgentLease:
+    """
+    An async context manager which checks an agent out of an :class:`AgentLimit`
+    and returns it when the block is exited
+    """
+
+    def __init__(self, limit: 'AgentLimit'):
+        self._limit = limit
+        self._agent = None
+
+    async def __aenter__(self) -> _BaseAgent:
+        self._agent = await self._limit.acquire()
+        return self._agent
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._limit.release()
+        self._agent = None
+
+
+class AgentLimit:
+    """
+    Track (and optionally limit) the operations in progress on the opened agent of a
+    single issuer, or the verifier.
+
+    An Indy wallet may only be opened once per process, and the private keys for the
+    issuer's credential definitions only exist in the issuer's own wallet, so every
+    operation for an issuer shares the same opened agent. Indy SDK operations on the
+    wallet handle are performed asynchronously by libindy, so by default there is
+    no limit on the number in progress at once.
+
+    Args:
+        limit: the maximum number of concurrent operations, or None for no limit
+    """
+
+    def __init__(self, limit: int = None):
+        self._limit = max(int(limit), 1) if limit not in (None, "", 0, "0") else None
+        self._agent = None
+        self._idle = None
+        self._semaphore = None
+        self._stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+            "waiting": 0,
+            "wait_max": 0.0,
+            "wait_total": 0.0,
+        }
+
+    @property
+    def limit(self) -> int:
+        """
+        Accessor for the maximum number of concurrent operations, if any
+        """
+        return self._limit
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the opened agent has been provided
+        """
+        return self._agent is not None
+
+    @property
+    def idle(self) -> bool:
+        """
+        Whether there are no operations in progress or waiting
+        """
+        return self._stats["waiting"] == 0 and self._stats["in_use"] == 0
+
+    def open(self, agent: _BaseAgent) -> None:
+        """
+        Provide the opened agent
+
+        Args:
+            agent: the opened agent instance
+        """
+        self._agent = agent
+        if self._limit:
+            self._semaphore = asyncio.Semaphore(self._limit)
+
+    async def wait_idle(self) -> None:
+        """
+        Wait until there are no operations in progress or waiting
+        """
+        while not self.idle:
+            if not self._idle:
+                self._idle = asyncio.Event()
+            self._idle.clear()
+            await self._idle.wait()
+
+    async def acquire(self) -> _BaseAgent:
+        """
+        Wait until an operation may be started and check out the agent
+        """
+        if not self._agent:
+            raise RuntimeError("Agent has not been opened")
+        if self._semaphore:
+            start = time.monotonic()
+            self._stats["waiting"] += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._stats["waiting"] -= 1
+            waited = time.monotonic() - start
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+        self._stats["checkouts"] += 1
+        self._stats["in_use"] += 1
+        self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._stats["in_use"])
+        return self._agent
+
+    def release(self) -> None:
+        """
+        Record the completion of an operation
+        """
+        self._stats["in_use"] -= 1
+        if self._semaphore:
+            self._semaphore.release()
+        if self._idle and self.idle:
+            self._idle.set()
+
+    def checkout(self) -> AgentLease:
+        """
+        Check out the agent for the duration of an `async with` block
+        """
+        return AgentLease(self)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the current utilisation metrics
+        """
+        stats = self._stats.copy()
+        stats["limit"] = self._limit
+        stats["wait_mean"] = round(
+            stats["wait_total"] / stats["checkouts"], 6) if stats["checkouts"] else 0.0
+        stats["wait_max"] = round(stats["wait_max"], 6)
+        del stats["wait_total"]
+        return stats
+
+
+class IndyIssuerConfig:
+    """
+    Manage configuration settings for an Issuer, including wallet settings
+    and schemas bound for the ledger
+    """
+    def __init__(self, **params):
+        self.agent = None
+        self.agents = AgentLimit(params.get("agent_concurrency"))
+        self.auto_register = params.get("auto_register", True)
+        self.did = params.get("did")
+        self.endpoint = params.get("endpoint")
+        self.ident = params.get("id")
+        self.manager_pid = params.get("manager_pid")
+        self.registered = False
+        self.schema_routes = SchemaRoutes()
+        self.schemas = []
+        self.synced = False
+        self.wrapper = None
+        wallet_cfg = params.get("wallet") or {}
+        if "name" not in wallet_cfg:
+            wallet_cfg["name"] = self.ident
+        self.wallet_config = WalletConfig(**wallet_cfg)
+
+        schemas = params.get("schemas")
+        if schemas:
+            for schema in schemas:
+                self.add_schema(schema)
+
+    @property
+    def extended_config(self):
+        """
+        Accessor for the extended :class:`Issuer` configuration
+        """
+        ret = {}
+        if self.endpoint:
+            ret["endpoint"] = self.endpoint
+        return ret
+
+    def add_schema(self, schema: Schema):
+        """
+        Add a schema to the Issuer definition
+
+        Args:
+            schema: the :class:`Schema` to be added
+        """
+        config = {
+            "definition": schema.copy(),
+            "ledger": None,
+            "cred_def": None,
+        }
+        self.schemas.append(config)
+        self.schema_routes.add(None, schema.name, schema.version, config)
+
+    def get_schema_config(self, match: Schema) -> dict:
+        """
+        Find the extended information for a specific schema, including the ledger schema
+        definition and credential definition (if any)
+
+        Args:
+            match: the :class:`Schema` to be located
+        """
+        schema = self.schema_routes.find(match.name, match.version)
+        if schema and schema["definition"].compare(match):
+            return schema
+        return None
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the current status of the issuer
+        """
+        return {
+            "did": self.did,
+            "registered": self.registered,
+            "synced": self.synced,
+        }
+
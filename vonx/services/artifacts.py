@@ -0,0 +1,309 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def file_digest(path: str) -> str:
+    """
+    Calculate the SHA-256 digest of a file's contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def payload_digest(payload: dict) -> str:
+    """
+    Calculate the SHA-256 digest of a canonical JSON encoding of the payload
+    """
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def write_cache_file(path: pathlib.Path, data: dict) -> None:
+    """
+    Write a checksummed cache file atomically. The temporary file is specific to the
+    writing process and thread, so concurrent writers never replace each other's
+    partial output
+    """
+    if not path.parent.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name('{}.{}-{}.tmp'.format(
+        path.name, os.getpid(), threading.get_ident()))
+    with tmp_path.open('w') as cache_file:
+        json.dump({'checksum': payload_digest(data), 'data': data}, cache_file)
+        cache_file.flush()
+        os.fsync(cache_file.fileno())
+    os.replace(str(tmp_path), str(path))
+
+
+class LedgerArtifactCache:
+    """
+    A local cache of resolved ledger artifacts (registered DIDs, schemas and credential
+    definitions) used to become ready on a warm restart without reading from the ledger.
+
+    The cache is keyed by the digest of the genesis transaction file, so a different
+    ledger never shares cached values, and the contents are protected by a checksum.
+    Cached values are expected to be revalidated against the ledger after startup.
+    Each ledger worker holds the artifacts of its own issuers, so workers keep
+    separate cache files.
+
+    Args:
+        cache_dir: the directory in which cache files are kept
+        genesis_path: the path to the genesis transaction file of the ledger
+        name: the name of the ledger worker, if there are several
+    """
+
+    def __init__(self, cache_dir: str, genesis_path: str, name: str = None):
+        self._cache_dir = pathlib.Path(cache_dir)
+        self._genesis_hash = file_digest(genesis_path)
+        self._name = name
+        self._data = self._empty()
+        self._dirty = False
+
+    def _empty(self) -> dict:
+        return {
+            'cred_defs': {},
+            'genesis': self._genesis_hash,
+            'nyms': {},
+            'schemas': {},
+            'version': FORMAT_VERSION,
+        }
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Accessor for the path of the cache file for this ledger
+        """
+        name = self._genesis_hash[:32]
+        if self._name:
+            name += '-' + self._name
+        return self._cache_dir.joinpath('ledger-{}.json'.format(name))
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether the cache has been modified since it was last loaded or saved
+        """
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, value: bool) -> None:
+        self._dirty = value
+
+    def load(self) -> bool:
+        """
+        Load the cache file if present and valid, otherwise start with an empty cache
+
+        Returns:
+            True if cached values were loaded
+        """
+        #pylint: disable=broad-except
+        self._data = self._empty()
+        self._dirty = False
+        path = self.path
+        if not path.exists():
+            return False
+        try:
+            with path.open() as cache_file:
+                stored = json.load(cache_file)
+            data = stored['data']
+            if stored.get('checksum') != payload_digest(data):
+                raise ValueError('checksum mismatch')
+            if data.get('version') != FORMAT_VERSION or data.get('genesis') != self._genesis_hash:
+                raise ValueError('cache does not match ledger')
+        except Exception as e:
+            LOGGER.warning('Discarding ledger artifact cache %s: %s', path, e)
+            return False
+        self._data = data
+        LOGGER.info('Loaded ledger artifact cache: %s', path)
+        return True
+
+    def snapshot(self) -> dict:
+        """
+        Copy the cached values to be saved, marking the cache as unmodified. This should
+        be called on the thread which updates the cache, while :meth:`write` may run
+        in an executor
+        """
+        self._dirty = False
+        return copy.deepcopy(self._data)
+
+    def write(self, data: dict) -> None:
+        """
+        Write a snapshot of the cached values to the cache file atomically
+        """
+        write_cache_file(self.path, data)
+
+    def save(self) -> None:
+        """
+        Write the cache file atomically, if it has been modified
+        """
+        if self._dirty:
+            self.write(self.snapshot())
+
+    def _set(self, section: str, key: str, value) -> None:
+        if self._data[section].get(key) != value:
+            self._data[section][key] = value
+            self._dirty = True
+
+    @staticmethod
+    def schema_key(did: str, name: str, version: str) -> str:
+        """
+        Get the cache key for a schema or credential definition
+        """
+        return '{}:{}:{}'.format(did, name, version)
+
+    def get_nym(self, did: str) -> dict:
+        """
+        Get the cached ledger registration for a DID
+        """
+        return self._data['nyms'].get(did)
+
+    def set_nym(self, did: str, info: dict) -> None:
+        """
+        Record the ledger registration for a DID
+        """
+        self._set('nyms', did, info)
+
+    def get_schema(self, did: str, name: str, version: str) -> dict:
+        """
+        Get a cached ledger schema
+        """
+        return self._data['schemas'].get(self.schema_key(did, name, version))
+
+    def set_schema(self, did: str, name: str, version: str, schema: dict) -> None:
+        """
+        Record a ledger schema
+        """
+        self._set('schemas', self.schema_key(did, name, version), schema)
+
+    def get_cred_def(self, did: str, name: str, version: str) -> dict:
+        """
+        Get a cached credential definition
+        """
+        return self._data['cred_defs'].get(self.schema_key(did, name, version))
+
+    def set_cred_def(self, did: str, name: str, version: str, cred_def: dict) -> None:
+        """
+        Record a credential definition
+        """
+        self._set('cred_defs', self.schema_key(did, name, version), cred_def)
+
+
+class RegistrationCache:
+    """
+    A local record of the issuer definitions most recently registered with TheOrgBook,
+    stored as a fingerprint of each registration request. An issuer whose definition
+    has not changed since it was registered does not need to be registered again.
+
+    Args:
+        cache_dir: the directory in which cache files are kept
+    """
+
+    def __init__(self, cache_dir: str):
+        self._cache_dir = pathlib.Path(cache_dir)
+        self._data = self._empty()
+
+    @staticmethod
+    def _empty() -> dict:
+        return {
+            'issuers': {},
+            'version': FORMAT_VERSION,
+        }
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Accessor for the path of the cache file
+        """
+        return self._cache_dir.joinpath('registrations.json')
+
+    def load(self) -> bool:
+        """
+        Load the cache file if present and valid, otherwise start with an empty cache
+
+        Returns:
+            True if cached values were loaded
+        """
+        #pylint: disable=broad-except
+        self._data = self._empty()
+        path = self.path
+        if not path.exists():
+            return False
+        try:
+            with path.open() as cache_file:
+                stored = json.load(cache_file)
+            data = stored['data']
+            if stored.get('checksum') != payload_digest(data):
+                raise ValueError('checksum mismatch')
+            if data.get('version') != FORMAT_VERSION:
+                raise ValueError('unsupported version')
+        except Exception as e:
+            LOGGER.warning('Discarding issuer registration cache %s: %s', path, e)
+            return False
+        self._data = data
+        return True
+
+    def snapshot(self) -> dict:
+        """
+        Copy the recorded registrations to be saved. This should be called on the thread
+        which updates the cache, while :meth:`write` may run in an executor
+        """
+        return copy.deepcopy(self._data)
+
+    def write(self, data: dict) -> None:
+        """
+        Write a snapshot of the recorded registrations to the cache file atomically
+        """
+        write_cache_file(self.path, data)
+
+    def save(self) -> None:
+        """
+        Write the cache file atomically
+        """
+        self.write(self.snapshot())
+
+    def get(self, issuer_id: str) -> str:
+        """
+        Get the fingerprint of the last registration of an issuer
+        """
+        return self._data['issuers'].get(issuer_id)
+
+    def registered(self, issuer_id: str, fingerprint: str) -> bool:
+        """
+        Check whether an issuer was last registered with the same definition
+        """
+        return fingerprint is not None and self.get(issuer_id) == fingerprint
+
+    def set(self, issuer_id: str, fingerprint: str) -> None:
+        """
+        Record the fingerprint of a successful issuer registration
+        """
+        self._data['issuers'][issuer_id] = fingerprint
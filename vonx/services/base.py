@@ -19,6 +19,7 @@ import asyncio
 import logging
 from typing import Mapping
 
+from .eventloop import LoopMonitor
 from .exchange import (
     Exchange,
     ExchangeError,
@@ -82,8 +83,11 @@ class ServiceBase(RequestExecutor):
     The base class for services handled by the :class:`ServiceManager` instance
     """
 
+    # the time in seconds to wait for service-specific shutdown actions
+    STOP_TIMEOUT = 10
+
     def __init__(self, pid: str, exchange: Exchange, env: Mapping):
-        super(ServiceBase, self).__init__(pid, exchange)
+        super(ServiceBase, self).__init__(pid, exchange, LoopMonitor.from_env(env))
         self._env = env
         self._status = {
             "id": self._pid,
@@ -101,9 +105,39 @@ class ServiceBase(RequestExecutor):
         self._sync_lock = asyncio.Lock(loop=self._runner.loop)
         self.run_task(self._start())
 
+    def stop(self, wait: bool = True) -> None:
+        """
+        Give the service a chance to finish its own tasks, then stop processing
+
+        Args:
+            wait: block until the service has been stopped
+        """
+        #pylint: disable=broad-except
+        runner = self._runner
+        if runner.in_loop_thread():
+            self.run_task(self._service_stop())
+        else:
+            stopped = asyncio.run_coroutine_threadsafe(self._service_stop(), runner.loop)
+            if wait:
+                try:
+                    stopped.result(self.STOP_TIMEOUT)
+                except Exception:
+                    LOGGER.exception("Error stopping service: %s", self.pid)
+        super(ServiceBase, self).stop(wait)
+
     def _update_status(self, **params) -> None:
         self._status.update(params)
 
+    def _get_status(self) -> dict:
+        """
+        Get a copy of the current service status, including event loop statistics
+        """
+        status = self._status.copy()
+        loop_status = self.loop_status
+        if loop_status:
+            status["loop"] = loop_status
+        return status
+
     async def _start(self) -> None:
         """
         Initial service startup
@@ -144,6 +178,12 @@ class ServiceBase(RequestExecutor):
         """
         return True
 
+    async def _service_stop(self) -> None:
+        """
+        Perform service-specific shutdown actions
+        """
+        pass
+
     async def _handle_message(self, received: MessageWrapper) -> bool:
         """
         Process a message from the exchange and send the reply, if any
@@ -165,7 +205,7 @@ class ServiceBase(RequestExecutor):
             reply = ServiceAck()
 
         elif isinstance(request, ServiceStatusReq):
-            reply = ServiceStatus(self._status.copy())
+            reply = ServiceStatus(self._get_status())
 
         elif isinstance(request, ServiceRequest):
             try:
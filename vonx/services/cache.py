@@ -0,0 +1,162 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from collections import OrderedDict
+import time
+from typing import Awaitable, Callable
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A size-bounded, least-recently-used cache of values with an expiry time.
+    Concurrent loads of the same missing key are coalesced so that only one
+    request is made, with all callers receiving the same result.
+
+    Args:
+        max_size: the maximum number of entries retained
+        ttl: the default lifetime of an entry in seconds, or None for no expiry
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = None):
+        self._entries = OrderedDict()
+        self._max_size = max(int(max_size or 0), 0)
+        self._pending = {}
+        self._ttl = ttl
+        self._stats = {
+            'coalesced': 0,
+            'evictions': 0,
+            'expired': 0,
+            'hits': 0,
+            'misses': 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Fetch an unexpired value from the cache
+
+        Args:
+            key: the cache key
+            default: the value to return if the key is not present
+
+        Returns:
+            the cached value, or the default
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires is None or expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return value
+            del self._entries[key]
+            self._stats['expired'] += 1
+        self._stats['misses'] += 1
+        return default
+
+    def put(self, key, value, ttl: float = _MISSING) -> None:
+        """
+        Add a value to the cache, evicting the least recently used entries if required
+
+        Args:
+            key: the cache key
+            value: the value to be stored
+            ttl: the lifetime of the entry in seconds, overriding the default
+        """
+        if not self._max_size:
+            return
+        if ttl is _MISSING:
+            ttl = self._ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def remove(self, key) -> None:
+        """
+        Remove an entry from the cache
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache
+        """
+        self._entries.clear()
+
+    async def load(self, key, loader: Callable[[], Awaitable], ttl: float = _MISSING,
+                   store: Callable = None):
+        """
+        Fetch a value from the cache, calling the loader if it is not present.
+        Callers requesting a key which is already being loaded wait for the same result.
+
+        Args:
+            key: the cache key
+            loader: a function returning an awaitable which resolves to the value
+            ttl: the lifetime of the entry in seconds, overriding the default
+            store: an optional predicate determining whether a loaded value is cached
+
+        Returns:
+            the cached or loaded value
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        pending = self._pending.get(key)
+        if pending:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+        pending = asyncio.get_event_loop().create_future()
+        self._pending[key] = pending
+        #pylint: disable=broad-except
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # avoid warnings when there are no other waiters
+            pending.exception()
+            raise
+        else:
+            if store is None or store(value):
+                self.put(key, value, ttl)
+            pending.set_result(value)
+            return value
+        finally:
+            del self._pending[key]
+
+    @property
+    def stats(self) -> dict:
+        """
+        Accessor for the cache statistics
+        """
+        stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['pending'] = len(self._pending)
+        stats['size'] = len(self._entries)
+        stats['max_size'] = self._max_size
+        return stats
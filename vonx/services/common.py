@@ -31,7 +31,9 @@ class StandardServiceManager(manager.ServiceManager):
     """
 
     def __init__(self, env: Mapping = None):
+        self._ledger_pids = []
         self._schema_mgr = None
+        self._verifier_pids = []
         super(StandardServiceManager, self).__init__(env)
 
     def _init_services(self) -> None:
@@ -39,8 +41,18 @@ class StandardServiceManager(manager.ServiceManager):
 
         self._load_schemas()
 
-        # Indy ledger - handles all ledger interactions
-        self.add_service('ledger', self.init_indy_ledger())
+        # Indy ledger - handles all ledger interactions, optionally sharded by issuer
+        # across multiple worker processes
+        ledgers = self.init_indy_ledgers()
+        for svc_id, ledger in ledgers:
+            self.add_service(svc_id, ledger, process=len(ledgers) > 1)
+        self._ledger_pids = [ledger.pid for (_svc_id, ledger) in ledgers]
+
+        # Indy verifiers - verify proofs in their own processes, isolated from issuance
+        verifiers = self.init_indy_verifiers()
+        for svc_id, verifier in verifiers:
+            self.add_service(svc_id, verifier, process=True)
+        self._verifier_pids = [verifier.pid for (_svc_id, verifier) in verifiers]
 
         # Issuer manager - handles credential issuing
         self.add_service('issuer', self.init_issuer_manager())
@@ -104,6 +116,64 @@ class StandardServiceManager(manager.ServiceManager):
         """
         return self._schema_mgr
 
+    @property
+    def ledger_pids(self) -> list:
+        """
+        Accessor for the identifiers of the :class:`IndyLedger` worker services
+        """
+        return self._ledger_pids.copy()
+
+    def init_indy_ledgers(self, pid: str = "indy-ledger") -> list:
+        """
+        Initialize the Hyperledger Indy service workers. The number of workers is
+        determined by the INDY_LEDGER_WORKERS setting, and issuers are assigned to
+        workers by a consistent hash of the issuer ID
+
+        Args:
+            pid: the identifier for the first :class:`IndyLedger` service
+
+        Returns:
+            a list of tuples of the service name and :class:`IndyLedger` instance
+        """
+        workers = max(int(self._env.get("INDY_LEDGER_WORKERS") or 1), 1)
+        ledgers = [("ledger", self.init_indy_ledger(pid))]
+        for idx in range(1, workers):
+            ledgers.append((
+                "ledger-{}".format(idx),
+                self.init_indy_ledger("{}-{}".format(pid, idx)),
+            ))
+        return ledgers
+
+    @property
+    def verifier_pids(self) -> list:
+        """
+        Accessor for the identifiers of the services used to verify proofs: the
+        dedicated verifier services if any, otherwise the ledger workers
+        """
+        return (self._verifier_pids or self._ledger_pids).copy()
+
+    def init_indy_verifiers(self, pid: str = "indy-verifier") -> list:
+        """
+        Initialize the dedicated proof verification services. These are :class:`IndyLedger`
+        services without issuers, each run in its own process so that verification
+        does not compete with issuance for an event loop. The number of services is
+        determined by the INDY_VERIFIER_WORKERS setting, and may be zero
+
+        Args:
+            pid: the identifier for the first verifier service
+
+        Returns:
+            a list of tuples of the service name and :class:`IndyLedger` instance
+        """
+        workers = max(int(self._env.get("INDY_VERIFIER_WORKERS") or 0), 0)
+        return [
+            (
+                "verifier" if idx == 0 else "verifier-{}".format(idx),
+                self.init_indy_ledger(pid if idx == 0 else "{}-{}".format(pid, idx)),
+            )
+            for idx in range(workers)
+        ]
+
     def init_indy_ledger(self, pid: str = "indy-ledger") -> indy.IndyLedger:
         """
         Initialize the Hyperledger Indy service
@@ -121,11 +191,22 @@ class StandardServiceManager(manager.ServiceManager):
             raise ValueError("INDY_LEDGER_URL not defined")
 
         spec = {
+            "agent_concurrency": self._env.get("INDY_AGENT_CONCURRENCY"),
             "auto_register": self._env.get("AUTO_REGISTER_DID", 1),
             "genesis_path": genesis_path,
+            "ledger_cache_path": self._env.get("LEDGER_CACHE_PATH"),
             "ledger_url": ledger_url,
+            "ledger_status_ttl": self._env.get("LEDGER_STATUS_TTL", 10),
+            "nym_cache_ttl": self._env.get("INDY_NYM_CACHE_TTL", 300),
+            "read_cache_size": self._env.get("INDY_READ_CACHE_SIZE", 1000),
+            "schema_cache_ttl": self._env.get("INDY_SCHEMA_CACHE_TTL"),
+            "schema_sync_concurrency": self._env.get("INDY_SCHEMA_SYNC_CONCURRENCY", 4),
+            "sync_concurrency": self._env.get("INDY_SYNC_CONCURRENCY", 8),
+            "verifier_concurrency": self._env.get("INDY_VERIFIER_CONCURRENCY"),
+            "verify_cache_size": self._env.get("INDY_VERIFY_CACHE_SIZE", 500),
+            "verify_cache_ttl": self._env.get("INDY_VERIFY_CACHE_TTL", 600),
         }
-        LOGGER.info("Initializing Indy ledger service")
+        LOGGER.info("Initializing Indy ledger service: %s", pid)
         return indy.IndyLedger(pid, self._exchange, self._env, spec)
 
     def init_issuer_manager(self, pid: str = "issuer-manager") -> issuer.IssuerManager:
@@ -158,7 +239,7 @@ class StandardServiceManager(manager.ServiceManager):
                 "Initializing processor for services: %s",
                 ", ".join(issuer_ids),
             )
-            mgr = issuer.IssuerManager(pid, self._exchange, self._env)
+            mgr = issuer.IssuerManager(pid, self._exchange, self._env, self.ledger_pids)
             for issuer_cfg in issuers:
                 if "api_url" not in issuer_cfg:
                     issuer_cfg["api_url"] = self._env.get("TOB_API_URL")
@@ -178,4 +259,5 @@ class StandardServiceManager(manager.ServiceManager):
         """
         config_requests = self.services_config('proof_requests')
         LOGGER.info('Initializing proof request manager')
-        return prover.ProverManager(pid, self._exchange, self._env, config_requests)
+        return prover.ProverManager(
+            pid, self._exchange, self._env, config_requests, self.verifier_pids)
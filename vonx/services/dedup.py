@@ -0,0 +1,94 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from typing import Awaitable, Callable, Mapping
+
+from .cache import TTLCache
+from .util import to_bool
+
+
+class IssueDedup:
+    """
+    Detect repeated submissions of credential requests. A request repeated with the
+    same idempotency key joins an issuance already in progress, or receives the recent
+    result, and reusing a key for a different credential is refused. Requests without
+    a key are only matched by a digest of their attributes if enabled, as they may be
+    deliberate re-issues of the same credential
+
+    Args:
+        size: the number of recent results and idempotency keys retained
+        ttl: the lifetime in seconds of each result and key, or None for no expiry
+        attributes: whether to deduplicate requests without an idempotency key
+    """
+
+    def __init__(self, size: int = 10000, ttl: float = 300, attributes: bool = False):
+        self._attributes = attributes
+        self._issued = TTLCache(size, ttl)
+        self._keys = TTLCache(size, ttl)
+
+    @classmethod
+    def from_env(cls, env: Mapping) -> "IssueDedup":
+        """
+        Create the deduplication caches from the ISSUER_DEDUP_* application settings
+        """
+        env = env or {}
+        ttl = env.get("ISSUER_DEDUP_TTL", 300)
+        return cls(
+            env.get("ISSUER_DEDUP_CACHE_SIZE", 10000),
+            float(ttl) if ttl not in (None, "") else None,
+            to_bool(env.get("ISSUER_DEDUP_ATTRIBUTES")))
+
+    def check_key(self, request) -> bool:
+        """
+        Record the credential submitted with an idempotency key, and check that a
+        repeated key is submitted with the same credential
+
+        Args:
+            request: the :class:`IssueCredRequest`
+
+        Returns:
+            False if the key has already been used for a different credential
+        """
+        if not request.idempotency_key:
+            return True
+        digest = request.payload_digest
+        known = self._keys.get(request.idempotency_key)
+        if known is None:
+            self._keys.put(request.idempotency_key, digest)
+        return known is None or known == digest
+
+    async def load(self, request, issue: Callable[[], Awaitable],
+                   store: Callable = None):
+        """
+        Issue a credential, unless the same request has been issued recently or is
+        being issued already
+
+        Args:
+            request: the :class:`IssueCredRequest`
+            issue: a function returning an awaitable which issues the credential
+            store: a function accepting the result and returning whether to keep it
+        """
+        if not request.idempotency_key and not self._attributes:
+            return await issue()
+        return await self._issued.load(request.dedup_key, issue, store=store)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the statistics of the cache of recent results
+        """
+        return self._issued.stats
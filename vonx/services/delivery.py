@@ -0,0 +1,204 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import asyncio
+import logging
+from typing import Callable, Mapping
+
+from .indy import IndyCredential, IndyStoredCredential
+from .outbox import CredentialOutbox
+from .tob import TobClientError
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OutboxDelivery:
+    """
+    Deliver the credentials recorded in a :class:`CredentialOutbox` to TheOrgBook in
+    the background, grouped by issuer. Delivered credentials are acknowledged, and failed
+    deliveries are retried with an increasing delay
+
+    Args:
+        outbox: the credential outbox
+        api_client: a function returning the :class:`TobClient` for an issuer
+        issuer_ready: a function returning whether an issuer has completed its sync
+        batch_size: the maximum number of credentials delivered at once
+        interval: the time in seconds between checks for due credentials, and the
+            base delay before a failed delivery is retried
+        retry_max: the maximum delay in seconds before a failed delivery is retried
+    """
+
+    def __init__(self, outbox: CredentialOutbox, api_client: Callable,
+                 issuer_ready: Callable[[str], bool], batch_size: int = 50,
+                 interval: float = 1, retry_max: float = 300):
+        self._outbox = outbox
+        self._api_client = api_client
+        self._issuer_ready = issuer_ready
+        self._batch_size = max(int(batch_size or 50), 1)
+        self._interval = float(interval or 1)
+        self._retry_max = float(retry_max or 300)
+        self._running = False
+        self._task = None
+        self._wake = None
+
+    @classmethod
+    def from_env(cls, env: Mapping, api_client: Callable,
+                 issuer_ready: Callable[[str], bool]) -> "OutboxDelivery":
+        """
+        Create the outbox delivery from the ISSUER_OUTBOX_* application settings
+
+        Returns:
+            the :class:`OutboxDelivery` instance, or None if ISSUER_OUTBOX_PATH is not set
+        """
+        env = env or {}
+        if not env.get("ISSUER_OUTBOX_PATH"):
+            return None
+        outbox = CredentialOutbox(
+            env["ISSUER_OUTBOX_PATH"],
+            env.get("ISSUER_OUTBOX_SEGMENT_SIZE") or 16777216,
+            env.get("ISSUER_OUTBOX_FLUSH_INTERVAL") or 0,
+            env.get("ISSUER_OUTBOX_INDEX_INTERVAL") or 0)
+        return cls(
+            outbox,
+            api_client,
+            issuer_ready,
+            env.get("ISSUER_OUTBOX_BATCH_SIZE"),
+            env.get("ISSUER_OUTBOX_DELIVERY_INTERVAL"),
+            env.get("ISSUER_OUTBOX_RETRY_MAX"))
+
+    async def start(self) -> None:
+        """
+        Open the outbox and start delivering credentials on the current event loop
+        """
+        await asyncio.get_event_loop().run_in_executor(None, self._outbox.open)
+        self._wake = asyncio.Event()
+        self._running = True
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop delivering credentials, and save the outbox index so that the journal
+        does not need to be scanned on restart
+        """
+        if self._task:
+            # wait_for may swallow the cancellation if the wake event is set at the
+            # same time, so the delivery loop also checks whether it is still running
+            self._running = False
+            self._task.cancel()
+            await asyncio.wait([self._task])
+            self._task = None
+            await self._outbox.save_index()
+            self._outbox.close()
+
+    async def queue(self, issuer_id: str, cred: IndyCredential) -> IndyStoredCredential:
+        """
+        Durably record a credential in the outbox for delivery to TheOrgBook
+
+        Args:
+            issuer_id: the unique identifier of the issuer service
+            cred: the created credential
+
+        Returns:
+            an :class:`IndyStoredCredential` with the outbox record identifier as its result
+        """
+        rec_id = await self._outbox.add(issuer_id, {
+            "issuer_id": cred.issuer_id,
+            "schema_name": cred.schema_name,
+            "issuer_did": cred.issuer_did,
+            "cred_data": cred.cred_data,
+            "cred_def": cred.cred_def,
+            "cred_req_metadata": cred.cred_req_metadata,
+            "cred_revoc_id": cred.cred_revoc_id,
+        })
+        self._wake.set()
+        return IndyStoredCredential(None, cred, {"outbox_id": rec_id, "status": "queued"})
+
+    async def _run(self) -> None:
+        """
+        Deliver the credentials in the outbox until stopped
+        """
+        #pylint: disable=broad-except
+        while self._running:
+            try:
+                delivered = await self.deliver_batch()
+            except Exception:
+                LOGGER.exception("Error delivering credentials from outbox:")
+                delivered = 0
+            if not delivered:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def deliver_batch(self) -> int:
+        """
+        Deliver the next batch of due credentials in the outbox, grouped by issuer
+
+        Returns:
+            the number of credentials delivered
+        """
+        rec_ids = self._outbox.due(self._batch_size)
+        if not rec_ids:
+            return 0
+        groups = {}
+        for record in await self._outbox.read(rec_ids):
+            if not self._issuer_ready(record["issuer_id"]):
+                self._outbox.defer(record["id"], self._interval)
+            else:
+                groups.setdefault(record["issuer_id"], []).append(record)
+
+        acked = []
+        failed = []
+
+        async def deliver(issuer_id, records):
+            #pylint: disable=broad-except
+            try:
+                api_client = self._api_client(issuer_id)
+                stored = await api_client.store_credentials(
+                    [IndyCredential(**record["cred"]) for record in records])
+            except Exception as e:
+                if not isinstance(e, TobClientError):
+                    LOGGER.exception("Error delivering credentials for issuer %s", issuer_id)
+                stored = [e] * len(records)
+            for record, reply in zip(records, stored):
+                if isinstance(reply, IndyStoredCredential):
+                    acked.append(record["id"])
+                else:
+                    LOGGER.warning(
+                        "Error delivering credential %s from outbox: %s", record["id"], reply)
+                    failed.append(record["id"])
+
+        # each group records its own results, so one failed group does not prevent
+        # the others from being acknowledged
+        await asyncio.gather(*(
+            deliver(issuer_id, records) for (issuer_id, records) in groups.items()))
+        if failed:
+            await self._outbox.retry(failed, self._interval, self._retry_max)
+        if acked:
+            await self._outbox.ack(acked)
+        if acked or failed:
+            await self._outbox.checkpoint()
+        return len(acked)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the outbox statistics
+        """
+        return self._outbox.status
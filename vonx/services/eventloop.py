@@ -16,11 +16,17 @@
 #
 
 import asyncio
+from collections import deque
 from concurrent.futures import Executor, Future
-from threading import get_ident, Event, Thread
-from typing import Awaitable, Callable, Coroutine
+from threading import current_thread, get_ident, Event, Thread
+import sys
+import time
+import traceback
+from typing import Awaitable, Callable, Coroutine, Mapping
 import logging
 
+from .util import to_bool
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -60,13 +66,148 @@ def run_in_executor(executor: Executor, coro: Coroutine) -> Future:
     return future
 
 
+class LoopMonitor:
+    """
+    Sample the scheduling lag of an event loop and record callbacks which block
+    the loop for longer than a threshold, including the stack of the loop thread
+    at the time of the stall
+
+    Args:
+        threshold: the duration in seconds after which a blocked loop is reported
+        interval: the interval in seconds between lag samples
+        max_slow: the number of slow callback records to retain
+    """
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.25, max_slow: int = 20):
+        self._threshold = threshold
+        self._interval = interval
+        self._loop = None
+        self._handle = None
+        self._watchdog = None
+        self._thread_ident = None
+        self._active = False
+        self._last_tick = None
+        self._stall_reported = False
+        self._counts = [0] * (len(self.BUCKETS) + 1)
+        self._samples = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._slow = deque(maxlen=max_slow)
+        self._slow_total = 0
+
+    @classmethod
+    def from_env(cls, env: Mapping) -> 'LoopMonitor':
+        """
+        Create a monitor instance if enabled by the `LOOP_MONITOR` setting
+
+        Args:
+            env: the application settings
+        Returns:
+            a new :class:`LoopMonitor`, or None if monitoring is disabled
+        """
+        if not env or not to_bool(env.get('LOOP_MONITOR')):
+            return None
+        threshold = float(env.get('LOOP_MONITOR_THRESHOLD') or 100) / 1000.0
+        interval = float(env.get('LOOP_MONITOR_INTERVAL') or 250) / 1000.0
+        return cls(threshold, interval)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Begin sampling the event loop. Must be called from the event loop thread
+        """
+        if self._active:
+            return
+        self._active = True
+        self._loop = loop
+        self._thread_ident = get_ident()
+        self._last_tick = time.monotonic()
+        self._handle = loop.call_later(self._interval, self._tick, loop.time() + self._interval)
+        self._watchdog = Thread(target=self._watch)
+        self._watchdog.daemon = True
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling the event loop
+        """
+        self._active = False
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    def _tick(self, expected: float) -> None:
+        """
+        Record the difference between the scheduled and actual callback time
+        """
+        if not self._active:
+            return
+        now = self._loop.time()
+        lag = max(now - expected, 0.0)
+        self._last_tick = time.monotonic()
+        self._stall_reported = False
+        idx = 0
+        while idx < len(self.BUCKETS) and lag > self.BUCKETS[idx]:
+            idx += 1
+        self._counts[idx] += 1
+        self._samples += 1
+        self._lag_total += lag
+        self._lag_max = max(self._lag_max, lag)
+        self._handle = self._loop.call_later(self._interval, self._tick, now + self._interval)
+
+    def _watch(self) -> None:
+        """
+        Watchdog thread which captures the loop thread's stack when the loop stalls
+        """
+        while self._active:
+            time.sleep(min(self._interval, self._threshold) / 2)
+            stalled = time.monotonic() - self._last_tick - self._interval
+            if stalled > self._threshold and not self._stall_reported:
+                self._stall_reported = True
+                frame = sys._current_frames().get(self._thread_ident) #pylint: disable=protected-access
+                stack = ''.join(traceback.format_stack(frame)) if frame else None
+                self._slow.append({
+                    'time': time.time(),
+                    'blocked': round(stalled, 4),
+                    'stack': stack,
+                })
+                self._slow_total += 1
+                LOGGER.warning('Event loop blocked for at least %.3fs:\n%s', stalled, stack)
+
+    def status(self) -> dict:
+        """
+        Get the lag histogram and recent slow callbacks in a JSON-compatible format
+        """
+        buckets = {}
+        for idx, bound in enumerate(self.BUCKETS):
+            buckets['le_{}ms'.format(int(bound * 1000))] = self._counts[idx]
+        buckets['inf'] = self._counts[-1]
+        return {
+            'lag': {
+                'buckets': buckets,
+                'samples': self._samples,
+                'mean': round(self._lag_total / self._samples, 6) if self._samples else 0.0,
+                'max': round(self._lag_max, 6),
+            },
+            'slow_callbacks': list(self._slow),
+            'slow_total': self._slow_total,
+        }
+
+
 class Runner:
     """
     Run a new event loop in a separate thread and allow tasks to be submitted to it
+
+    Args:
+        loop: an optional event loop to run, otherwise a new loop is created
+        monitor: an optional :class:`LoopMonitor` to sample the running loop
     """
-    def __init__(self, loop=None):
+    def __init__(self, loop=None, monitor: LoopMonitor = None):
         self._active = False
+        self._attached = False
         self._loop = loop
+        self._monitor = monitor
         self._thread = None
 
     @property
@@ -76,6 +217,13 @@ class Runner:
         """
         return self._loop
 
+    @property
+    def monitor(self) -> LoopMonitor:
+        """
+        Accessor for the event loop monitor, if any
+        """
+        return self._monitor
+
     def start(self, wait: bool = True) -> None:
         """
         Run the event loop in a new thread
@@ -94,6 +242,29 @@ class Runner:
         if event:
             event.wait()
 
+    def attach(self, loop: asyncio.AbstractEventLoop = None) -> None:
+        """
+        Adopt an event loop which is already running in the current thread (such as
+        the web server's loop) instead of starting a new thread
+
+        Args:
+            loop: the running event loop, defaulting to the current event loop
+        """
+        if self._active:
+            return
+        self._loop = loop or asyncio.get_event_loop()
+        self._thread = current_thread()
+        self._attached = True
+        self._active = True
+        if self._monitor:
+            self._monitor.start(self._loop)
+
+    def in_loop_thread(self) -> bool:
+        """
+        Check whether the caller is running in the event loop thread
+        """
+        return self._thread is not None and get_ident() == self._thread.ident
+
     def _run(self, event=None) -> None:
         """
         The main logic of the event loop thread
@@ -101,6 +272,8 @@ class Runner:
         asyncio.set_event_loop(self._loop)
         def _ready():
             self._active = True
+            if self._monitor:
+                self._monitor.start(self._loop)
             if event:
                 event.set()
         self._loop.call_soon(_ready)
@@ -113,8 +286,16 @@ class Runner:
         Args:
             wait: block until the event loop has been stopped
         """
+        if self._attached:
+            # the loop is owned by someone else, only stop using it
+            self._active = False
+            if self._monitor:
+                self._monitor.stop()
+            return
         def _finish():
             self._active = False
+            if self._monitor:
+                self._monitor.stop()
             self._loop.stop()
         self._loop.call_soon_threadsafe(_finish)
         if wait:
@@ -124,6 +305,8 @@ class Runner:
         """
         Wait for the event loop thread to terminate
         """
+        if self._attached:
+            return None
         return self._thread.join()
 
     def _add_task(self, coro: Awaitable, future: Future = None) -> asyncio.Future:
@@ -148,7 +331,7 @@ class Runner:
         """
         if not self._active:
             raise RuntimeError('Runner is not active')
-        if get_ident() == self._thread.ident:
+        if self.in_loop_thread():
             result = self._add_task(coro)
         else:
             fut = Future()
@@ -589,21 +589,30 @@ class RequestExecutor(MessageProcessor):
     Processing should not block the main thread (much) to avoid breaking asyncio.
     """
 
-    def __init__(self, pid, exchange: Exchange):
+    def __init__(self, pid, exchange: Exchange, monitor: eventloop.LoopMonitor = None):
         super(RequestExecutor, self).__init__(pid, exchange)
         self._connector = None
+        self._monitor = monitor
         self._out_queue = None
         self._req_lock = None
         self._requests = {}
         self._runner = None
 
-    def start(self, wait: bool = True) -> None:
+    def start(self, wait: bool = True, loop: asyncio.AbstractEventLoop = None) -> None:
         """
         Initialize our :class:`eventloop.Runner` and run our polling thread to listen for messages
+
+        Args:
+            wait: block until the event loop is running
+            loop: an event loop already running in the current thread to bind to, instead
+                of starting a new event loop thread
         """
         self._out_queue = Queue()
-        self._runner = eventloop.Runner()
-        self._runner.start(wait)
+        self._runner = eventloop.Runner(monitor=self._monitor)
+        if loop:
+            self._runner.attach(loop)
+        else:
+            self._runner.start(wait)
         self._req_lock = asyncio.Lock(loop=self._runner.loop)
         # Send outgoing messages to the exchange (without blocking our event loop)
         self.run_thread(self._send_messages)
@@ -629,6 +638,15 @@ class RequestExecutor(MessageProcessor):
         """
         return self._runner
 
+    @property
+    def loop_status(self) -> dict:
+        """
+        Accessor for the lag statistics of our event loop, if monitoring is enabled
+        """
+        if self._monitor:
+            return self._monitor.status()
+        return None
+
     def stop(self, wait: bool = True) -> None:
         """
         Stop our polling thread and any other tasks in progress
@@ -737,6 +755,11 @@ class RequestExecutor(MessageProcessor):
             request: the body of the message to be sent
             timeout: an optional timeout to wait before cancelling the request
         """
+        if self._runner.in_loop_thread():
+            # already in our event loop, so the response can be awaited natively
+            result = self._runner.loop.create_future()
+            self.run_task(self._send_request(to_pid, request, result, timeout))
+            return result
         result = Future()
         self.run_task(self._send_request(to_pid, request, result, timeout))
         return asyncio.wrap_future(result)
@@ -753,7 +776,7 @@ class RequestExecutor(MessageProcessor):
         if received.ref:
             async with self._req_lock:
                 if received.ref in self._requests:
-                    if not self._requests[received.ref].cancelled():
+                    if not self._requests[received.ref].done():
                         self._requests[received.ref].set_result(received.message)
                     result = True
                 self._requests = {
@@ -793,9 +816,15 @@ class RequestExecutor(MessageProcessor):
         Return a connection pool associated with this event loop which allows HTTP session reuse
         """
         if not self._connector:
-            self._connector = aiohttp.TCPConnector()
+            self._connector = aiohttp.TCPConnector(**self._connector_args())
         return self._connector
 
+    def _connector_args(self) -> dict:
+        """
+        Get the keyword arguments used to construct our shared :class:`TCPConnector`
+        """
+        return {}
+
     def http_client(self, *args, **kwargs) -> aiohttp.ClientSession:
         """
         Construct an HTTP client using the shared connection pool
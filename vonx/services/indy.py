@@ -18,31 +18,28 @@
 import asyncio
 import json
 import logging
+import os
 import pathlib
+import time
 from typing import Mapping
-import uuid
 
 import aiohttp
 from didauth.indy import seed_to_did
-from von_agent.agents import (
-    _BaseAgent,
-    Issuer as VonIssuer,
-    HolderProver as VonHolderProver,
-    Verifier as VonVerifier,
-)
+from von_agent.agents import _BaseAgent, Issuer as VonIssuer
 from von_agent.error import AbsentSchema, AbsentCredDef
-from von_agent.nodepool import NodePool
-from von_agent.wallet import Wallet
-from von_agent.util import cred_def_id, revealed_attrs, schema_id, schema_key
+from von_agent.util import cred_def_id, schema_id, schema_key
 
+from .agents import AgentWrapper, IndyIssuerConfig, NodePoolRegistry
 from .base import (
     Exchange,
     ServiceBase,
     ServiceRequest,
     ServiceResponse,
     ServiceError)
+from .ledgercache import LedgerReadCache, LedgerStatusCache
 from .schema import Schema
 from .util import log_json
+from .verifier import ProofVerifier
 
 LOGGER = logging.getLogger(__name__)
 
@@ -61,6 +58,22 @@ class IndyLedgerStatusReq(ServiceRequest):
     pass
 
 
+class IndyLedgerStatus(ServiceResponse):
+    """
+    The message class representing the status of the remote ledger
+
+    Args:
+        status (dict): the status reported by the ledger (von-network)
+        fetched (float): the time the status was retrieved, in seconds since the epoch
+        ttl (float): the number of seconds the status should be considered current
+    """
+    _fields = (
+        ('status', dict),
+        ('fetched', float),
+        ('ttl', float),
+    )
+
+
 class IndyCreateCredOfferReq(ServiceRequest):
     """
     The message class representing an request to create a credential offer
@@ -92,6 +105,38 @@ class IndyCredOffer(ServiceResponse):
         ('cred_def', dict),
     )
 
+class IndyCreateCredOffersReq(ServiceRequest):
+    """
+    The message class representing a request to create multiple credential offers
+    for the same issuer and schema
+
+    Args:
+        issuer_id (str): the identifier of the issuer service
+        schema_def (Schema): the schema used to create the credential offers
+        count (int): the number of offers to create
+        background (bool): whether the offers are being prepared in advance, in which
+            case they are only created while the issuer has no other operations in progress
+    """
+    _fields = (
+        ('issuer_id', str),
+        ('schema_def', Schema),
+        ('count', int),
+        ('background', bool, False),
+    )
+
+
+class IndyCredOfferList(ServiceResponse):
+    """
+    The message class representing the result of creating multiple credential offers
+
+    Args:
+        offers (list): a list of :class:`IndyCredOffer` instances
+    """
+    _fields = (
+        ('offers', list),
+    )
+
+
 class IndyCreateCredRequestReq(ServiceRequest):
     """
     The message class representing an request to create a credential request
@@ -149,6 +194,31 @@ class IndyCredential(ServiceResponse):
     )
 
 
+class IndyCreateCredentialsReq(ServiceRequest):
+    """
+    The message class representing a request to create multiple credentials
+
+    Args:
+        requests (list): a list of :class:`IndyCreateCredentialReq` instances
+    """
+    _fields = (
+        ('requests', list),
+    )
+
+
+class IndyCredentialList(ServiceResponse):
+    """
+    The message class representing the result of creating multiple credentials
+
+    Args:
+        results (list): an :class:`IndyCredential` or :class:`IndyLedgerError` instance
+            for each credential requested, in the same order
+    """
+    _fields = (
+        ('results', list),
+    )
+
+
 class IndyStoreCredentialReq(ServiceRequest):
     """
     The message class representing an request to store a credential
@@ -199,6 +269,24 @@ class IndyRegisterIssuerReq(ServiceRequest):
     )
 
 
+class IndyRegisterIssuersReq(ServiceRequest):
+    """
+    The message class representing a request to register multiple issuers at once
+    """
+    _fields = (
+        ('configs', list),
+    )
+
+
+class IndyIssuerStatusList(ServiceResponse):
+    """
+    The message class representing the status of multiple registered issuers
+    """
+    _fields = (
+        ('statuses', dict),
+    )
+
+
 class IndyIssuerStatusReq(ServiceRequest):
     """
     The message class representing a request for an issuer status update
@@ -238,192 +326,6 @@ class IndyVerifiedProof(ServiceResponse):
     )
 
 
-class WalletConfig:
-    """
-    Manage configuration settings for an Indy wallet
-    """
-    def __init__(self, **params):
-        self.name = params.get("name")
-        if not self.name:
-            raise ValueError("Missing wallet name")
-        self.seed = params.get("seed")
-        if not self.seed:
-            raise ValueError("Missing seed for wallet '{}'".format(self.name))
-        if len(self.seed) != 32:
-            raise ValueError(
-                "Wallet seed length is not 32 characters: {}".format(self.seed)
-            )
-        self.genesis_path = params.get("genesis_path")
-        self.type = params.get("type", None)  # or virtual?
-        self.params = params.get("params", {})
-        if "freshness_time" not in self.params:
-            self.params["freshness_time"] = 0
-        self.creds = {"key": ""}
-
-
-class AgentWrapper:
-    """
-    A wrapper for the :class:`_BaseAgent` instance which handles configuration loading
-    and allows the wallet to be kept open between requests
-    """
-
-    def __init__(self, wallet_config: WalletConfig, instance_cls,
-                 issuer_type: str, ext_cfg=None):
-        if not wallet_config.genesis_path:
-            raise ValueError("Missing genesis_path for wallet configuration")
-
-        self._pool = NodePool(
-            wallet_config.name + "-" + issuer_type, wallet_config.genesis_path
-        )
-
-        self._instance_cls = instance_cls
-        self._instance = None
-        self._wallet = Wallet(
-            self._pool,
-            wallet_config.seed,
-            wallet_config.name + "-" + issuer_type + "-Wallet",
-            wallet_config.type,
-            wallet_config.params,
-            wallet_config.creds,
-        )
-        self._ext_cfg = ext_cfg
-        self._opened = None
-        self._keep_open = False
-
-    @property
-    def opened(self) -> bool:
-        """
-        Return current state of the :class:`_BaseAgent` instance
-        """
-        return self._opened is not None
-
-    @property
-    def instance(self):
-        """
-        Accessor for the opened :class:`_BaseAgent` instance
-        """
-        return self._instance
-
-    def keep_open(self, flag=True):
-        """
-        Set the keep-open flag to keep the wallet open between requests
-        """
-        self._keep_open = flag
-
-    async def open(self, keep_open=True) -> _BaseAgent:
-        """
-        Open the connection to the transaction pool and wallet
-        """
-        if keep_open:
-            self._keep_open = True
-        if self._opened:
-            return self._opened
-        await self._pool.open()
-        self._instance = self._instance_cls(
-            await self._wallet.create(), self._ext_cfg
-        )
-        self._opened = await self._instance.open()
-        if isinstance(self._instance, VonHolderProver):
-            # NOTE: should only create this once,
-            # and only in the root wallet (virtual_wallet == None)
-            await self._instance.create_link_secret(str(uuid.uuid4()))
-        return self._opened
-
-    async def close(self):
-        """
-        Close the wallet and transaction pool connections
-        """
-        if self._opened:
-            await self._instance.close()
-            await self._pool.close()
-        self._opened = None
-        self._keep_open = False
-
-    async def __aenter__(self):
-        return await self.open(False)
-
-    async def __aexit__(self, exc_type, exc_value, traceback):
-        if exc_type is not None:
-            LOGGER.exception("Exception in VON %s:", self._wallet.name)
-        if not self._keep_open:
-            await self.close()
-
-
-class IndyIssuerConfig:
-    """
-    Manage configuration settings for an Issuer, including wallet settings
-    and schemas bound for the ledger
-    """
-    def __init__(self, **params):
-        self.agent = None
-        self.auto_register = params.get("auto_register", True)
-        self.did = params.get("did")
-        self.endpoint = params.get("endpoint")
-        self.ident = params.get("id")
-        self.manager_pid = params.get("manager_pid")
-        self.registered = False
-        self.schemas = []
-        self.synced = False
-        self.wrapper = None
-        wallet_cfg = params.get("wallet") or {}
-        if "name" not in wallet_cfg:
-            wallet_cfg["name"] = self.ident
-        self.wallet_config = WalletConfig(**wallet_cfg)
-
-        schemas = params.get("schemas")
-        if schemas:
-            for schema in schemas:
-                self.add_schema(schema)
-
-    @property
-    def extended_config(self):
-        """
-        Accessor for the extended :class:`Issuer` configuration
-        """
-        ret = {}
-        if self.endpoint:
-            ret["endpoint"] = self.endpoint
-        return ret
-
-    def add_schema(self, schema: Schema):
-        """
-        Add a schema to the Issuer definition
-
-        Args:
-            schema: the :class:`Schema` to be added
-        """
-        self.schemas.append({
-            "definition": schema.copy(),
-            "ledger": None,
-            "cred_def": None,
-        })
-
-    def get_schema_config(self, match: Schema) -> dict:
-        """
-        Find the extended information for a specific schema, including the ledger schema
-        definition and credential definition (if any)
-
-        Args:
-            match: the :class:`Schema` to be located
-        """
-        for schema in self.schemas:
-            defn = schema["definition"]
-            if defn.compare(match):
-                return schema
-        return None
-
-    @property
-    def status(self) -> dict:
-        """
-        Get the current status of the issuer
-        """
-        return {
-            "did": self.did,
-            "registered": self.registered,
-            "synced": self.synced,
-        }
-
-
 class IndyLedger(ServiceBase):
     """
     A class for managing interactions with the Hyperledger Indy ledger
@@ -435,8 +337,14 @@ class IndyLedger(ServiceBase):
         self._genesis_path = None
         self._issuers = {}
         self._ledger_url = None
-        self._verifier = None
+        self._ledger_status = LedgerStatusCache(self._fetch_ledger_status, self.run_task)
+        self._ledger_status_client = None
+        self._node_pools = NodePoolRegistry("{}-pool".format(pid))
         self._update_config(spec)
+        self._ledger_cache = LedgerReadCache.from_config(self._config)
+        # each ledger worker process requires its own verifier wallet
+        self._verifier = ProofVerifier.from_config(
+            "GenericVerifier" if pid == "indy-ledger" else "GenericVerifier-" + pid, self._config)
 
     def _update_config(self, spec) -> None:
         """
@@ -454,11 +362,67 @@ class IndyLedger(ServiceBase):
         """
         await asyncio.sleep(1)  # avoid odd TimeoutError on genesis txn retrieval
         await self._check_genesis_path()
-        synced = True
-        for issuer in self._issuers.values():
-            if not await self._sync_issuer(issuer):
-                synced = False
-        return synced
+        # each ledger worker caches the artifacts of its own issuers
+        await self._ledger_cache.load_artifacts(
+            self._config.get("ledger_cache_path"), self._genesis_path,
+            self.pid if self.pid != "indy-ledger" else None)
+        limit = asyncio.Semaphore(int(self._config.get("sync_concurrency") or 1))
+
+        async def sync_one(issuer):
+            #pylint: disable=broad-except
+            async with limit:
+                try:
+                    return await self._sync_issuer(issuer)
+                except Exception:
+                    LOGGER.exception("Error syncing issuer %s:", issuer.ident)
+                    return False
+
+        results = await asyncio.gather(
+            *(sync_one(issuer) for issuer in list(self._issuers.values())))
+        await self._ledger_cache.save_artifacts()
+        return all(results)
+
+    async def _revalidate_issuer(self, issuer: 'IndyIssuerConfig') -> None:
+        """
+        Confirm cached ledger artifacts for an issuer against the ledger in the background,
+        replacing any values which have changed
+
+        Args:
+            issuer: the Indy issuer configuration
+        """
+        #pylint: disable=broad-except
+        try:
+            await self._check_registration(
+                issuer.agent, self._auto_register(issuer), use_cache=False)
+            for schema in issuer.schemas:
+                current = {"definition": schema["definition"]}
+                await self._publish_schema(issuer.agent, current, use_cache=False)
+                if current["ledger"] != schema.get("ledger") or \
+                        current["credential_definition"] != schema.get("credential_definition"):
+                    LOGGER.warning(
+                        "Cached ledger artifacts were stale for %s: %s",
+                        issuer.ident, schema["definition"])
+                    schema["ledger"] = current["ledger"]
+                    schema["credential_definition"] = current["credential_definition"]
+            await self._ledger_cache.save_artifacts()
+            LOGGER.info("Revalidated cached ledger artifacts for %s", issuer.ident)
+        except Exception:
+            LOGGER.exception("Error revalidating cached ledger artifacts for %s:", issuer.ident)
+
+    def _get_status(self) -> dict:
+        """
+        Include the agent utilisation of each issuer in the service status
+        """
+        status = super(IndyLedger, self)._get_status()
+        status["node_pools"] = self._node_pools.status
+        status["read_cache"] = self._ledger_cache.stats
+        status["verifier"] = self._verifier.status
+        status["verify_cache"] = self._verifier.cache_stats
+        status["issuers"] = {
+            issuer_id: dict(issuer.status, agents=issuer.agents.status)
+            for issuer_id, issuer in self._issuers.items()
+        }
+        return status
 
     def _add_issuer(self, **params) -> str:
         """
@@ -469,6 +433,8 @@ class IndyLedger(ServiceBase):
         """
         if "id" not in params:
             raise ValueError("Missing 'id' for issuer")
+        if not params.get("agent_concurrency"):
+            params["agent_concurrency"] = self._config.get("agent_concurrency")
         cfg = IndyIssuerConfig(**params)
         self._issuers[cfg.ident] = cfg
         return cfg.ident
@@ -508,30 +474,41 @@ class IndyLedger(ServiceBase):
                     VonIssuer,
                     "Issuer",
                     issuer.extended_config,
+                    self._node_pools,
                 )
 
             # FIXME - catch sync exceptions here
             if not issuer.agent:
                 issuer.agent = await issuer.wrapper.open()
                 issuer.did = issuer.agent.did
+            if not issuer.agents.ready:
+                issuer.agents.open(issuer.agent)
 
+            artifacts = self._ledger_cache.artifacts
+            cached = False
             if not issuer.registered:
-                # check DID is registered
-                auto_register = (
-                    self._config.get("auto_register", True)
-                    and issuer.auto_register
-                )
-                await self._check_registration(issuer.agent, auto_register)
+                if artifacts and artifacts.get_nym(issuer.did):
+                    cached = True
+                else:
+                    # check DID is registered
+                    await self._check_registration(issuer.agent, self._auto_register(issuer))
 
                 # check endpoint is registered (if any)
                 # await self._check_endpoint(issuer.agent, issuer.endpoint)
                 issuer.registered = True
 
             # publish schemas
-            for schema in issuer.schemas:
-                await self._publish_schema(issuer.agent, schema)
+            limit = asyncio.Semaphore(int(self._config.get("schema_sync_concurrency") or 1))
+            async def publish(schema):
+                async with limit:
+                    return await self._publish_schema(issuer.agent, schema)
+            checked = await asyncio.gather(*(publish(schema) for schema in issuer.schemas))
+            if not all(checked):
+                cached = True
 
             issuer.synced = True
+            if cached:
+                self.run_task(self._revalidate_issuer(issuer))
             if issuer.manager_pid:
                 self.send_noreply(
                     issuer.manager_pid,
@@ -541,6 +518,12 @@ class IndyLedger(ServiceBase):
             LOGGER.info("Indy issuer synced: %s", issuer.ident)
         return issuer.synced
 
+    def _auto_register(self, issuer: 'IndyIssuerConfig') -> bool:
+        """
+        Determine whether the DID of an issuer should be registered automatically
+        """
+        return self._config.get("auto_register", True) and issuer.auto_register
+
     async def _check_genesis_path(self) -> None:
         """
         Make sure that the genesis path is defined, and download the transaction file if needed.
@@ -560,8 +543,7 @@ class IndyLedger(ServiceBase):
                         "Cannot retrieve genesis transaction without ledger_url"
                     )
                 parent_path = pathlib.Path(genesis_path.parent)
-                if not parent_path.exists():
-                    parent_path.mkdir(parents=True)
+                parent_path.mkdir(parents=True, exist_ok=True)
                 await self._fetch_genesis_txn(ledger_url, genesis_path)
             elif genesis_path.is_dir():
                 raise ValueError("genesis_path must not point to a directory")
@@ -569,7 +551,9 @@ class IndyLedger(ServiceBase):
 
     async def _fetch_genesis_txn(self, ledger_url: str, target_path: str) -> bool:
         """
-        Download the genesis transaction file from the ledger server
+        Download the genesis transaction file from the ledger server. Several ledger
+        worker processes may download the file at once, so it is written to a temporary
+        file and moved into place, and a file written by another worker is accepted
 
         Args:
             ledger_url: the root address of the von-network ledger
@@ -594,22 +578,31 @@ class IndyLedger(ServiceBase):
         if not lines or not json.loads(lines[0]):
             raise RuntimeError("Genesis transaction file is not valid JSON")
 
+        if target_path.exists():
+            return True
         # write result to provided path
-        with target_path.open("x") as output_file:
+        tmp_path = target_path.with_name("{}.{}.tmp".format(target_path.name, os.getpid()))
+        with tmp_path.open("w") as output_file:
             output_file.write(data)
+        os.replace(str(tmp_path), str(target_path))
         return True
 
-    async def _check_registration(self, agent: _BaseAgent, auto_register: bool = True) -> None:
+    async def _check_registration(self, agent: _BaseAgent, auto_register: bool = True,
+                                  use_cache: bool = True) -> None:
         """
         Look up our nym on the ledger and register it if not present
 
         Args:
             agent: the initialized and opened agent to be checked
             auto_register: whether to automatically register the DID on the ledger
+            use_cache: whether to accept a result from the ledger read cache
         """
         did = agent.did
         LOGGER.debug("Checking DID registration %s", did)
-        nym_json = await agent.get_nym(did)
+        # only cache positive results, as the DID may be registered below
+        nym_json = await self._ledger_cache.read(
+            "nym", did, lambda: agent.get_nym(did), use_cache,
+            lambda result: bool(json.loads(result)))
         LOGGER.debug("get_nym result for %s: %s", did, nym_json)
 
         nym_info = json.loads(nym_json)
@@ -642,6 +635,10 @@ class IndyLedger(ServiceBase):
                         "DID registration failed: {}".format(nym_info)
                     )
 
+        artifacts = self._ledger_cache.artifacts
+        if artifacts:
+            artifacts.set_nym(did, {"did": did, "verkey": agent.verkey})
+
     async def _check_endpoint(self, agent: _BaseAgent, endpoint: str) -> None:
         """
         Look up our endpoint on the ledger and register it if not present
@@ -662,7 +659,8 @@ class IndyLedger(ServiceBase):
             endp_info = await agent.send_endpoint()
             LOGGER.debug("Endpoint stored: %s", endp_info)
 
-    async def _publish_schema(self, issuer: VonIssuer, schema: dict) -> None:
+    async def _publish_schema(self, issuer: VonIssuer, schema: dict,
+                              use_cache: bool = True) -> bool:
         """
         Check the ledger for a specific schema and version, and publish it if not found.
         Also publish the related credential definition if not found
@@ -670,11 +668,27 @@ class IndyLedger(ServiceBase):
         Args:
             issuer: the initialized and opened issuer instance publishing the schema
             schema: a dict which will be updated with the published schema and credential def
+            use_cache: whether to accept values from the local ledger artifact cache
+
+        Returns:
+            False if any values were taken from the local cache without checking the ledger
         """
 
         if not schema or "definition" not in schema:
             raise ValueError("Missing schema definition")
         definition = schema["definition"]
+        checked = True
+        artifacts = self._ledger_cache.artifacts
+
+        if artifacts and use_cache:
+            if not schema.get("ledger"):
+                schema["ledger"] = artifacts.get_schema(
+                    issuer.did, definition.name, definition.version)
+                checked = checked and not schema["ledger"]
+            if schema.get("ledger") and not schema.get("credential_definition"):
+                schema["credential_definition"] = artifacts.get_cred_def(
+                    issuer.did, definition.name, definition.version)
+                checked = checked and not schema["credential_definition"]
 
         if not schema.get("ledger"):
             LOGGER.info(
@@ -688,7 +702,8 @@ class IndyLedger(ServiceBase):
                 s_key = schema_key(
                     schema_id(issuer.did, definition.name, definition.version)
                 )
-                schema_json = await issuer.get_schema(s_key)
+                schema_json = await self._ledger_cache.read(
+                    "schema", s_key, lambda: issuer.get_schema(s_key), use_cache)
                 ledger_schema = json.loads(schema_json)
                 log_json("Schema found on ledger:", ledger_schema, LOGGER)
             except AbsentSchema:
@@ -722,9 +737,9 @@ class IndyLedger(ServiceBase):
             )
 
             try:
-                cred_def_json = await issuer.get_cred_def(
-                    cred_def_id(issuer.did, schema["ledger"]["seqNo"])
-                )
+                cd_id = cred_def_id(issuer.did, schema["ledger"]["seqNo"])
+                cred_def_json = await self._ledger_cache.read(
+                    "cred_def", cd_id, lambda: issuer.get_cred_def(cd_id), use_cache)
                 cred_def = json.loads(cred_def_json)
                 log_json("Credential def found on ledger:", cred_def, LOGGER)
             except AbsentCredDef:
@@ -735,12 +750,20 @@ class IndyLedger(ServiceBase):
                     definition.version,
                 )
                 cred_def_json = await issuer.send_cred_def(
-                    schema_json, revocation=False
+                    json.dumps(schema["ledger"]), revocation=False
                 )
                 cred_def = json.loads(cred_def_json)
                 log_json("Published credential def:", cred_def, LOGGER)
             schema["credential_definition"] = cred_def
 
+        if artifacts:
+            artifacts.set_schema(
+                issuer.did, definition.name, definition.version, schema["ledger"])
+            artifacts.set_cred_def(
+                issuer.did, definition.name, definition.version,
+                schema["credential_definition"])
+        return checked
+
     async def _handle_create_cred_offer(self, request: IndyCreateCredOfferReq):
         """
         Create a credential offer for TheOrgBook
@@ -750,23 +773,64 @@ class IndyLedger(ServiceBase):
         """
         issuer = self._issuers[request.issuer_id]
         schema = issuer.get_schema_config(request.schema_def)
-
-        LOGGER.info(
-            "Creating indy credential offer for issuer %s, schema %s",
-            issuer.ident,
-            schema["definition"].name,
-        )
-        cred_offer_json = await issuer.agent.create_cred_offer(
-            schema["ledger"]["seqNo"]
-        )
+        offer = await self._create_cred_offer(issuer, schema)
 
         return IndyCredOffer(
             request.issuer_id,
             request.schema_def,
-            json.loads(cred_offer_json),
+            offer,
             schema["credential_definition"],
         )
 
+    async def _handle_create_cred_offers(self, request: IndyCreateCredOffersReq):
+        """
+        Create a batch of credential offers for the same issuer and schema. Offers
+        prepared in the background are created one at a time, whenever the issuer has
+        no other operations in progress, to leave the agent free for issuance
+
+        Args:
+            request: the request for credential offers
+        """
+        issuer = self._issuers[request.issuer_id]
+        schema = issuer.get_schema_config(request.schema_def)
+
+        if request.background:
+            offers = []
+            for _ in range(request.count):
+                await issuer.agents.wait_idle()
+                offers.append(await self._create_cred_offer(issuer, schema))
+        else:
+            offers = await asyncio.gather(*(
+                self._create_cred_offer(issuer, schema) for _ in range(request.count)))
+
+        return IndyCredOfferList([
+            IndyCredOffer(
+                request.issuer_id,
+                request.schema_def,
+                offer,
+                schema["credential_definition"],
+            ) for offer in offers
+        ])
+
+    async def _create_cred_offer(self, issuer: IndyIssuerConfig, schema: dict) -> dict:
+        """
+        Create a new credential offer using the issuer's agent
+
+        Args:
+            issuer: the Indy issuer configuration
+            schema: the schema configuration, including the published ledger schema
+        """
+        LOGGER.info(
+            "Creating indy credential offer for issuer %s, schema %s",
+            issuer.ident,
+            schema["definition"].name,
+        )
+        async with issuer.agents.checkout() as agent:
+            cred_offer_json = await agent.create_cred_offer(
+                schema["ledger"]["seqNo"]
+            )
+        return json.loads(cred_offer_json)
+
     async def _handle_create_cred(self, request: IndyCreateCredentialReq):
         """
         Create a credential for TheOrgBook
@@ -778,58 +842,82 @@ class IndyLedger(ServiceBase):
         issuer = self._issuers[offer.issuer_id]
         schema = issuer.get_schema_config(offer.schema_def)
 
-        (cred_json, cred_revoc_id) = await issuer.agent.create_cred(
-            json.dumps(request.cred_offer.offer),
-            request.cred_req_result,
-            request.cred_data,
-        )
+        async with issuer.agents.checkout() as agent:
+            (cred_json, cred_revoc_id) = await agent.create_cred(
+                json.dumps(request.cred_offer.offer),
+                request.cred_req_result,
+                request.cred_data,
+            )
 
         return IndyCredential(
             offer.issuer_id,
             schema["definition"].name,
-            issuer.agent.did,
+            issuer.did,
             json.loads(cred_json),
             schema["credential_definition"],
             request.cred_req_metadata,
             cred_revoc_id,
         )
 
-    async def _get_verifier(self) -> AgentWrapper:
+    async def _handle_create_creds(self, request: IndyCreateCredentialsReq):
         """
-        Fetch or create an :class:`AgentWrapper` representing a standard Verifier agent,
-        used to verify proofs
+        Create a batch of credentials concurrently, subject to the agent concurrency
+        limit of each issuer (if any). A failure to create one credential does not
+        affect the others
+
+        Args:
+            request: the request to create the credentials
         """
-        if not self._verifier:
-            wallet_cfg = WalletConfig(
-                name="GenericVerifier",
-                seed="verifier-seed-000000000000000000",
-                genesis_path=self._genesis_path,
-            )
-            self._verifier = AgentWrapper(wallet_cfg, VonVerifier, "Verifier")
-            await self._verifier.open()
-        return self._verifier.instance
+        #pylint: disable=broad-except
+        async def create(cred_req):
+            try:
+                return await self._handle_create_cred(cred_req)
+            except Exception as e:
+                LOGGER.exception("Error creating credential:")
+                return IndyLedgerError(str(e))
+
+        results = await asyncio.gather(*(create(cred_req) for cred_req in request.requests))
+        return IndyCredentialList(list(results))
 
     async def _handle_verify_proof(self, request: IndyVerifyProofReq):
         """
-        Verify a proof returned by TheOrgBook
+        Verify a proof returned by TheOrgBook. This is normally handled by a dedicated
+        verifier service in its own process, rather than a ledger worker used for issuance
 
         Args:
             request: the request to verify a proof
         """
-        verifier = await self._get_verifier()
-        result = await verifier.verify_proof(request.proof_req, request.proof)
-        parsed_proof = revealed_attrs(request.proof)
-
+        await self._verifier.open(self._genesis_path, self._node_pools, self._ledger_cache.read)
+        result, parsed_proof = await self._verifier.verify(request.proof_req, request.proof)
         return IndyVerifiedProof(result, parsed_proof)
 
-    async def _handle_ledger_status(self):
+    async def _fetch_ledger_status(self) -> IndyLedgerStatus:
         """
-        Download the ledger status from von-network and return it to the client
+        Download the ledger status from von-network
         """
-        url = self._ledger_url
-        async with self.http as client:
-            response = await client.get("{}/status".format(url))
-        return await response.text()
+        if not self._ledger_status_client:
+            self._ledger_status_client = self.http_client()
+        url = "{}/status".format(self._ledger_url)
+        async with self._ledger_status_client.get(url) as response:
+            response.raise_for_status()
+            status = await response.json(content_type=None)
+        if not isinstance(status, dict):
+            raise ValueError("Unexpected ledger status response: {}".format(type(status)))
+        ttl = float(self._config.get("ledger_status_ttl") or 0)
+        return IndyLedgerStatus(status, time.time(), ttl)
+
+    async def _handle_ledger_status(self) -> ServiceResponse:
+        """
+        Return the ledger status from von-network, using a cached copy if it is current.
+        If the status cannot be refreshed then the last good copy is returned, if any
+        """
+        try:
+            return await self._ledger_status.get()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            LOGGER.error("Error fetching ledger status: %s", e)
+            if self._ledger_status.current:
+                return self._ledger_status.current
+            return IndyLedgerError("Error fetching ledger status: {}".format(e))
 
     async def _service_request(self, request: ServiceRequest) -> ServiceResponse:
         """
@@ -849,6 +937,17 @@ class IndyLedger(ServiceBase):
             except ValueError as e:
                 reply = IndyLedgerError(str(e))
 
+        elif isinstance(request, IndyRegisterIssuersReq):
+            try:
+                statuses = {}
+                for config in request.configs:
+                    issuer_id = self._add_issuer(**config)
+                    statuses[issuer_id] = self._issuers[issuer_id].status
+                reply = IndyIssuerStatusList(statuses)
+                self.run_task(self._sync())
+            except ValueError as e:
+                reply = IndyLedgerError(str(e))
+
         elif isinstance(request, IndyIssuerStatusReq):
             reply = self._get_issuer_status(request.issuer_id)
 
@@ -858,6 +957,12 @@ class IndyLedger(ServiceBase):
         elif isinstance(request, IndyCreateCredentialReq):
             reply = await self._handle_create_cred(request)
 
+        elif isinstance(request, IndyCreateCredOffersReq):
+            reply = await self._handle_create_cred_offers(request)
+
+        elif isinstance(request, IndyCreateCredentialsReq):
+            reply = await self._handle_create_creds(request)
+
         elif isinstance(request, IndyVerifyProofReq):
             reply = await self._handle_verify_proof(request)
 
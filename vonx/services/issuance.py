@@ -0,0 +1,400 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import asyncio
+from collections import deque
+import logging
+import time
+from typing import Callable, Mapping
+
+from .delivery import OutboxDelivery
+from .indy import (
+    IndyCreateCredOfferReq, IndyCredOffer,
+    IndyCreateCredOffersReq, IndyCredOfferList,
+    IndyCreateCredentialReq, IndyCredential,
+    IndyCreateCredentialsReq, IndyCredentialList,
+    IndyCredentialRequest, IndyStoredCredential,
+)
+from .pipeline import Pipeline, PipelineStage
+from .schema import Schema
+from .util import log_json
+
+LOGGER = logging.getLogger(__name__)
+
+class OfferPool:
+    """
+    A store of credential offers generated ahead of time for each issuer and schema,
+    so that offer creation can be removed from the critical path of issuing a credential.
+    Each offer is handed out at most once, and offers older than the expiry are discarded
+
+    Args:
+        size: the number of offers to keep ready for each issuer and schema
+        expiry: the maximum age of an offer in seconds
+    """
+
+    def __init__(self, size: int = 0, expiry: float = 300):
+        self._size = max(int(size or 0), 0)
+        self._expiry = float(expiry or 0)
+        self._offers = {}
+        self._stats = {
+            "expired": 0,
+            "generated": 0,
+            "hits": 0,
+            "misses": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether offers should be generated in advance
+        """
+        return self._size > 0
+
+    def _prune(self, key) -> deque:
+        """
+        Discard any expired offers for a key
+        """
+        offers = self._offers.setdefault(key, deque())
+        if self._expiry:
+            cutoff = time.monotonic() - self._expiry
+            while offers and offers[0][0] < cutoff:
+                offers.popleft()
+                self._stats["expired"] += 1
+        return offers
+
+    def take(self, key) -> dict:
+        """
+        Remove and return a ready credential offer, if one is available
+        """
+        offers = self._prune(key)
+        if offers:
+            self._stats["hits"] += 1
+            return offers.popleft()[1]
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, key, offer: dict) -> None:
+        """
+        Add a newly-generated credential offer
+        """
+        self._prune(key).append((time.monotonic(), offer))
+        self._stats["generated"] += 1
+
+    def needed(self, key) -> int:
+        """
+        Get the number of offers required to fill the pool for a key
+        """
+        return max(self._size - len(self._prune(key)), 0)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the current offer pool statistics
+        """
+        stats = self._stats.copy()
+        stats["ready"] = sum(len(offers) for offers in self._offers.values())
+        stats["size"] = self._size
+        return stats
+
+
+
+
+class IssuancePipeline:
+    """
+    The staged pipeline used to issue individual credentials. The ledger-bound and
+    TheOrgBook-bound stages each have their own workers, configured by the
+    ISSUER_<STAGE>_WORKERS settings, so that the stages of separate credentials overlap.
+    By default these are derived from the scheduler concurrency, which limits the
+    number of credentials in the pipeline. Credential offers may be prepared in advance
+    in an :class:`OfferPool`, configured by the ISSUER_OFFER_POOL_* settings
+
+    Args:
+        env: the application settings
+        concurrency: the number of credentials issued at once
+        submit: a function sending a request to a ledger service and returning the reply
+        ledger_pid_for: a function returning the ledger service which owns an issuer
+        issuer_ready: a function returning whether an issuer has completed its sync
+        delivery: the outbox used to deliver credentials to TheOrgBook, if enabled
+    """
+
+    def __init__(self, env: Mapping, concurrency: int, submit: Callable,
+                 ledger_pid_for: Callable[[str], str], issuer_ready: Callable[[str], bool],
+                 delivery: OutboxDelivery = None):
+        env = env or {}
+        self._submit = submit
+        self._delivery = delivery
+        self._ledger_pid_for = ledger_pid_for
+        self._issuer_ready = issuer_ready
+        self._offer_pool = OfferPool(
+            env.get("ISSUER_OFFER_POOL_SIZE", 0),
+            env.get("ISSUER_OFFER_POOL_EXPIRY", 300))
+        self._offer_refills = {}
+        queue_size = env.get("ISSUER_STAGE_QUEUE_SIZE") or concurrency
+        stages = [
+            ("offer", self._stage_offer, "ISSUER_OFFER_WORKERS", 4),
+            ("request", self._stage_request, "ISSUER_REQUEST_WORKERS", 2),
+            ("create", self._stage_create, "ISSUER_CREATE_WORKERS", 4),
+            ("store", self._stage_store, "ISSUER_STORE_WORKERS", 2),
+        ]
+        self._pipeline = Pipeline([
+            PipelineStage(
+                name, handler, env.get(setting) or max(concurrency // divisor, 1), queue_size)
+            for (name, handler, setting, divisor) in stages
+        ])
+
+    async def issue(self, api_client, issuer_id: str, cred_type, cred_data) -> dict:
+        """
+        Submit a credential to the holder, given the credential type and data
+
+        Args:
+            api_client: the HTTP client (responsible for signing headers)
+            issuer_id: the unique identifier of the issuer service
+            cred_type: the credential type information
+            cred_data: the prepared credential data
+
+        Returns:
+            the decoded JSON result of the credential submission request
+        """
+        item = await self._pipeline.submit({
+            "api_client": api_client,
+            "cred_data": cred_data,
+            "cred_type": cred_type,
+            "issuer_id": issuer_id,
+            "ledger_pid": self._ledger_pid_for(issuer_id),
+        })
+        return item["stored"]
+
+    async def issue_batch(self, api_client, issuer_id: str, cred_type,
+                          cred_datas: list) -> list:
+        """
+        Submit a batch of credentials of the same type to the holder, using batch
+        requests to the ledger service and TheOrgBook
+
+        Args:
+            api_client: the HTTP client (responsible for signing headers)
+            issuer_id: the unique identifier of the issuer service
+            cred_type: the credential type information
+            cred_datas: the prepared credential data for each credential
+
+        Returns:
+            an :class:`IndyStoredCredential` or an error message for each credential
+        """
+        ledger_pid = self._ledger_pid_for(issuer_id)
+        offers = self.take_offers(issuer_id, cred_type["schema"], len(cred_datas))
+        if len(offers) < len(cred_datas):
+            offers_msg = IndyCreateCredOffersReq(
+                issuer_id, cred_type["schema"], len(cred_datas) - len(offers))
+            created = await self._submit(ledger_pid, offers_msg)
+            if not isinstance(created, IndyCredOfferList):
+                raise ValueError(
+                    "Unexpected response to credential offers request: {}".format(created))
+            offers.extend(created.offers)
+        self.refill_offers(issuer_id, cred_type["schema"])
+
+        results = [None] * len(cred_datas)
+        cred_reqs = await api_client.generate_credential_requests(offers)
+        pending = []
+        for idx, cred_req in enumerate(cred_reqs):
+            if isinstance(cred_req, IndyCredentialRequest):
+                pending.append((idx, IndyCreateCredentialReq(
+                    cred_req.cred_offer,
+                    cred_req.result,
+                    cred_req.metadata,
+                    cred_datas[idx])))
+            else:
+                results[idx] = "Error generating credential request: {}".format(cred_req)
+        if not pending:
+            return results
+
+        creds = await self._submit(
+            ledger_pid, IndyCreateCredentialsReq([cred_msg for (_idx, cred_msg) in pending]))
+        if not isinstance(creds, IndyCredentialList):
+            raise ValueError(
+                "Unexpected response to credential creation request: {}".format(creds))
+        created = []
+        for (idx, _cred_msg), cred in zip(pending, creds.results):
+            if isinstance(cred, IndyCredential):
+                created.append((idx, cred))
+            else:
+                results[idx] = "Error creating credential: {}".format(cred)
+        if not created:
+            return results
+
+        if self._delivery:
+            stored = await asyncio.gather(*(
+                self._delivery.queue(issuer_id, cred) for (_idx, cred) in created))
+        else:
+            stored = await api_client.store_credentials([cred for (_idx, cred) in created])
+        for (idx, _cred), reply in zip(created, stored):
+            if isinstance(reply, IndyStoredCredential):
+                results[idx] = reply
+            else:
+                results[idx] = "Error storing credential: {}".format(reply)
+        return results
+
+    def stop(self) -> None:
+        """
+        Cancel the pipeline workers and the tasks preparing credential offers
+        """
+        self._pipeline.stop()
+        for (task, _wake) in self._offer_refills.values():
+            task.cancel()
+        self._offer_refills = {}
+
+    async def _stage_offer(self, item: dict) -> dict:
+        """
+        Issuance pipeline stage: create the credential offer, or take one prepared
+        in advance without a request to the ledger service
+        """
+        schema_def = item["cred_type"]["schema"]
+        offers = self.take_offers(item["issuer_id"], schema_def, 1)
+        if offers:
+            cred_offer = offers[0]
+        else:
+            offer_msg = IndyCreateCredOfferReq(item["issuer_id"], schema_def)
+            cred_offer = await self._submit(item["ledger_pid"], offer_msg)
+            if not isinstance(cred_offer, IndyCredOffer):
+                raise ValueError(
+                    "Unexpected response to credential offer request: {}".format(
+                        cred_offer
+                    )
+                )
+            log_json("Created cred offer:", cred_offer, LOGGER)
+        self.refill_offers(item["issuer_id"], schema_def)
+        item["cred_offer"] = cred_offer
+        return item
+
+    async def _stage_request(self, item: dict) -> dict:
+        """
+        Issuance pipeline stage: ask TheOrgBook to generate the credential request
+        """
+        cred_req = await item["api_client"].generate_credential_request(item["cred_offer"])
+        log_json("Got cred request:", cred_req, LOGGER)
+        item["cred_req"] = cred_req
+        return item
+
+    async def _stage_create(self, item: dict) -> dict:
+        """
+        Issuance pipeline stage: create the credential
+        """
+        cred_req = item["cred_req"]
+        cred_msg = IndyCreateCredentialReq(
+            item["cred_offer"],
+            cred_req.result,
+            cred_req.metadata,
+            item["cred_data"])
+        cred = await self._submit(item["ledger_pid"], cred_msg)
+        if not isinstance(cred, IndyCredential):
+            raise ValueError(
+                "Unexpected response to credential creation request: {}".format(
+                    cred
+                )
+            )
+        log_json("Created credential:", cred, LOGGER)
+        item["cred"] = cred
+        return item
+
+    async def _stage_store(self, item: dict) -> dict:
+        """
+        Issuance pipeline stage: ask TheOrgBook to store the credential, or add it to
+        the outbox for delivery if enabled
+        """
+        if self._delivery:
+            item["stored"] = await self._delivery.queue(item["issuer_id"], item["cred"])
+        else:
+            item["stored"] = await item["api_client"].store_credential(item["cred"])
+        return item
+
+    @staticmethod
+    def _offer_key(issuer_id: str, schema_def: Schema) -> tuple:
+        """
+        Get the key used to store prepared offers for an issuer and schema
+        """
+        return (issuer_id, schema_def.name, schema_def.version)
+
+    def take_offers(self, issuer_id: str, schema_def: Schema, count: int) -> list:
+        """
+        Take up to `count` prepared credential offers for an issuer and schema
+        """
+        offers = []
+        if self._offer_pool.enabled:
+            key = self._offer_key(issuer_id, schema_def)
+            while len(offers) < count:
+                offer = self._offer_pool.take(key)
+                if not offer:
+                    break
+                offers.append(offer)
+        return offers
+
+    def refill_offers(self, issuer_id: str, schema_def: Schema) -> None:
+        """
+        Wake the background task which prepares credential offers for an issuer
+        and schema, starting it if necessary
+        """
+        if not self._offer_pool.enabled:
+            return
+        key = self._offer_key(issuer_id, schema_def)
+        refill = self._offer_refills.get(key)
+        if not refill:
+            wake = asyncio.Event()
+            task = asyncio.ensure_future(self._run_offer_refill(key, issuer_id, schema_def, wake))
+            refill = self._offer_refills[key] = (task, wake)
+        refill[1].set()
+
+    async def _run_offer_refill(self, key: tuple, issuer_id: str, schema_def: Schema,
+                                wake: asyncio.Event) -> None:
+        """
+        Keep the offer pool for an issuer and schema full, requesting offers from the
+        ledger service to be created while the issuer's agent is otherwise idle.
+        The task sleeps until it is woken by an offer being taken
+        """
+        #pylint: disable=broad-except
+        ledger_pid = self._ledger_pid_for(issuer_id)
+        while True:
+            await wake.wait()
+            wake.clear()
+            needed = self._offer_pool.needed(key)
+            if not needed or not self._issuer_ready(issuer_id):
+                continue
+            try:
+                reply = await self._submit(
+                    ledger_pid, IndyCreateCredOffersReq(issuer_id, schema_def, needed, True))
+                if not isinstance(reply, IndyCredOfferList):
+                    raise ValueError(
+                        "Unexpected response to credential offers request: {}".format(reply))
+            except Exception:
+                LOGGER.exception("Error preparing credential offers for %s:", issuer_id)
+                continue
+            for offer in reply.offers:
+                self._offer_pool.put(key, offer)
+            if self._offer_pool.needed(key):
+                wake.set()
+
+    @property
+    def offer_pool(self) -> OfferPool:
+        """
+        Accessor for the pool of credential offers prepared in advance
+        """
+        return self._offer_pool
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the queue depths and processing statistics of each stage
+        """
+        return self._pipeline.status
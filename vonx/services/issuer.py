@@ -15,25 +15,32 @@
 # limitations under the License.
 #
 
+import asyncio
 import logging
 from typing import Mapping
 
 from didauth.ext.aiohttp import SignedRequest, SignedRequestAuth
 
+from .artifacts import RegistrationCache, payload_digest
 from .base import (
     Exchange,
     ServiceBase,
     ServiceError,
     ServiceRequest,
     ServiceResponse)
+from .dedup import IssueDedup
+from .delivery import OutboxDelivery
 from .indy import (
-    IndyRegisterIssuerReq, IndyIssuerStatus,
-    IndyCreateCredOfferReq, IndyCredOffer,
-    IndyCreateCredentialReq, IndyCredential,
+    IndyRegisterIssuersReq, IndyIssuerStatus, IndyIssuerStatusList,
+    IndyCredential, IndyStoredCredential,
 )
-from .schema import Schema, SchemaManager
-from .tob import TobClient, TobClientError
-from .util import log_json
+from .issuance import IssuancePipeline
+# IssueCredJob is imported for the web views along with the other issuer messages
+from .jobs import IssueCredJob, JobTable, send_job_callback #pylint: disable=unused-import
+from .scheduler import FairScheduler
+from .schema import Schema, SchemaManager, SchemaRoutes
+from .tob import TobCallPolicy, TobClient, TobClientError, assemble_issuer_spec
+from .util import HashRing, log_json, to_bool, url_allowed
 
 LOGGER = logging.getLogger(__name__)
 
@@ -107,6 +114,13 @@ class IssuerError(ServiceError):
     pass
 
 
+class IdempotencyConflict(IssuerError):
+    """
+    A message class for a repeated idempotency key submitted with a different credential
+    """
+    pass
+
+
 class ResolveSchemaRequest(ServiceRequest):
     """
     The message class representing an request to resolve a schema
@@ -115,6 +129,7 @@ class ResolveSchemaRequest(ServiceRequest):
         ('schema_name', str),
         ('schema_version', str, None),
         ('issuer_id', str, None),
+        ('issuer_did', str, None),
     )
 
 
@@ -138,8 +153,31 @@ class IssueCredRequest(ServiceRequest):
         ('schema_version', str),
         ('attributes', Mapping),
         ('issuer_id', str, None),
+        ('idempotency_key', str, None),
     )
 
+    @property
+    def dedup_key(self) -> str:
+        """
+        The key used to detect repeated submissions of this request: the client-supplied
+        idempotency key if any, otherwise a digest of the schema, issuer and attributes
+        """
+        if self.idempotency_key:
+            return "key:" + self.idempotency_key
+        return "digest:" + self.payload_digest
+
+    @property
+    def payload_digest(self) -> str:
+        """
+        A digest of the schema, issuer and attributes of the requested credential
+        """
+        return payload_digest({
+            "attributes": self.attributes,
+            "issuer_id": self.issuer_id,
+            "schema_name": self.schema_name,
+            "schema_version": self.schema_version,
+        })
+
 
 class IssueCredResponse(ServiceResponse):
     """
@@ -152,6 +190,54 @@ class IssueCredResponse(ServiceResponse):
     )
 
 
+class IssueCredJobRequest(ServiceRequest):
+    """
+    The message class representing a request to issue a credential in the background
+
+    Args:
+        request (IssueCredRequest): the credential to be issued
+        callback_url (str): an optional URL to receive the completed job status
+    """
+    _fields = (
+        ('request', IssueCredRequest),
+        ('callback_url', str, None),
+    )
+
+
+class IssueCredJobStatusRequest(ServiceRequest):
+    """
+    The message class representing a request for the status of a background issuance job
+    """
+    _fields = (
+        ('job_id', str),
+    )
+
+
+class IssueCredBatchRequest(ServiceRequest):
+    """
+    The message class representing a request to issue a batch of credentials
+
+    Args:
+        requests (list): a list of :class:`IssueCredRequest` instances
+    """
+    _fields = (
+        ('requests', list),
+    )
+
+
+class IssueCredBatchResponse(ServiceResponse):
+    """
+    The message class representing the response from a IssueCredBatchRequest
+
+    Args:
+        results (list): an :class:`IssueCredResponse` or :class:`IssuerError` instance
+            for each credential requested, in the same order
+    """
+    _fields = (
+        ('results', list),
+    )
+
+
 class IssuerService:
     """
     Manage configuration and status for a single issuer
@@ -161,9 +247,10 @@ class IssuerService:
         self.api_url = None
         self.config = None
         self.cred_types = []
+        self.cred_type_routes = SchemaRoutes()
         self.did = None
         self.endpoint = None
-        self.status = {"api": False, "ledger": False, "ready": False}
+        self.status = {"api": False, "ledger": False, "ready": False, "sync": "ledger"}
         self.wallet_seed = None
         self.load_config(config, schema_mgr)
 
@@ -176,6 +263,10 @@ class IssuerService:
         self.cred_types = load_cred_definitions(
             config.get("credential_types"), schema_mgr
         )
+        self.cred_type_routes = SchemaRoutes()
+        for ctype in self.cred_types:
+            self.cred_type_routes.add(
+                None, ctype["schema"].name, ctype["schema"].version, ctype)
         self.endpoint = config.get("url")
         wallet = config.get("wallet")
         if wallet:
@@ -192,12 +283,7 @@ class IssuerService:
         Returns:
             the credential type definition, if found, otherwise None
         """
-        for ctype in self.cred_types:
-            if ctype["schema"].name == schema_name and (
-                    not schema_version or ctype["schema"].version == schema_version
-                ):
-                return ctype
-        return None
+        return self.cred_type_routes.find(schema_name, schema_version)
 
     def get_ledger_config(self, manager_pid: str) -> dict:
         """
@@ -205,6 +291,7 @@ class IssuerService:
         ledger service
         """
         return {
+            "agent_concurrency": self.config.get("agent_concurrency"),
             "endpoint": self.endpoint,
             "id": self.config["id"],
             "manager_pid": manager_pid,
@@ -214,12 +301,22 @@ class IssuerService:
 
     def update_ledger_status(self, status: dict):
         """
-        Update our status in reponse to a status update from the ledger service
+        Update our status in reponse to a status update from the ledger service.
+        The issuer must be registered again with the API if its DID has changed
         """
+        if status["did"] != self.did:
+            self.status["api"] = False
         self.did = status["did"]
         self.status["ledger"] = status["synced"]
         self.update_ready()
 
+    def update_api_status(self, registered: bool):
+        """
+        Update our status after registering with the API
+        """
+        self.status["api"] = registered
+        self.update_ready()
+
     def update_ready(self):
         """
         Update our ready status based on the current ledger and API sync status
@@ -240,10 +337,51 @@ class IssuerManager(ServiceBase):
         - Initializes the OrgBook with our issuer information
     """
 
-    def __init__(self, pid: str, exchange: Exchange, env: Mapping):
+    def __init__(self, pid: str, exchange: Exchange, env: Mapping, ledger_pids: list = None):
         super(IssuerManager, self).__init__(pid, exchange, env)
+        self._api_clients = {}
+        self._did_auths = {}
         self._issuers = {}
+        self._schema_routes = SchemaRoutes()
         self._ledger_pid = "indy-ledger"
+        self._ledger_ring = HashRing(ledger_pids or [self._ledger_pid])
+        env = self._env or {}
+        self._concurrency = max(int(env.get("ISSUER_SCHEDULER_CONCURRENCY") or 32), 1)
+        self._delivery = OutboxDelivery.from_env(env, self._api_client, self._issuer_ready)
+        self._issuance = IssuancePipeline(
+            env, self._concurrency, self.submit, self._ledger_pid_for, self._issuer_ready,
+            self._delivery)
+        self._dedup = IssueDedup.from_env(env)
+        self._callback_client = None
+        self._callback_allow = env.get("ISSUER_CALLBACK_ALLOW")
+        self._jobs = JobTable(env.get("ISSUER_JOB_TABLE_SIZE"))
+        self._scheduler = FairScheduler(self._concurrency)
+        self._tob_policies = {}
+        self._issuer_syncs = {}
+        self._registrations = None
+        self._registrations_lock = None
+        if env.get("ISSUER_CACHE_PATH"):
+            self._registrations = RegistrationCache(env["ISSUER_CACHE_PATH"])
+        self._force_register = to_bool(env.get("TOB_FORCE_REGISTER"))
+        self._issuer_sync_retry = max(float(env.get("ISSUER_SYNC_RETRY") or 5), 0.1)
+        self._issuer_sync_retry_max = float(env.get("ISSUER_SYNC_RETRY_MAX") or 300)
+
+    def _get_status(self) -> dict:
+        """
+        Include the issuance pipeline queue depths in the service status
+        """
+        status = super(IssuerManager, self)._get_status()
+        status["pipeline"] = self._issuance.status
+        status["dedup_cache"] = self._dedup.status
+        status["offer_pool"] = self._issuance.offer_pool.status
+        status["issuers"] = {
+            issuer_id: issuer.status.copy() for issuer_id, issuer in self._issuers.items()}
+        status["scheduler"] = self._scheduler.status
+        status["tob"] = {url: policy.status for url, policy in self._tob_policies.items()}
+        if self._delivery:
+            status["outbox"] = self._delivery.status
+        status["jobs"] = self._jobs.status
+        return status
 
     def add_issuer(self, issuer: IssuerService) -> None:
         """
@@ -251,65 +389,214 @@ class IssuerManager(ServiceBase):
         starting the service
         """
         self._issuers[issuer.config["id"]] = issuer
+        self._index_issuer(issuer.config["id"])
+        self._scheduler.configure(
+            issuer.config["id"],
+            issuer.config.get("weight", 1),
+            issuer.config.get("max_inflight"))
+
+    def _index_issuer(self, issuer_id: str) -> None:
+        """
+        Update the schema routing index with the credential types of a single issuer
+        """
+        issuer = self._issuers[issuer_id]
+        self._schema_routes.remove_owner(issuer_id)
+        for ctype in issuer.cred_types:
+            self._schema_routes.add(
+                issuer_id, ctype["schema"].name, ctype["schema"].version, ctype, issuer.did)
+
+    def _ledger_pid_for(self, issuer_id: str) -> str:
+        """
+        Find the identifier of the :class:`IndyLedger` worker which owns an issuer
+        """
+        return self._ledger_ring.get(issuer_id)
 
     async def _service_start(self) -> bool:
         """
         Initial service startup; submit all registered issuers to the ledger service
-        for synchronization
+        for synchronization, in a single request per ledger worker
         """
+        configs = {}
+        if self._registrations:
+            await asyncio.get_event_loop().run_in_executor(None, self._registrations.load)
+        if self._delivery:
+            await self._delivery.start()
         for issuer_id, issuer in self._issuers.items():
             LOGGER.info("Registering issuer: %s", issuer_id)
-            msg = IndyRegisterIssuerReq(
+            configs.setdefault(self._ledger_pid_for(issuer_id), []).append(
                 issuer.get_ledger_config(self.pid)
             )
-            reply = await self.submit(self._ledger_pid, msg)
-            if not isinstance(reply, IndyIssuerStatus):
+        ledger_pids = list(configs)
+        replies = await asyncio.gather(*(
+            self.submit(ledger_pid, IndyRegisterIssuersReq(configs[ledger_pid]))
+            for ledger_pid in ledger_pids
+        ))
+        for ledger_pid, reply in zip(ledger_pids, replies):
+            if not isinstance(reply, IndyIssuerStatusList):
                 raise RuntimeError(
-                    "Error registering issuer {}: {}".format(issuer_id, reply)
+                    "Error registering issuers with {}: {}".format(ledger_pid, reply)
                 )
         return True
 
     async def _service_sync(self) -> bool:
         """
-        Perform the issuer initialization process, adding any registered issuers to the
-        ledger and registering them with the API client once the ledger sync has completed
+        Start the sync process for each issuer. Issuers are registered with the API
+        independently, once the ledger sync for each has completed
         """
-        synced = True
-        for issuer_id, issuer in self._issuers.items():
-            if issuer.status["ledger"] and not issuer.status["ready"]:
-                async with self._init_api_client(issuer_id) as api_client:
-                    cfg = issuer.config.copy()
-                    cfg["did"] = issuer.did
-                    cfg["credential_types"] = issuer.cred_types
-                    try:
-                        _result = await api_client.register_issuer(cfg)
-                    except TobClientError:
-                        continue
-                issuer.status["ready"] = True
-            if not issuer.status["ready"]:
-                synced = False
-        return synced
-
-    def _find_issuer_for_schema(self, schema_name: str, schema_version: str = None):
+        for issuer_id in self._issuers:
+            self._sync_issuer(issuer_id)
+        return self._issuers_synced()
+
+    async def _service_stop(self) -> None:
+        """
+        Stop the issuance pipeline and the delivery of credentials from the outbox
+        """
+        self._issuance.stop()
+        if self._delivery:
+            await self._delivery.stop()
+
+    def _issuers_synced(self) -> bool:
+        """
+        Check whether every issuer has completed its sync process
+        """
+        return all(issuer.status["ready"] for issuer in self._issuers.values())
+
+    def _issuer_ready(self, issuer_id: str) -> bool:
+        """
+        Check whether an issuer has completed its sync process
+        """
+        issuer = self._issuers.get(issuer_id)
+        return bool(issuer and issuer.status["ready"])
+
+    def _sync_issuer(self, issuer_id: str) -> None:
+        """
+        Start the sync process for a single issuer, unless it is already running.
+        A running sync process checks the issuer status again before it completes
+        """
+        task = self._issuer_syncs.get(issuer_id)
+        if not task or task.done():
+            self._issuer_syncs[issuer_id] = self.run_task(self._run_issuer_sync(issuer_id))
+
+    async def _run_issuer_sync(self, issuer_id: str) -> None:
+        """
+        Register an issuer with the API client once its ledger sync has completed,
+        retrying with an increasing delay after a failure. The issuer moves from the
+        `ledger` sync state (waiting for the ledger service) to `registering` and then
+        `ready`, or to `retrying` after a registration failure. An invalid issuer
+        definition cannot be registered and moves the issuer to the `failed` state
+        """
+        #pylint: disable=broad-except
+        issuer = self._issuers[issuer_id]
+        delay = self._issuer_sync_retry
+        while issuer.status["ledger"] and not issuer.status["api"]:
+            did = issuer.did
+            issuer.status["sync"] = "registering"
+            try:
+                cfg, fingerprint = self._issuer_registration(issuer_id)
+            except ValueError as e:
+                LOGGER.error("Invalid definition for issuer %s, not registered: %s", issuer_id, e)
+                issuer.status["sync"] = "failed"
+                self._update_status(synced=self._issuers_synced())
+                return
+            try:
+                await self._register_issuer(issuer_id, cfg, fingerprint)
+            except Exception as e:
+                if isinstance(e, TobClientError):
+                    LOGGER.warning(
+                        "Error registering issuer %s, retrying in %ss: %s", issuer_id, delay, e)
+                else:
+                    LOGGER.exception(
+                        "Error registering issuer %s, retrying in %ss:", issuer_id, delay)
+                issuer.status["sync"] = "retrying"
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._issuer_sync_retry_max)
+                continue
+            # the DID may have changed while the registration was in progress
+            if issuer.did == did:
+                issuer.update_api_status(True)
+        issuer.status["sync"] = "ready" if issuer.status["ready"] else "ledger"
+        if issuer.status["ready"]:
+            for ctype in issuer.cred_types:
+                self._issuance.refill_offers(issuer_id, ctype["schema"])
+        self._update_status(synced=self._issuers_synced())
+
+    def _issuer_registration(self, issuer_id: str) -> tuple:
+        """
+        Assemble the registration of an issuer and its credential types
+
+        Returns:
+            a tuple of the issuer configuration and the fingerprint of its definition,
+            used to detect an unchanged registration
+
+        Raises:
+            ValueError: if the issuer definition is invalid
+        """
+        issuer = self._issuers[issuer_id]
+        cfg = issuer.config.copy()
+        cfg["did"] = issuer.did
+        cfg["credential_types"] = issuer.cred_types
+        fingerprint = payload_digest({
+            "api_url": issuer.api_url,
+            "spec": assemble_issuer_spec(cfg),
+        })
+        return cfg, fingerprint
+
+    async def _register_issuer(self, issuer_id: str, cfg: dict, fingerprint: str) -> None:
+        """
+        Register an issuer and its credential types with the API client. The registration
+        is skipped if the same definition was previously registered with the same API,
+        unless the TOB_FORCE_REGISTER setting or the issuer `force_register` option is set
+        """
+        issuer = self._issuers[issuer_id]
+        if self._registrations:
+            forced = self._force_register or to_bool(issuer.config.get("force_register"))
+            if not forced and self._registrations.registered(issuer_id, fingerprint):
+                LOGGER.info("Issuer registration unchanged, skipping: %s", issuer_id)
+                return
+        LOGGER.info("Registering issuer with API: %s", issuer_id)
+        await self._api_client(issuer_id).register_issuer(cfg)
+        if self._registrations:
+            self._registrations.set(issuer_id, fingerprint)
+            await self._save_registrations()
+
+    async def _save_registrations(self) -> None:
+        """
+        Persist the registration fingerprints of the issuers. Saves by concurrent issuer
+        sync tasks are written one at a time, each from a copy taken on the event loop
+        """
+        #pylint: disable=broad-except
+        if not self._registrations_lock:
+            self._registrations_lock = asyncio.Lock()
+        try:
+            async with self._registrations_lock:
+                data = self._registrations.snapshot()
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self._registrations.write, data)
+        except Exception:
+            LOGGER.exception("Error saving issuer registration cache:")
+
+    def _find_issuer_for_schema(self, schema_name: str, schema_version: str = None,
+                                issuer_did: str = None):
         """
         Find the issuer for a particular schema and version
 
         Args:
             schema_name: the name of the schema as identifier on the ledger
             schema_version: the version number of the schema
+            issuer_did: the DID of the issuer, if known
 
         Returns:
-            a tuple of the :class:`IssuerService` instance and credential type definition, or None
+            a tuple of the issuer ID and credential type definition, or None
         """
-        for issuer_id, issuer in self._issuers.items():
-            cred_type = issuer.find_cred_type(schema_name, schema_version)
-            if cred_type:
-                return (issuer_id, cred_type)
-        return None
+        return self._schema_routes.find_entry(schema_name, schema_version, issuer_did)
 
     async def _handle_issue_cred(self, request: IssueCredRequest):
         """
-        Submit a credential to the holder
+        Submit a credential to the holder. A repeated request with the same idempotency
+        key joins an issuance already in progress, or receives the recent result.
+        Reusing an idempotency key for a different credential is refused. Requests
+        without a key are only deduplicated by their attributes if
+        ISSUER_DEDUP_ATTRIBUTES is enabled
 
         Args:
             request: a message representing the credential information
@@ -317,10 +604,61 @@ class IssuerManager(ServiceBase):
         Returns:
             the decoded JSON result of the credential submission request
         """
+        conflict = self._check_idempotency_key(request)
+        if conflict:
+            return conflict
+        return await self._dedup.load(
+            request,
+            lambda: self._issue_cred_request(request),
+            store=lambda reply: isinstance(reply, IssueCredResponse))
+
+    def _check_idempotency_key(self, request: IssueCredRequest) -> IdempotencyConflict:
+        """
+        Record the credential submitted with an idempotency key, and check that a
+        repeated key is submitted with the same credential
+
+        Returns:
+            an :class:`IdempotencyConflict` if the key was used for a different credential
+        """
+        if not self._dedup.check_key(request):
+            return IdempotencyConflict(
+                "Idempotency key has already been used for a different credential")
+        return None
+
+    async def _issue_cred_request(self, request: IssueCredRequest):
+        """
+        Resolve and issue a single credential request
+
+        Args:
+            request: a message representing the credential information
+        """
+        resolved = self._resolve_cred_request(request)
+        if isinstance(resolved, IssuerError):
+            return resolved
+        issuer_id, cred_type, cred_data = resolved
+
+        # share issuance capacity fairly between issuers
+        async with self._scheduler.slot(issuer_id):
+            api_client = self._api_client(issuer_id)
+            reply = await self._issuance.issue(
+                api_client, issuer_id, cred_type, cred_data
+            )
+        return IssueCredResponse(issuer_id, reply.cred, reply.result)
+
+    def _resolve_cred_request(self, request: IssueCredRequest):
+        """
+        Locate the issuer and credential type for a credential request and load
+        the credential attributes
+
+        Args:
+            request: a message representing the credential information
+
+        Returns:
+            a tuple of the issuer ID, credential type and credential data,
+            or an :class:`IssuerError` instance
+        """
         errmsg = None
-        if not self._status["synced"]:
-            errmsg = IssuerError("Issuer manager is not synced")
-        elif not request.schema_name:
+        if not request.schema_name:
             errmsg = IssuerError("Missing schema name")
         elif not request.attributes:
             errmsg = IssuerError("Missing credential attributes")
@@ -349,58 +687,146 @@ class IssuerManager(ServiceBase):
                     request.schema_name, request.schema_version
                 )
             )
+        if not self._issuers[issuer_id].status["ready"]:
+            return IssuerError("Issuer is not synced: {}".format(issuer_id))
 
         cred_data = load_cred_request(cred_type, request.attributes)
         log_json("Credential data:", cred_data, LOGGER)
+        return (issuer_id, cred_type, cred_data)
 
-        async with self._init_api_client(issuer_id) as api_client:
-            reply = await self._issue_cred(
-                api_client, issuer_id, cred_type, cred_data
-            )
-            msg = IssueCredResponse(issuer_id, reply.cred, reply.result)
-        return msg
+    def _submit_job(self, request: IssueCredJobRequest) -> ServiceResponse:
+        """
+        Add a credential issuance job to the job table and start it in the background.
+        When the table is full the oldest finished job is discarded; if every job is
+        still in progress then the request is refused
+
+        Args:
+            request: the job request
 
-    async def _issue_cred(self, api_client: TobClient, issuer_id: str,
-                          cred_type, cred_data) -> dict:
+        Returns:
+            the initial :class:`IssueCredJob` status, or an :class:`IssuerError`
+        """
+        if request.callback_url and not url_allowed(
+                request.callback_url, self._callback_allow):
+            return IssuerError("Callback URL is not permitted")
+        conflict = self._check_idempotency_key(request.request)
+        if conflict:
+            return conflict
+        job = self._jobs.add()
+        if not job:
+            return IssuerError("Too many issuance jobs in progress")
+        self.run_task(self._run_job(job.job_id, request.request, request.callback_url))
+        return job
+
+    async def _run_job(self, job_id: str, request: IssueCredRequest,
+                       callback_url: str = None) -> None:
+        """
+        Perform a background issuance job and deliver the result to the callback URL, if any
+        """
+        #pylint: disable=broad-except
+        self._jobs.update(job_id, "running")
+        try:
+            reply = await self._handle_issue_cred(request)
+            if isinstance(reply, IssueCredResponse):
+                job = self._jobs.update(job_id, "done", result=reply.value)
+            else:
+                job = self._jobs.update(job_id, "failed", error=str(reply.value))
+        except Exception as e:
+            LOGGER.exception("Error in credential issuance job %s:", job_id)
+            job = self._jobs.update(job_id, "failed", error=str(e))
+        if callback_url and job:
+            if not self._callback_client:
+                self._callback_client = self.http_client(read_timeout=30)
+            await send_job_callback(self._callback_client, job, callback_url)
+
+    async def _handle_issue_cred_batch(self, request: IssueCredBatchRequest):
         """
-        Submit a credential to the holder, given the credential type and data
+        Issue a batch of credentials. Requests are grouped by issuer and credential type
+        into chunks of up to ISSUER_BATCH_SIZE credentials, and up to
+        ISSUER_BATCH_CONCURRENCY chunks are processed at once
 
         Args:
-            api_client: the HTTP client (responsible for signing headers)
-            cred_type: the credential type information
-            cred_data: the prepared credential data
+            request: a message containing the individual credential requests
 
         Returns:
-            the decoded JSON result of the credential submission request
+            an :class:`IssueCredBatchResponse` with a result for each credential
         """
-        offer_msg = IndyCreateCredOfferReq(issuer_id, cred_type["schema"])
-        cred_offer = await self.submit(self._ledger_pid, offer_msg)
-        if not isinstance(cred_offer, IndyCredOffer):
-            raise ValueError(
-                "Unexpected response to credential offer request: {}".format(
-                    cred_offer
-                )
-            )
-        log_json("Created cred offer:", cred_offer, LOGGER)
-
-        cred_req = await api_client.generate_credential_request(cred_offer)
-        log_json("Got cred request:", cred_req, LOGGER)
-
-        cred_msg = IndyCreateCredentialReq(
-            cred_offer,
-            cred_req.result,
-            cred_req.metadata,
-            cred_data)
-        cred = await self.submit(self._ledger_pid, cred_msg)
-        if not isinstance(cred, IndyCredential):
-            raise ValueError(
-                "Unexpected response to credential creation request: {}".format(
-                    cred
-                )
-            )
-        log_json("Created credential:", cred, LOGGER)
+        #pylint: disable=broad-except
+        results = [None] * len(request.requests)
+        groups = {}
+        for idx, cred_req in enumerate(request.requests):
+            try:
+                resolved = self._resolve_cred_request(cred_req)
+            except ValueError as e:
+                resolved = IssuerError(str(e))
+            if isinstance(resolved, IssuerError):
+                results[idx] = resolved
+                continue
+            issuer_id, cred_type, cred_data = resolved
+            key = (issuer_id, cred_type["schema"].name, cred_type["schema"].version)
+            if key not in groups:
+                groups[key] = (issuer_id, cred_type, [])
+            groups[key][2].append((idx, cred_data))
+
+        env = self._env or {}
+        size = max(int(env.get("ISSUER_BATCH_SIZE") or 50), 1)
+        limit = asyncio.Semaphore(max(int(env.get("ISSUER_BATCH_CONCURRENCY") or 4), 1))
+
+        async def issue_chunk(issuer_id, cred_type, chunk):
+            async with limit:
+                try:
+                    async with self._scheduler.slot(issuer_id):
+                        stored = await self._issuance.issue_batch(
+                            self._api_client(issuer_id), issuer_id, cred_type,
+                            [cred_data for (_idx, cred_data) in chunk])
+                    replies = [
+                        IssueCredResponse(issuer_id, reply.cred, reply.result)
+                        if isinstance(reply, IndyStoredCredential) else IssuerError(reply)
+                        for reply in stored]
+                except Exception as e:
+                    LOGGER.exception("Error issuing credential batch:")
+                    replies = [IssuerError(str(e))] * len(chunk)
+            for (idx, _cred_data), reply in zip(chunk, replies):
+                results[idx] = reply
+
+        await asyncio.gather(*(
+            issue_chunk(issuer_id, cred_type, items[pos:pos + size])
+            for (issuer_id, cred_type, items) in groups.values()
+            for pos in range(0, len(items), size)))
+        return IssueCredBatchResponse(results)
+
+    def _api_client(self, issuer_id: str) -> TobClient:
+        """
+        Fetch the long-lived :class:`TobClient` for an issuer, creating it if necessary.
+        The client is replaced if the DID of the issuer has changed since it was created
 
-        return await api_client.store_credential(cred)
+        Args:
+            issuer_id: the unique identifier of the issuer service
+        Returns:
+            the shared :class:`TobClient` instance
+        """
+        did = self._issuers[issuer_id].did
+        found = self._api_clients.get(issuer_id)
+        if found:
+            if found[0] == did:
+                return found[1]
+            self.run_task(found[1].close())
+        client = self._init_api_client(issuer_id)
+        self._api_clients[issuer_id] = (did, client)
+        return client
+
+    def _connector_args(self) -> dict:
+        """
+        Tune the shared connection pool used for requests to TheOrgBook
+        """
+        env = self._env or {}
+        return {
+            "keepalive_timeout": float(env.get("TOB_KEEPALIVE_TIMEOUT") or 30),
+            "limit": int(env.get("TOB_CONNECTION_LIMIT") or 100),
+            "limit_per_host": int(env.get("TOB_CONNECTION_LIMIT_PER_HOST") or 20),
+            "ttl_dns_cache": int(env.get("TOB_DNS_CACHE_TTL") or 300),
+            "use_dns_cache": True,
+        }
 
     def _init_api_client(self, issuer_id: str):
         """
@@ -411,9 +837,20 @@ class IssuerManager(ServiceBase):
         Returns:
             the initialized :class:`TobClient` instance
         """
+        api_url = self._issuers[issuer_id].api_url
         return TobClient(
             self._issuer_http_client(issuer_id),
-            self._issuers[issuer_id].api_url)
+            api_url,
+            self._tob_policy(api_url))
+
+    def _tob_policy(self, api_url: str) -> TobCallPolicy:
+        """
+        Fetch the call policy shared by all clients of a TheOrgBook API, so that
+        the circuit breaker and retry budget reflect the health of the whole instance
+        """
+        if api_url not in self._tob_policies:
+            self._tob_policies[api_url] = TobCallPolicy.from_env(self._env)
+        return self._tob_policies[api_url]
 
     def _issuer_http_client(self, issuer_id: str = None, **kwargs):
         """
@@ -443,11 +880,15 @@ class IssuerManager(ServiceBase):
             raise ValueError("Unknown issuer ID: {}".format(issuer_id))
         issuer = self._issuers[issuer_id]
         if issuer.did and issuer.wallet_seed:
-            key_id = "did:sov:{}".format(issuer.did)
-            secret = issuer.wallet_seed
-            if isinstance(secret, str):
-                secret = secret.encode("ascii")
-            return SignedRequestAuth(key_id, "ed25519", secret, header_list)
+            cache_key = (issuer_id, issuer.did, tuple(header_list or ()))
+            if cache_key not in self._did_auths:
+                key_id = "did:sov:{}".format(issuer.did)
+                secret = issuer.wallet_seed
+                if isinstance(secret, str):
+                    secret = secret.encode("ascii")
+                self._did_auths[cache_key] = SignedRequestAuth(
+                    key_id, "ed25519", secret, header_list)
+            return self._did_auths[cache_key]
         return None
 
     async def _service_request(self, request: ServiceRequest) -> ServiceResponse:
@@ -458,9 +899,15 @@ class IssuerManager(ServiceBase):
             request: The request to be processed
         """
         if isinstance(request, ResolveSchemaRequest):
-            found = self._find_issuer_for_schema(
-                request.schema_name, request.schema_version
-            )
+            if request.issuer_id:
+                cred_type = request.issuer_id in self._issuers and \
+                    self._issuers[request.issuer_id].find_cred_type(
+                        request.schema_name, request.schema_version)
+                found = (request.issuer_id, cred_type) if cred_type else None
+            else:
+                found = self._find_issuer_for_schema(
+                    request.schema_name, request.schema_version, request.issuer_did
+                )
             if found:
                 issuer_id = found[0]
                 issuer_did = self._issuers[issuer_id].did
@@ -472,6 +919,16 @@ class IssuerManager(ServiceBase):
         elif isinstance(request, IssueCredRequest):
             reply = await self._handle_issue_cred(request)
 
+        elif isinstance(request, IssueCredBatchRequest):
+            reply = await self._handle_issue_cred_batch(request)
+
+        elif isinstance(request, IssueCredJobRequest):
+            reply = self._submit_job(request)
+
+        elif isinstance(request, IssueCredJobStatusRequest):
+            reply = self._jobs.get(request.job_id) or \
+                IssuerError("Unknown issuance job: {}".format(request.job_id))
+
         else:
             reply = None
         return reply
@@ -481,6 +938,7 @@ class IssuerManager(ServiceBase):
             self._issuers[response.issuer_id].update_ledger_status(
                 response.status
             )
-            self.run_task(self._sync())
+            self._index_issuer(response.issuer_id)
+            self._sync_issuer(response.issuer_id)
             return True
         return False
@@ -0,0 +1,145 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import asyncio
+from collections import OrderedDict
+import logging
+import time
+import uuid
+
+import aiohttp
+
+from .base import ServiceResponse
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IssueCredJob(ServiceResponse):
+    """
+    The message class representing the status of a background issuance job
+
+    Args:
+        job_id (str): the unique identifier of the job
+        state (str): one of `queued`, `running`, `done` or `failed`
+        created (float): the time the job was submitted, in seconds since the epoch
+        updated (float): the time of the last change in state
+        result: the result of the credential submission, once done
+        error (str): the reason for the failure, if failed
+    """
+    _fields = (
+        ('job_id', str),
+        ('state', str),
+        ('created', float),
+        ('updated', float),
+        ('result', None, None),
+        ('error', str, None),
+    )
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the job has completed, successfully or not
+        """
+        return self.state in ("done", "failed")
+
+    def as_dict(self) -> dict:
+        """
+        Get a JSON-compatible representation of the job status
+        """
+        return {name: getattr(self, name) for name in self._field_names}
+
+
+class JobTable:
+    """
+    A bounded table of the status of background issuance jobs. When the table is full
+    the oldest finished job is discarded; if every job is still in progress then new
+    jobs are refused
+
+    Args:
+        size: the maximum number of jobs retained
+    """
+
+    def __init__(self, size: int = 1000):
+        self._jobs = OrderedDict()
+        self._size = max(int(size or 1000), 1)
+
+    def add(self) -> IssueCredJob:
+        """
+        Add a new job in the `queued` state
+
+        Returns:
+            the initial :class:`IssueCredJob` status, or None if the table is full
+        """
+        if len(self._jobs) >= self._size:
+            finished = next(
+                (job_id for job_id, job in self._jobs.items() if job.finished), None)
+            if not finished:
+                return None
+            del self._jobs[finished]
+        now = time.time()
+        job = IssueCredJob(uuid.uuid4().hex, "queued", now, now)
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> IssueCredJob:
+        """
+        Get the current status of a job, if known
+        """
+        return self._jobs.get(job_id)
+
+    def update(self, job_id: str, state: str, result=None, error: str = None) -> IssueCredJob:
+        """
+        Record a change in the state of a job
+        """
+        job = self._jobs.get(job_id)
+        if job:
+            job = IssueCredJob(job_id, state, job.created, time.time(), result, error)
+            self._jobs[job_id] = job
+        return job
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the number of jobs in the table
+        """
+        return {
+            "active": sum(1 for job in self._jobs.values() if not job.finished),
+            "max": self._size,
+            "total": len(self._jobs),
+        }
+
+
+async def send_job_callback(client, job: IssueCredJob, callback_url: str) -> None:
+    """
+    POST the final status of a background issuance job to the client's callback URL
+
+    Args:
+        client: the :class:`ClientSession` used to send the callback
+        job: the final job status
+        callback_url: the URL supplied with the job
+    """
+    try:
+        # redirects are not followed, as they could lead outside the allowed hosts
+        async with client.post(
+                callback_url, json=job.as_dict(), allow_redirects=False) as resp:
+            if resp.status >= 400:
+                LOGGER.warning(
+                    "Callback for issuance job %s returned status %s",
+                    job.job_id, resp.status)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        LOGGER.warning("Error sending callback for issuance job %s: %s", job.job_id, e)
@@ -0,0 +1,190 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Mapping
+
+from .artifacts import LedgerArtifactCache
+from .cache import TTLCache
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LedgerReadCache:
+    """
+    A cache of the values read from the ledger, along with the optional local cache of
+    ledger artifacts which persists them between restarts. Schemas and credential
+    definitions cannot change once published, so by default they do not expire
+
+    Args:
+        size: the number of ledger reads retained
+        nym_ttl: the lifetime in seconds of cached DID records, or None for no expiry
+        schema_ttl: the lifetime in seconds of cached schemas and credential definitions
+    """
+
+    def __init__(self, size: int = 1000, nym_ttl: float = None, schema_ttl: float = None):
+        self._artifacts_lock = None
+        self._reads = TTLCache(size)
+        self._ttl = {"nym": nym_ttl, "schema": schema_ttl}
+        self.artifacts = None
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> "LedgerReadCache":
+        """
+        Create a cache from the `read_cache_size`, `nym_cache_ttl` and `schema_cache_ttl`
+        settings of the ledger service
+        """
+        def ttl(name):
+            value = config.get(name)
+            return float(value) if value not in (None, "") else None
+        return cls(
+            config.get("read_cache_size", 1000), ttl("nym_cache_ttl"), ttl("schema_cache_ttl"))
+
+    def ttl(self, kind: str) -> float:
+        """
+        Determine the lifetime of cached ledger reads of a given kind
+
+        Args:
+            kind: one of "nym", "schema" or "cred_def"
+
+        Returns:
+            the lifetime in seconds, or None for no expiry
+        """
+        return self._ttl["nym" if kind == "nym" else "schema"]
+
+    async def read(self, kind: str, key, loader: Callable[[], Awaitable],
+                   use_cache: bool = True, store: Callable = None) -> str:
+        """
+        Perform a read from the ledger through the cache. Identical reads already in
+        progress are shared rather than being sent to the ledger again
+
+        Args:
+            kind: the kind of value being read, used to determine its lifetime
+            key: the identifier of the value on the ledger
+            loader: a function returning an awaitable which performs the ledger read
+            use_cache: False to skip any cached value, refreshing it from the ledger
+            store: an optional predicate determining whether the result is cached
+        """
+        cache_key = (kind, key)
+        ttl = self.ttl(kind)
+        if not use_cache:
+            value = await loader()
+            if store is None or store(value):
+                self._reads.put(cache_key, value, ttl)
+            return value
+        return await self._reads.load(cache_key, loader, ttl, store)
+
+    async def load_artifacts(self, cache_path: str, genesis_path: str,
+                             name: str = None) -> None:
+        """
+        Load the local cache of ledger artifacts, if not already loaded
+
+        Args:
+            cache_path: the directory containing the artifact cache files
+            genesis_path: the genesis transaction file identifying the ledger
+            name: the name of the ledger worker owning the cache file, if any
+        """
+        if cache_path and not self.artifacts:
+            loop = asyncio.get_event_loop()
+            artifacts = LedgerArtifactCache(cache_path, genesis_path, name)
+            await loop.run_in_executor(None, artifacts.load)
+            self.artifacts = artifacts
+
+    async def save_artifacts(self) -> None:
+        """
+        Persist any changes to the local cache of ledger artifacts. Concurrent saves are
+        written one at a time, each from a copy taken on the event loop
+        """
+        #pylint: disable=broad-except
+        if not self.artifacts:
+            return
+        if not self._artifacts_lock:
+            self._artifacts_lock = asyncio.Lock()
+        async with self._artifacts_lock:
+            if not self.artifacts.dirty:
+                return
+            data = self.artifacts.snapshot()
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self.artifacts.write, data)
+            except Exception:
+                self.artifacts.dirty = True
+                LOGGER.exception("Error saving ledger artifact cache:")
+
+    @property
+    def stats(self) -> dict:
+        """
+        Get the statistics of the ledger read cache
+        """
+        return self._reads.stats
+
+
+class LedgerStatusCache:
+    """
+    The most recent ledger status downloaded from von-network. Once half of the lifetime
+    of the cached copy has passed it is refreshed in the background, and concurrent
+    requests share a single download
+
+    Args:
+        fetch: a function returning an awaitable which downloads the status. The result
+            must have `fetched` and `ttl` attributes
+        run_task: a function used to start the background refresh
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable], run_task: Callable = None):
+        self._fetch = fetch
+        self._refresh = None
+        self._run_task = run_task or asyncio.ensure_future
+        self.current = None
+
+    async def get(self):
+        """
+        Return the cached status if it is current, otherwise download it
+        """
+        cached = self.current
+        if cached:
+            age = time.time() - cached.fetched
+            if age < cached.ttl:
+                if age > cached.ttl / 2 and not self._refresh:
+                    self._run_task(self._refresh_ahead())
+                return cached
+        return await self.refresh()
+
+    async def refresh(self):
+        """
+        Update the cached status, sharing any refresh already in progress
+        """
+        if not self._refresh:
+            self._refresh = asyncio.ensure_future(self._fetch())
+        refresh = self._refresh
+        try:
+            self.current = await asyncio.shield(refresh)
+        finally:
+            if self._refresh is refresh:
+                self._refresh = None
+        return self.current
+
+    async def _refresh_ahead(self) -> None:
+        """
+        Refresh the cached status in the background before it expires
+        """
+        #pylint: disable=broad-except
+        try:
+            await self.refresh()
+        except Exception:
+            LOGGER.exception("Error refreshing ledger status:")
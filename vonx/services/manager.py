@@ -22,6 +22,7 @@ import os
 from typing import Mapping
 
 from .base import ServiceBase
+from .eventloop import LoopMonitor
 from . import exchange as exch
 
 LOGGER = logging.getLogger(__name__)
@@ -34,6 +35,8 @@ class ServiceManager:
         self._executor_cls = exch.RequestExecutor
         self._proc_locals = {'pid': os.getpid()}
         self._process = None
+        self._process_services = set()
+        self._service_procs = {}
         self._services = {}
         self._services_cfg = None
         self._init_services()
@@ -44,15 +47,20 @@ class ServiceManager:
         """
         pass
 
-    def add_service(self, svc_id: str, service: ServiceBase):
+    def add_service(self, svc_id: str, service: ServiceBase, process: bool = False):
         """
         Add a service to the service manager instance
 
         Args:
             svc_id: the unique identifier for the service
             service: the service instance
+            process: whether to run the service in its own process
         """
         self._services[svc_id] = service
+        if process:
+            self._process_services.add(svc_id)
+        else:
+            self._process_services.discard(svc_id)
 
     def start(self) -> None:
         """
@@ -82,10 +90,15 @@ class ServiceManager:
 
     def _start_services(self, wait: bool = True) -> None:
         """
-        Start all registered services
+        Start all registered services. Services with their own process are forked
+        first, before any service threads are running in this process
         """
         for svc_id, service in self._services.items():
-            service.start(wait)
+            if svc_id in self._process_services:
+                self._service_procs[svc_id] = service.start_process()
+        for svc_id, service in self._services.items():
+            if svc_id not in self._process_services:
+                service.start(wait)
 
     def stop(self, wait: bool = True) -> None:
         """
@@ -98,8 +111,14 @@ class ServiceManager:
         """
         Stop all registered services
         """
-        for _id, service in self._services.items():
-            service.stop(wait)
+        for svc_id, service in self._services.items():
+            if svc_id in self._service_procs:
+                proc = self._service_procs.pop(svc_id)
+                proc.terminate()
+                # always reap the terminated process, so it is not left as a zombie
+                proc.join()
+            else:
+                service.stop(wait)
 
     @property
     def env(self) -> dict:
@@ -137,11 +156,43 @@ class ServiceManager:
         """
         ploc = self.proc_locals
         if not 'executor' in ploc:
-            ident = 'exec-{}'.format(ploc['pid'])
-            ploc['executor'] = self._executor_cls(ident, self._exchange)
+            ploc['executor'] = self._create_executor()
             ploc['executor'].start()
         return ploc['executor']
 
+    def bind_executor(self, loop: asyncio.AbstractEventLoop = None) -> exch.RequestExecutor:
+        """
+        Create the per-process request executor on an event loop which is already running
+        in the current thread, such as the loop of the aiohttp application. Requests and
+        replies are then awaited natively on that loop without a cross-thread handoff.
+
+        Args:
+            loop: the running event loop, defaulting to the current event loop
+        """
+        loop = loop or asyncio.get_event_loop()
+        ploc = self.proc_locals
+        if 'executor' in ploc:
+            if ploc['executor'].runner().loop is not loop:
+                raise RuntimeError('Request executor already started for this process')
+        else:
+            ploc['executor'] = self._create_executor()
+            ploc['executor'].start(loop=loop)
+        return ploc['executor']
+
+    def _create_executor(self) -> exch.RequestExecutor:
+        """
+        Construct a new request executor for the current process
+        """
+        ident = 'exec-{}'.format(self.proc_locals['pid'])
+        return self._executor_cls(ident, self._exchange, LoopMonitor.from_env(self._env))
+
+    @property
+    def service_names(self) -> list:
+        """
+        Accessor for the names of all registered services
+        """
+        return list(self._services.keys())
+
     def get_service(self, name: str):
         """
         Fetch a defined service by name
@@ -0,0 +1,396 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from collections import OrderedDict
+import json
+import logging
+import os
+import pathlib
+import time
+import uuid
+
+from .artifacts import payload_digest
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+
+class CredentialOutbox:
+    """
+    A durable, append-only journal of credentials awaiting delivery to TheOrgBook.
+
+    Records are appended to numbered segment files as JSON lines, and writes from
+    concurrent callers are grouped so that a single fsync covers each batch. Delivered
+    credentials are acknowledged with a further record, as are failed delivery attempts
+    so that the retry delay keeps increasing across restarts. An index of undelivered
+    records, their positions and delivery attempts is saved periodically, so that on
+    startup only the part of the journal written since the last index needs to be
+    scanned. Segments containing no undelivered records are removed when the index
+    is saved.
+
+    Args:
+        path: the directory containing the journal
+        segment_size: the size in bytes at which a new segment file is started
+        flush_interval: the time in seconds to wait for further records before each fsync
+        index_interval: the minimum time in seconds between saves of the index
+    """
+
+    def __init__(self, path: str, segment_size: int = 16777216, flush_interval: float = 0.05,
+                 index_interval: float = 30):
+        self._dir = pathlib.Path(path)
+        self._segment_size = max(int(segment_size), 4096)
+        self._flush_interval = max(float(flush_interval), 0.0)
+        self._index_interval = max(float(index_interval), 0.0)
+        self._index_saved = time.monotonic()
+        self._attempts = {}
+        self._buffer = []
+        self._deferred = {}
+        self._file = None
+        self._flusher = None
+        self._pending = OrderedDict()
+        self._position = (0, 0)
+        self._saving = None
+        self._stats = {
+            "acked": 0,
+            "added": 0,
+            "fsyncs": 0,
+            "retried": 0,
+        }
+
+    def _segment_path(self, segment: int) -> pathlib.Path:
+        return self._dir.joinpath("outbox-{:08d}.log".format(segment))
+
+    @property
+    def _index_path(self) -> pathlib.Path:
+        return self._dir.joinpath("outbox-index.json")
+
+    def _segments(self) -> list:
+        """
+        List the numbers of the existing segment files in order
+        """
+        found = []
+        for entry in self._dir.glob("outbox-*.log"):
+            try:
+                found.append(int(entry.stem.split("-", 1)[1]))
+            except ValueError:
+                continue
+        return sorted(found)
+
+    def open(self) -> None:
+        """
+        Load the replay index and scan the remainder of the journal. This performs
+        blocking I/O and should be run in an executor
+        """
+        if not self._dir.exists():
+            self._dir.mkdir(parents=True)
+        start = self._load_index()
+        for segment in self._segments():
+            if segment < start[0]:
+                continue
+            offset = start[1] if segment == start[0] else 0
+            self._scan_segment(segment, offset)
+        segment, offset = self._position
+        self._file = self._segment_path(segment).open("ab")
+        LOGGER.info(
+            "Opened credential outbox %s with %d undelivered credentials",
+            self._dir, len(self._pending))
+
+    def _load_index(self) -> tuple:
+        """
+        Load the saved index of undelivered records, returning the journal position it covers
+        """
+        #pylint: disable=broad-except
+        path = self._index_path
+        if not path.exists():
+            return (0, 0)
+        try:
+            with path.open() as index_file:
+                stored = json.load(index_file)
+            data = stored["data"]
+            if stored.get("checksum") != payload_digest(data) or \
+                    data.get("version") != INDEX_VERSION:
+                raise ValueError("invalid index")
+        except Exception as e:
+            LOGGER.warning("Rebuilding credential outbox index %s: %s", path, e)
+            return (0, 0)
+        self._pending = OrderedDict(
+            (rec_id, tuple(pos)) for (rec_id, pos) in data["pending"])
+        self._attempts = dict(data["attempts"])
+        self._position = tuple(data["position"])
+        return self._position
+
+    def _scan_segment(self, segment: int, offset: int) -> None:
+        """
+        Apply the records in a segment file from the given offset. A partial record at the
+        end of the journal (from an interrupted write) is truncated
+        """
+        path = self._segment_path(segment)
+        with path.open("r+b") as seg_file:
+            seg_file.seek(offset)
+            pos = offset
+            for line in seg_file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    LOGGER.warning("Truncating partial outbox record in %s at %d", path, pos)
+                    seg_file.seek(pos)
+                    seg_file.truncate()
+                    break
+                if record.get("op") == "add":
+                    self._pending[record["id"]] = (segment, pos, len(line))
+                elif record.get("op") == "ack":
+                    self._pending.pop(record["id"], None)
+                    self._attempts.pop(record["id"], None)
+                elif record.get("op") == "retry" and record["id"] in self._pending:
+                    self._attempts[record["id"]] = record["attempts"]
+                pos += len(line)
+        self._position = (segment, pos)
+
+    async def add(self, issuer_id: str, cred: dict) -> str:
+        """
+        Journal a credential for delivery, returning once it has been written durably
+
+        Args:
+            issuer_id: the identifier of the issuer of the credential
+            cred: the credential properties
+
+        Returns:
+            the unique identifier of the outbox record
+        """
+        rec_id = uuid.uuid4().hex
+        pos = await self._append({"op": "add", "id": rec_id, "issuer_id": issuer_id, "cred": cred})
+        self._pending[rec_id] = pos
+        self._stats["added"] += 1
+        return rec_id
+
+    async def ack(self, rec_ids: list) -> None:
+        """
+        Record the delivery of one or more credentials
+        """
+        for rec_id in rec_ids:
+            if self._pending.pop(rec_id, None):
+                self._attempts.pop(rec_id, None)
+                self._deferred.pop(rec_id, None)
+                self._stats["acked"] += 1
+        await asyncio.gather(*(self._append({"op": "ack", "id": rec_id}) for rec_id in rec_ids))
+
+    async def retry(self, rec_ids: list, interval: float, max_delay: float) -> None:
+        """
+        Record failed delivery attempts, postponing the next attempt of each record
+        by a delay which doubles with each failure
+
+        Args:
+            rec_ids: the identifiers of the records which could not be delivered
+            interval: the base delay in seconds
+            max_delay: the maximum delay in seconds
+        """
+        records = []
+        for rec_id in rec_ids:
+            if rec_id in self._pending:
+                attempts = self._attempts.get(rec_id, 0) + 1
+                self._attempts[rec_id] = attempts
+                self.defer(rec_id, min(interval * 2 ** attempts, max_delay))
+                records.append({"op": "retry", "id": rec_id, "attempts": attempts})
+                self._stats["retried"] += 1
+        await asyncio.gather(*(self._append(record) for record in records))
+
+    def attempts(self, rec_id: str) -> int:
+        """
+        Get the number of failed delivery attempts of a record
+        """
+        return self._attempts.get(rec_id, 0)
+
+    def defer(self, rec_id: str, delay: float) -> None:
+        """
+        Postpone the next delivery attempt of a record
+        """
+        if rec_id in self._pending:
+            self._deferred[rec_id] = time.monotonic() + delay
+
+    def due(self, limit: int) -> list:
+        """
+        Get the identifiers of up to `limit` undelivered records which are due for delivery
+        """
+        now = time.monotonic()
+        found = []
+        for rec_id in self._pending:
+            if self._deferred.get(rec_id, 0) <= now:
+                found.append(rec_id)
+                if len(found) >= limit:
+                    break
+        return found
+
+    async def read(self, rec_ids: list) -> list:
+        """
+        Load the journaled records for a list of identifiers
+        """
+        positions = [self._pending[rec_id] for rec_id in rec_ids if rec_id in self._pending]
+        return await asyncio.get_event_loop().run_in_executor(None, self._read, positions)
+
+    def _read(self, positions: list) -> list:
+        records = []
+        for (segment, offset, length) in positions:
+            with self._segment_path(segment).open("rb") as seg_file:
+                seg_file.seek(offset)
+                records.append(json.loads(seg_file.read(length).decode("utf-8")))
+        return records
+
+    def _append(self, record: dict) -> asyncio.Future:
+        """
+        Queue a record to be written by the next group commit
+        """
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        written = asyncio.get_event_loop().create_future()
+        self._buffer.append((line, written))
+        if not self._flusher or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush())
+        return written
+
+    async def _flush(self) -> None:
+        """
+        Write buffered records in batches, with one fsync per batch
+        """
+        #pylint: disable=broad-except
+        loop = asyncio.get_event_loop()
+        while self._buffer:
+            if self._flush_interval:
+                await asyncio.sleep(self._flush_interval)
+            batch, self._buffer = self._buffer, []
+            try:
+                positions = await loop.run_in_executor(
+                    None, self._write, [line for (line, _written) in batch])
+            except Exception as e:
+                for (_line, written) in batch:
+                    if not written.done():
+                        written.set_exception(e)
+                continue
+            self._stats["fsyncs"] += 1
+            for (_line, written), pos in zip(batch, positions):
+                if not written.done():
+                    written.set_result(pos)
+
+    def _write(self, lines: list) -> list:
+        """
+        Append records to the current segment and fsync, returning their positions
+        """
+        #pylint: disable=broad-except
+        segment, offset = self._position
+        if offset >= self._segment_size:
+            self._file.close()
+            segment, offset = segment + 1, 0
+            self._file = self._segment_path(segment).open("ab")
+            self._position = (segment, offset)
+        positions = []
+        try:
+            for line in lines:
+                self._file.write(line)
+                positions.append((segment, offset, len(line)))
+                offset += len(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception:
+            self._discard()
+            raise
+        self._position = (segment, offset)
+        return positions
+
+    def _discard(self) -> None:
+        """
+        Remove any part of a failed batch from the current segment, so that the
+        next batch is written at the last recorded position
+        """
+        #pylint: disable=broad-except
+        segment, offset = self._position
+        try:
+            # drops any buffered data which cannot be written
+            self._file.close()
+        except Exception:
+            pass
+        path = self._segment_path(segment)
+        os.truncate(str(path), offset)
+        self._file = path.open("ab")
+
+    async def checkpoint(self) -> None:
+        """
+        Save the index if it has not been saved within the index interval
+        """
+        if time.monotonic() - self._index_saved >= self._index_interval:
+            await self.save_index()
+
+    async def save_index(self) -> None:
+        """
+        Save the index of undelivered records and remove fully delivered segments
+        """
+        # wait for any records in progress so the index covers all journaled records,
+        # and for any previous save which may still be running in the executor
+        while self._flusher and not self._flusher.done():
+            await asyncio.shield(self._flusher)
+        while self._saving and not self._saving.done():
+            await asyncio.wait([self._saving])
+        self._index_saved = time.monotonic()
+        data = {
+            "attempts": self._attempts.copy(),
+            "pending": [[rec_id, list(pos)] for (rec_id, pos) in self._pending.items()],
+            "position": list(self._position),
+            "version": INDEX_VERSION,
+        }
+        self._saving = asyncio.get_event_loop().run_in_executor(None, self._save_index, data)
+        await asyncio.shield(self._saving)
+
+    def _save_index(self, data: dict) -> None:
+        path = self._index_path
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("w") as index_file:
+            json.dump({"checksum": payload_digest(data), "data": data}, index_file)
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        os.replace(str(tmp_path), str(path))
+        active = min(
+            [pos[0] for (_rec_id, pos) in data["pending"]] + [data["position"][0]])
+        for segment in self._segments():
+            if segment < active:
+                self._segment_path(segment).unlink()
+
+    def close(self) -> None:
+        """
+        Close the current segment file
+        """
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    @property
+    def pending(self) -> int:
+        """
+        The number of undelivered records
+        """
+        return len(self._pending)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the outbox statistics
+        """
+        status = self._stats.copy()
+        status["pending"] = len(self._pending)
+        status["deferred"] = len(self._deferred)
+        status["segment"] = self._position[0]
+        return status
@@ -0,0 +1,170 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PipelineStage:
+    """
+    A single stage of a :class:`Pipeline`, consisting of a bounded queue of work
+    items and a fixed number of workers processing them
+
+    Args:
+        name: the name of the stage
+        handler: a function accepting a work item and returning an awaitable
+            which resolves to the work item for the next stage
+        workers: the number of items processed at once
+        queue_size: the maximum number of items waiting for a worker (0 for no limit)
+    """
+
+    def __init__(self, name: str, handler: Callable[[dict], Awaitable],
+                 workers: int = 1, queue_size: int = 0):
+        self.name = name
+        self.handler = handler
+        self.workers = max(int(workers or 1), 1)
+        self.queue_size = max(int(queue_size or 0), 0)
+        self.queue = None
+        self._stats = {
+            "active": 0,
+            "errors": 0,
+            "peak_queued": 0,
+            "processed": 0,
+        }
+
+    async def put(self, result: asyncio.Future, item) -> None:
+        """
+        Add a work item to the stage queue, waiting while the queue is full
+
+        Args:
+            result: the future to be resolved with the final result for the item
+            item: the work item
+        """
+        await self.queue.put((result, item))
+        self._stats["peak_queued"] = max(self._stats["peak_queued"], self.queue.qsize())
+
+    async def run(self, next_stage: "PipelineStage" = None) -> None:
+        """
+        Process items from the stage queue, passing each result on to the next stage
+        or resolving the item's future after the final stage. Each item is handled in
+        its own task, so that a handler raising :class:`asyncio.CancelledError` only
+        cancels the item and not the worker
+
+        Args:
+            next_stage: the following stage in the pipeline, if any
+        """
+        while True:
+            result, item = await self.queue.get()
+            if result.done():
+                # the caller has given up waiting
+                continue
+            self._stats["active"] += 1
+            handled = asyncio.ensure_future(self.handler(item))
+            try:
+                await asyncio.wait([handled])
+            except asyncio.CancelledError:
+                # the worker itself is being stopped
+                handled.cancel()
+                raise
+            finally:
+                self._stats["active"] -= 1
+            if handled.cancelled() or handled.exception():
+                self._stats["errors"] += 1
+                if not result.done():
+                    if handled.cancelled():
+                        result.cancel()
+                    else:
+                        result.set_exception(handled.exception())
+                continue
+            item = handled.result()
+            self._stats["processed"] += 1
+            if next_stage:
+                await next_stage.put(result, item)
+            elif not result.done():
+                result.set_result(item)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the current queue depth and processing statistics for the stage
+        """
+        status = self._stats.copy()
+        status["queued"] = self.queue.qsize() if self.queue else 0
+        status["queue_size"] = self.queue_size
+        status["workers"] = self.workers
+        return status
+
+
+class Pipeline:
+    """
+    A sequence of processing stages, each with its own queue and workers, allowing
+    different stages of separate work items to overlap. Each submitted item passes
+    through every stage in order, and the result of the final stage is returned
+    to the caller. Full queues apply back-pressure to the preceding stage
+
+    Args:
+        stages: the list of :class:`PipelineStage` instances
+    """
+
+    def __init__(self, stages: list):
+        if not stages:
+            raise ValueError("No stages defined for pipeline")
+        self._stages = stages
+        self._workers = []
+
+    def start(self) -> None:
+        """
+        Create the stage queues and start the workers on the current event loop
+        """
+        if self._workers:
+            return
+        for stage in self._stages:
+            stage.queue = asyncio.Queue(stage.queue_size)
+        for idx, stage in enumerate(self._stages):
+            next_stage = self._stages[idx + 1] if idx + 1 < len(self._stages) else None
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.ensure_future(stage.run(next_stage)))
+
+    def stop(self) -> None:
+        """
+        Cancel the stage workers
+        """
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def submit(self, item: dict):
+        """
+        Add a work item to the pipeline and wait for the result of the final stage
+
+        Args:
+            item: the initial work item
+        """
+        self.start()
+        result = asyncio.get_event_loop().create_future()
+        await self._stages[0].put(result, item)
+        return await result
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the queue depths and processing statistics of each stage
+        """
+        return {stage.name: stage.status for stage in self._stages}
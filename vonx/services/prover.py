@@ -17,6 +17,8 @@
 
 import asyncio
 import hashlib
+from itertools import cycle
+import json
 import logging
 from random import randint
 from typing import Mapping
@@ -26,7 +28,7 @@ from von_agent.util import schema_id
 from .base import Exchange, ServiceBase, ServiceError, ServiceRequest, ServiceResponse
 from .indy import IndyVerifyProofReq, IndyVerifiedProof
 from .issuer import ResolveSchemaRequest, ResolveSchemaResponse
-from .tob import TobClient, TobClientError
+from .tob import TobCallPolicy, TobClient, TobClientError
 from .util import log_json
 
 LOGGER = logging.getLogger(__name__)
@@ -110,13 +112,25 @@ class ProverManager(ServiceBase):
     and returning the results.
     """
 
-    def __init__(self, pid: str, exchange: Exchange, env: Mapping, request_specs=None):
+    def __init__(self, pid: str, exchange: Exchange, env: Mapping, request_specs=None,
+                 ledger_pids: list = None):
         super(ProverManager, self).__init__(pid, exchange, env)
         self._ledger_pid = 'indy-ledger'
+        # proofs may be verified by any verifier service (or ledger worker)
+        self._ledger_pids = cycle(ledger_pids or [self._ledger_pid])
         self._request_specs = request_specs or {}
         for spec_id, spec in self._request_specs.items():
             if 'name' not in spec:
                 spec['name'] = spec_id
+        self._tob_policies = {}
+
+    def _get_status(self) -> dict:
+        """
+        Include the TheOrgBook call statistics and circuit breaker state in the service status
+        """
+        status = super(ProverManager, self)._get_status()
+        status['tob'] = {url: policy.status for url, policy in self._tob_policies.items()}
+        return status
 
     async def _service_sync(self) -> bool:
         return await self._resolve_schemas()
@@ -162,7 +176,9 @@ class ProverManager(ServiceBase):
             url: a custom value for the URL of the API handling the proof request
         """
         api_url = url or self._env.get('TOB_API_URL')
-        return TobClient(self.http, api_url)
+        if api_url not in self._tob_policies:
+            self._tob_policies[api_url] = TobCallPolicy.from_env(self._env)
+        return TobClient(self.http, api_url, self._tob_policies[api_url])
 
     async def construct_proof(self, name: str, filters: Mapping) -> dict:
         """
@@ -195,7 +211,7 @@ class ProverManager(ServiceBase):
                 log_json('Got proof response:', proof_response, LOGGER)
             except TobClientError as e:
                 if e.status_code == 406:
-                    message = await e.response.json()
+                    message = json.loads(e.response)
                     return {'success': False, 'error': message['detail']}
                 LOGGER.exception('Error response while requesting proof:')
                 return {'success': False, 'error': 'Unexpected response from server'}
@@ -203,7 +219,7 @@ class ProverManager(ServiceBase):
         proof = proof_response['proof']
 
         msg = IndyVerifyProofReq(proof_request, proof)
-        reply = await self.submit(self._ledger_pid, msg)
+        reply = await self.submit(next(self._ledger_pids), msg)
         if not isinstance(reply, IndyVerifiedProof):
             raise RuntimeError('Proof could not be verified, received {}'.format(reply))
 
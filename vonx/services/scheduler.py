@@ -0,0 +1,190 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from collections import deque
+import time
+
+
+class ScheduledQueue:
+    """
+    The queue of waiting work for a single key (such as an issuer) in a :class:`FairScheduler`
+
+    Args:
+        weight: the relative share of capacity given to this queue when busy
+        max_inflight: the maximum number of items from this queue in progress at once
+    """
+
+    def __init__(self, weight: float = 1, max_inflight: int = None):
+        self.weight = max(float(weight or 1), 0.01)
+        self.max_inflight = int(max_inflight) if max_inflight else None
+        self.inflight = 0
+        self.passed = 0.0
+        self.waiters = deque()
+        self._stats = {
+            "served": 0,
+            "wait_max": 0.0,
+            "wait_total": 0.0,
+        }
+
+    @property
+    def eligible(self) -> bool:
+        """
+        Whether the queue has waiting work and is below its in-flight limit
+        """
+        return bool(self.waiters) and (
+            self.max_inflight is None or self.inflight < self.max_inflight)
+
+    def record_wait(self, waited: float) -> None:
+        """
+        Update the queue wait statistics when an item is started
+        """
+        self._stats["served"] += 1
+        self._stats["wait_total"] += waited
+        self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the current queue length and wait time statistics
+        """
+        stats = self._stats.copy()
+        stats["inflight"] = self.inflight
+        stats["max_inflight"] = self.max_inflight
+        stats["queued"] = len(self.waiters)
+        stats["weight"] = self.weight
+        stats["wait_mean"] = round(
+            stats["wait_total"] / stats["served"], 6) if stats["served"] else 0.0
+        stats["wait_max"] = round(stats["wait_max"], 6)
+        del stats["wait_total"]
+        return stats
+
+
+class SchedulerSlot:
+    """
+    An async context manager which holds a slot in a :class:`FairScheduler`
+    for the duration of an `async with` block
+    """
+
+    def __init__(self, scheduler: "FairScheduler", key):
+        self._key = key
+        self._scheduler = scheduler
+
+    async def __aenter__(self):
+        await self._scheduler.acquire(self._key)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._scheduler.release(self._key)
+
+
+class FairScheduler:
+    """
+    Share a fixed number of concurrent slots between separate queues of work using
+    weighted fair (stride) scheduling. When several queues are waiting, each receives
+    slots in proportion to its weight, so a busy queue cannot hold back the others
+
+    Args:
+        concurrency: the total number of items in progress at once
+    """
+
+    def __init__(self, concurrency: int = 32):
+        self._concurrency = max(int(concurrency or 1), 1)
+        self._inflight = 0
+        self._queues = {}
+        self._vtime = 0.0
+
+    def configure(self, key, weight: float = 1, max_inflight: int = None) -> None:
+        """
+        Set the weight and in-flight limit for a queue
+
+        Args:
+            key: the queue identifier
+            weight: the relative share of capacity given to the queue
+            max_inflight: the maximum number of items from the queue in progress at once
+        """
+        queue = self._queue(key)
+        queue.weight = ScheduledQueue(weight).weight
+        queue.max_inflight = int(max_inflight) if max_inflight else None
+
+    def _queue(self, key) -> ScheduledQueue:
+        if key not in self._queues:
+            self._queues[key] = ScheduledQueue()
+        return self._queues[key]
+
+    async def acquire(self, key) -> None:
+        """
+        Wait until a slot is granted to the given queue
+        """
+        queue = self._queue(key)
+        if not queue.waiters and not queue.inflight:
+            # an idle queue does not accumulate credit while it is inactive
+            queue.passed = max(queue.passed, self._vtime)
+        waiter = asyncio.get_event_loop().create_future()
+        queue.waiters.append((waiter, time.monotonic()))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was granted as the caller was cancelled
+                self.release(key)
+            raise
+
+    def release(self, key) -> None:
+        """
+        Return a slot held by the given queue
+        """
+        queue = self._queues[key]
+        queue.inflight -= 1
+        self._inflight -= 1
+        self._dispatch()
+
+    def slot(self, key) -> SchedulerSlot:
+        """
+        Hold a slot for the given queue for the duration of an `async with` block
+        """
+        return SchedulerSlot(self, key)
+
+    def _dispatch(self) -> None:
+        """
+        Grant free slots to the eligible queues with the lowest virtual time
+        """
+        while self._inflight < self._concurrency:
+            eligible = [queue for queue in self._queues.values() if queue.eligible]
+            if not eligible:
+                break
+            queue = min(eligible, key=lambda q: q.passed)
+            waiter, queued = queue.waiters.popleft()
+            if waiter.done():
+                continue
+            waiter.set_result(None)
+            queue.record_wait(time.monotonic() - queued)
+            queue.inflight += 1
+            self._inflight += 1
+            self._vtime = queue.passed
+            queue.passed += 1.0 / queue.weight
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the overall slot usage and the status of each queue
+        """
+        return {
+            "concurrency": self._concurrency,
+            "inflight": self._inflight,
+            "queues": {key: queue.status for key, queue in self._queues.items()},
+        }
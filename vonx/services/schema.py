@@ -107,8 +107,9 @@ class Schema:
         """
         if self.name == schema.name and self.version == schema.version:
             if not self.issuer_did or not schema.issuer_did or self.issuer_did == schema.issuer_did:
-                if not self.attributes or not schema.attributes \
-                        or self.attributes == schema.attributes:
+                # copy the other attribute list only once
+                other = schema.attributes
+                if not self._attributes or not other or self._attributes == other:
                     return True
         return False
 
@@ -116,6 +117,82 @@ class Schema:
         return 'Schema(name={}, version={})'.format(self.name, self.version)
 
 
+class SchemaRoutes:
+    """
+    An index of values (such as issuers or credential types) keyed by schema name,
+    version and an optional issuer DID, allowing schema lookups without scanning.
+    Entries are grouped by an owner so that they can be replaced incrementally.
+    When several entries match a lookup, the entry of the owner which was added first
+    is returned, even if that owner's entries have since been replaced
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._owners = {}
+        self._ranks = {}
+
+    def add(self, owner, name: str, version: str, value, issuer_did: str = None) -> None:
+        """
+        Add an entry to the index
+
+        Args:
+            owner: the identifier of the owner of the entry
+            name: the schema name
+            version: the schema version
+            value: the value to be returned by lookups
+            issuer_did: the DID of the issuer, if known
+        """
+        keys = [(name, version, None), (name, None, None)]
+        if issuer_did:
+            keys.extend([(name, version, issuer_did), (name, None, issuer_did)])
+        rank = self._ranks.setdefault(owner, len(self._ranks))
+        for key in keys:
+            entries = self._routes.setdefault(key, [])
+            # keep the entries in the order their owners were first added
+            pos = len(entries)
+            while pos and self._ranks[entries[pos - 1][0]] > rank:
+                pos -= 1
+            entries.insert(pos, (owner, value))
+        self._owners.setdefault(owner, set()).update(keys)
+
+    def remove_owner(self, owner) -> None:
+        """
+        Remove all entries added by an owner. The owner keeps its position in the
+        lookup order if its entries are added again
+        """
+        for key in self._owners.pop(owner, ()):
+            entries = [entry for entry in self._routes[key] if entry[0] != owner]
+            if entries:
+                self._routes[key] = entries
+            else:
+                del self._routes[key]
+
+    def find_entry(self, name: str, version: str = None, issuer_did: str = None) -> tuple:
+        """
+        Locate an entry in the index
+
+        Args:
+            name: the schema name
+            version: the schema version, or None to match any version
+            issuer_did: the DID of the issuer, or None to match any issuer
+
+        Returns:
+            a tuple of the owner and value, or None if not found
+        """
+        entries = self._routes.get((name, version or None, issuer_did or None))
+        return entries[0] if entries else None
+
+    def find(self, name: str, version: str = None, issuer_did: str = None):
+        """
+        Locate a value in the index
+
+        Returns:
+            the value, or None if not found
+        """
+        entry = self.find_entry(name, version, issuer_did)
+        return entry[1] if entry else None
+
+
 class SchemaManager:
     """
     A manager class for handling a set of loaded credential schema definitions
@@ -15,7 +15,12 @@
 # limitations under the License.
 #
 
+import asyncio
 import logging
+import random
+import time
+
+import aiohttp
 
 from .indy import (
     IndyCredOffer,
@@ -78,15 +83,322 @@ class TobClientError(Exception):
         self.response = response
 
 
+class CircuitBreaker:
+    """
+    Stop sending requests to an unhealthy service. After `threshold` consecutive
+    failures the breaker opens and requests fail immediately; after `reset_timeout`
+    seconds a single trial request is allowed, which closes the breaker if it succeeds
+
+    Args:
+        threshold: the number of consecutive failures which opens the breaker
+        reset_timeout: the number of seconds before a trial request is allowed
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30):
+        self.threshold = max(int(threshold), 1)
+        self.reset_timeout = float(reset_timeout)
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        """
+        The current state of the breaker: `closed`, `open` or `half-open`
+        """
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """
+        Determine whether a request may be sent
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def record_success(self) -> None:
+        """
+        Record a successful request, closing the breaker
+        """
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed request, opening the breaker when the threshold is reached
+        """
+        self._failures += 1
+        if self._trial or (self._opened_at is None and self._failures >= self.threshold):
+            self._stats["opened"] += 1
+            self._opened_at = time.monotonic()
+        self._trial = False
+
+    def abandon(self) -> None:
+        """
+        Record a request which was cancelled before it completed. Neither success
+        nor failure is recorded, but another trial request may be sent if this was one
+        """
+        self._trial = False
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the current breaker state and statistics
+        """
+        status = self._stats.copy()
+        status["failures"] = self._failures
+        status["state"] = self.state
+        return status
+
+
+class RetryBudget:
+    """
+    Limit retries to a fraction of the overall request rate, so that retries cannot
+    multiply the load on a service which is already failing. Each request adds
+    `ratio` tokens, up to `max_tokens`, and each retry spends one token
+
+    Args:
+        ratio: the number of retries allowed per request
+        max_tokens: the maximum number of retries which may be saved up
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10):
+        self.ratio = max(float(ratio), 0.0)
+        self.max_tokens = max(float(max_tokens), 1.0)
+        self._tokens = self.max_tokens
+
+    def deposit(self) -> None:
+        """
+        Record a new request
+        """
+        self._tokens = min(self._tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self) -> bool:
+        """
+        Spend a token for a retry, returning False if the budget is exhausted
+        """
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    @property
+    def tokens(self) -> float:
+        """
+        The number of retries currently available
+        """
+        return round(self._tokens, 2)
+
+
+class TobCallPolicy:
+    """
+    The timeout, retry, hedging and circuit breaker policy for requests to a
+    TheOrgBook instance, shared by all :class:`TobClient` instances using the same API.
+
+    Only failures which indicate TheOrgBook is unhealthy (connection errors, timeouts,
+    and 429 or 5xx responses) are retried or counted by the breaker. Requests to methods
+    which are not idempotent (such as storing a credential) are only retried when the
+    connection could not be established, and are never hedged
+
+    Args:
+        timeout: the default request timeout in seconds
+        timeouts: a dict of timeouts for specific API paths
+        retries: the maximum number of retries for a single request
+        backoff: the base delay in seconds before retrying, doubled for each attempt
+        backoff_max: the maximum delay before retrying
+        budget: the :class:`RetryBudget` instance
+        breaker: the :class:`CircuitBreaker` instance
+        hedge_delay: the delay in seconds before a duplicate of a slow idempotent
+            request is sent, or 0 to disable hedging
+    """
+
+    IDEMPOTENT = (
+        "indy/construct-proof",
+        "indy/generate-credential-request",
+        "indy/generate-credential-request-batch",
+        "indy/register-issuer",
+    )
+
+    def __init__(self, timeout: float = 30, timeouts: dict = None, retries: int = 2,
+                 backoff: float = 0.2, backoff_max: float = 5,
+                 budget: RetryBudget = None, breaker: CircuitBreaker = None,
+                 hedge_delay: float = 0):
+        self.timeout = float(timeout) if timeout else None
+        self.timeouts = {path: float(val) for (path, val) in (timeouts or {}).items()}
+        self.retries = max(int(retries), 0)
+        self.backoff = float(backoff)
+        self.backoff_max = float(backoff_max)
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_delay = float(hedge_delay or 0)
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "hedged": 0,
+            "retries": 0,
+            "timeouts": 0,
+        }
+
+    @classmethod
+    def from_env(cls, env: dict) -> "TobCallPolicy":
+        """
+        Create a policy from the TOB_* application settings. TOB_TIMEOUTS may be a
+        dict or a string of `path=seconds` pairs separated by whitespace
+        """
+        env = env or {}
+        timeouts = env.get("TOB_TIMEOUTS") or {}
+        if isinstance(timeouts, str):
+            timeouts = dict(item.split("=", 1) for item in timeouts.split())
+        return cls(
+            env.get("TOB_TIMEOUT", 30),
+            timeouts,
+            env.get("TOB_RETRIES", 2),
+            env.get("TOB_RETRY_BACKOFF", 0.2),
+            env.get("TOB_RETRY_BACKOFF_MAX", 5),
+            RetryBudget(env.get("TOB_RETRY_BUDGET", 0.2)),
+            CircuitBreaker(
+                env.get("TOB_BREAKER_THRESHOLD", 5),
+                env.get("TOB_BREAKER_RESET", 30)),
+            env.get("TOB_HEDGE_DELAY", 0),
+        )
+
+    def get_timeout(self, path: str) -> float:
+        """
+        Get the timeout for requests to an API path
+        """
+        return self.timeouts.get(path, self.timeout)
+
+    @staticmethod
+    def is_failure(error: Exception) -> bool:
+        """
+        Determine whether an error indicates that TheOrgBook is unhealthy
+        """
+        if isinstance(error, TobClientError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+    def is_retryable(self, path: str, error: Exception) -> bool:
+        """
+        Determine whether a failed request may safely be sent again
+        """
+        if isinstance(error, aiohttp.ClientConnectorError):
+            return True
+        return path in self.IDEMPOTENT and self.is_failure(error)
+
+    async def call(self, path: str, attempt):
+        """
+        Perform a request according to the policy
+
+        Args:
+            path: the API path being requested
+            attempt: a function accepting a timeout and returning an awaitable
+                which performs a single attempt of the request
+        """
+        trial = self.breaker.state == "half-open"
+        if not self.breaker.allow():
+            raise TobClientError(503, "TheOrgBook is unavailable (circuit breaker open)", None)
+        self._stats["calls"] += 1
+        self.budget.deposit()
+        retries = 0
+        try:
+            while True:
+                try:
+                    result = await self._attempt(path, attempt)
+                except asyncio.CancelledError:
+                    # before Python 3.8 this is also an Exception, handled below
+                    raise
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self._stats["timeouts"] += 1
+                    if not self.is_failure(e):
+                        # TheOrgBook responded, so it is considered healthy
+                        self.breaker.record_success()
+                        raise
+                    self._stats["failures"] += 1
+                    self.breaker.record_failure()
+                    if retries >= self.retries or not self.is_retryable(path, e) \
+                            or not self.budget.withdraw():
+                        raise
+                    trial = self.breaker.state == "half-open"
+                    if not self.breaker.allow():
+                        raise
+                    retries += 1
+                    self._stats["retries"] += 1
+                    delay = min(self.backoff * (2 ** (retries - 1)), self.backoff_max)
+                    await asyncio.sleep(random.uniform(0, delay))
+                else:
+                    self.breaker.record_success()
+                    return result
+        except asyncio.CancelledError:
+            # a cancelled request says nothing about the health of TheOrgBook,
+            # but another trial request may be sent if this was one
+            if trial:
+                self.breaker.abandon()
+            raise
+
+    async def _attempt(self, path: str, attempt):
+        """
+        Perform a single attempt of a request, sending a second copy of an idempotent
+        request if the first has not completed within the hedging delay
+        """
+        timeout = self.get_timeout(path)
+        if not self.hedge_delay or path not in self.IDEMPOTENT:
+            return await attempt(timeout)
+        tasks = [asyncio.ensure_future(attempt(timeout))]
+        try:
+            done, _pending = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if done:
+                return tasks[0].result()
+            self._stats["hedged"] += 1
+            tasks.append(asyncio.ensure_future(attempt(timeout)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the breaker state and request statistics
+        """
+        status = self._stats.copy()
+        status["breaker"] = self.breaker.status
+        status["retry_tokens"] = self.budget.tokens
+        return status
+
+
 class TobClient:
     """
     A class for managing communication with TheOrgBook API and performing the initial
     synchronization as an issuer
     """
 
-    def __init__(self, http_client, api_url: str):
+    def __init__(self, http_client, api_url: str, policy: TobCallPolicy = None):
         self._http_client = http_client
         self._api_url = api_url
+        self._batch_unsupported = set()
+        self._policy = policy
 
     async def register_issuer(self, issuer_cfg: dict):
         """
@@ -150,6 +462,106 @@ class TobClient:
             indy_cred,
             result)
 
+    async def generate_credential_requests(self, indy_offers: list) -> list:
+        """
+        Ask the API to generate credential requests for a batch of credential offers
+
+        Args:
+            indy_offers: a list of :class:`IndyCredOffer` instances
+
+        Returns:
+            an :class:`IndyCredentialRequest` or an exception for each offer, in the same order
+        """
+        def single(indy_offer):
+            return self.generate_credential_request(indy_offer)
+
+        def result(indy_offer, item):
+            return IndyCredentialRequest(
+                None,
+                indy_offer,
+                item["credential_request"],
+                item["credential_request_metadata"])
+
+        return await self._post_batch(
+            "indy/generate-credential-request-batch",
+            [
+                {
+                    "credential_offer": indy_offer.offer,
+                    "credential_definition": indy_offer.cred_def,
+                } for indy_offer in indy_offers
+            ],
+            indy_offers, single, result)
+
+    async def store_credentials(self, indy_creds: list) -> list:
+        """
+        Ask the API to store a batch of credentials
+
+        Args:
+            indy_creds: a list of :class:`IndyCredential` instances
+
+        Returns:
+            an :class:`IndyStoredCredential` or an exception for each credential,
+            in the same order
+        """
+        def single(indy_cred):
+            return self.store_credential(indy_cred)
+
+        def result(indy_cred, item):
+            return IndyStoredCredential(None, indy_cred, item)
+
+        return await self._post_batch(
+            "indy/store-credential-batch",
+            [
+                {
+                    "credential_type": indy_cred.schema_name,
+                    "credential_data": indy_cred.cred_data,
+                    "issuer_did": indy_cred.issuer_did,
+                    "credential_definition": indy_cred.cred_def,
+                    "credential_request_metadata": indy_cred.cred_req_metadata,
+                } for indy_cred in indy_creds
+            ],
+            indy_creds, single, result)
+
+    async def _post_batch(self, path: str, bodies: list, items: list, single, result) -> list:
+        """
+        Submit a batch request to the API. If the API does not provide the batch
+        method then the items are submitted individually and concurrently instead
+
+        Args:
+            path: the relative path to the batch API method
+            bodies: the request body for each item
+            items: the source item for each request body
+            single: a function returning an awaitable which submits a single item
+            result: a function converting a source item and its batch response to a result
+
+        Returns:
+            a result or an exception for each item, in the same order
+        """
+        if path not in self._batch_unsupported:
+            try:
+                response = await self.post_json(path, {"items": bodies})
+            except TobClientError as e:
+                if e.status_code not in (404, 405):
+                    raise
+                LOGGER.info("Batch method not supported by API, using single requests: %s", path)
+                self._batch_unsupported.add(path)
+            else:
+                results = response.get("results") or []
+                if len(results) != len(items):
+                    raise TobClientError(
+                        400,
+                        "Unexpected number of results from batch request: {}".format(path),
+                        response,
+                    )
+                ret = []
+                for item, item_result in zip(items, results):
+                    if item_result.get("success", True):
+                        ret.append(result(item, item_result.get("result", item_result)))
+                    else:
+                        ret.append(TobClientError(400, str(item_result.get("result")), item_result))
+                return ret
+        return await asyncio.gather(*(single(item) for item in items), return_exceptions=True)
+
     async def construct_proof(self, proof_request: dict):
         """
         Ask the API to construct a proof from a proof request
@@ -184,18 +596,16 @@ class TobClient:
                 authentication headers
             path: The relative path to the API method
         """
+        return await self._call(path, lambda timeout: self._fetch_list(path, timeout))
+
+    async def _fetch_list(self, path: str, timeout: float = None) -> dict:
+        """
+        Perform a single attempt of a `list`-style API request
+        """
         url = self.get_api_url(path)
         LOGGER.debug("fetch_list: %s", url)
-        response = await self._http_client.get(url)
-        if response.status != 200:
-            raise TobClientError(
-                response.status,
-                "Bad response from fetch_list: ({}) {}".format(
-                    response.status, await response.text()
-                ),
-                response,
-            )
-        return await response.json()
+        return await asyncio.wait_for(
+            self._request("fetch_list", self._http_client.get(url), (200,)), timeout)
 
     async def post_json(self, path: str, data):
         """
@@ -207,18 +617,52 @@ class TobClient:
             path: The relative path to the API method
             data: The body of the request, to be converted to JSON
         """
+        return await self._call(path, lambda timeout: self._post_json(path, data, timeout))
+
+    async def _post_json(self, path: str, data, timeout: float = None):
+        """
+        Perform a single attempt of a POST request to an API method
+        """
         url = self.get_api_url(path)
         LOGGER.debug("post_json: %s", url)
-        response = await self._http_client.post(url, json=data)
-        if response.status != 200 and response.status != 201:
-            raise TobClientError(
-                response.status,
-                "Bad response from post_json: ({}) {}".format(
-                    response.status, await response.text()
-                ),
-                response,
-            )
-        return await response.json()
+        return await asyncio.wait_for(
+            self._request("post_json", self._http_client.post(url, json=data), (200, 201)),
+            timeout)
+
+    @staticmethod
+    async def _request(name: str, request, expect_status: tuple):
+        """
+        Send a request and decode the JSON response, returning the connection to the
+        pool once the body has been read (or the request has been abandoned)
+
+        Args:
+            name: the name of the calling method, used in error messages
+            request: the pending request returned by the HTTP client
+            expect_status: the response status codes indicating success
+        """
+        async with request as response:
+            if response.status not in expect_status:
+                text = await response.text()
+                raise TobClientError(
+                    response.status,
+                    "Bad response from {}: ({}) {}".format(name, response.status, text),
+                    text,
+                )
+            return await response.json()
+
+    async def _call(self, path: str, attempt):
+        """
+        Perform an API request according to the call policy, if any
+        """
+        if self._policy:
+            return await self._policy.call(path, attempt)
+        return await attempt(None)
+
+    async def close(self) -> None:
+        """
+        Close the underlying HTTP session
+        """
+        await self._http_client.close()
 
     async def __aenter__(self):
         await self._http_client.__aenter__()
@@ -15,8 +15,12 @@
 # limitations under the License.
 #
 
+from bisect import bisect
+import hashlib
 import json
 import logging
+from typing import Sequence
+from urllib.parse import urlsplit
 
 
 class JsonRepr:
@@ -31,6 +35,91 @@ class JsonRepr:
         return json.dumps(self.value, indent=self.indent)
 
 
+def to_bool(value, default: bool = False) -> bool:
+    """
+    Interpret a configuration value, which may be a string from the environment, as a flag
+    """
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def url_allowed(url: str, allowed) -> bool:
+    """
+    Check a URL against an allow-list of host names (optionally with a port) and
+    URL prefixes, given as a list or a comma-separated string. Only HTTP(S) URLs
+    are accepted, and an empty allow-list accepts nothing
+    """
+    if isinstance(allowed, str):
+        allowed = allowed.split(',')
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return False
+    if parts.scheme not in ('http', 'https') or not host or parts.username:
+        return False
+    for entry in allowed or ():
+        entry = entry.strip()
+        if not entry:
+            continue
+        if '://' not in entry:
+            if entry.lower() in (host, '{}:{}'.format(host, port)):
+                return True
+            continue
+        prefix = urlsplit(entry)
+        if prefix.scheme == parts.scheme and prefix.netloc.lower() == parts.netloc.lower():
+            path = prefix.path
+            if not path or path == parts.path or parts.path.startswith(path.rstrip('/') + '/'):
+                return True
+    return False
+
+
+def hash_key(value: str) -> int:
+    """
+    A stable hash of a string, consistent between processes
+    """
+    return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    A consistent hash ring used to assign keys to a set of nodes, such that
+    changing the number of nodes moves as few keys as possible
+
+    Args:
+        nodes: the identifiers of the nodes
+        replicas: the number of points on the ring for each node
+    """
+
+    def __init__(self, nodes: Sequence, replicas: int = 64):
+        if not nodes:
+            raise ValueError('No nodes provided for hash ring')
+        points = sorted(
+            (hash_key('{}:{}'.format(node, idx)), node)
+            for node in nodes for idx in range(replicas))
+        self._nodes = list(nodes)
+        self._keys = [point[0] for point in points]
+        self._points = [point[1] for point in points]
+
+    @property
+    def nodes(self) -> list:
+        """
+        Accessor for the list of nodes
+        """
+        return self._nodes.copy()
+
+    def get(self, key: str):
+        """
+        Find the node responsible for a key
+        """
+        idx = bisect(self._keys, hash_key(key)) % len(self._keys)
+        return self._points[idx]
+
+
 def log_json(heading, data, logger=None):
     """
     Utility method to log JSON data for debugging
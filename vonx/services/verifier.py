@@ -0,0 +1,145 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from typing import Awaitable, Callable, Mapping
+
+from von_agent.agents import Verifier as VonVerifier
+from von_agent.util import revealed_attrs
+
+from .agents import AgentLimit, AgentWrapper, NodePoolRegistry, WalletConfig
+from .artifacts import payload_digest
+from .cache import TTLCache
+
+
+class CachingVerifier(VonVerifier):
+    """
+    A Verifier agent which resolves schemas and credential definitions through the
+    ledger read cache of the :class:`IndyLedger` service, when one is assigned
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CachingVerifier, self).__init__(*args, **kwargs)
+        self.ledger_read = None
+
+    async def get_schema(self, index):
+        if not self.ledger_read:
+            return await super(CachingVerifier, self).get_schema(index)
+        return await self.ledger_read(
+            "schema", index, lambda: super(CachingVerifier, self).get_schema(index))
+
+    async def get_cred_def(self, cd_id: str):
+        if not self.ledger_read:
+            return await super(CachingVerifier, self).get_cred_def(cd_id)
+        return await self.ledger_read(
+            "cred_def", cd_id, lambda: super(CachingVerifier, self).get_cred_def(cd_id))
+
+
+
+class ProofVerifier:
+    """
+    The Verifier agent used to verify proofs returned by TheOrgBook. It has its own
+    concurrency limit, separate from the limits of the issuer agents, and repeated
+    verification of the same proof is served from a cache of recent results
+
+    Args:
+        name: the name of the verifier wallet
+        concurrency: the maximum number of concurrent verifications, or None for no limit
+        cache_size: the number of verification results retained
+        cache_ttl: the lifetime in seconds of each result, or None for no expiry
+    """
+
+    def __init__(self, name: str = "GenericVerifier", concurrency: int = None,
+                 cache_size: int = 500, cache_ttl: float = None):
+        self._agents = AgentLimit(concurrency)
+        self._lock = None
+        self._name = name
+        self._verified = TTLCache(cache_size, cache_ttl)
+        self._wrapper = None
+
+    @classmethod
+    def from_config(cls, name: str, config: Mapping) -> "ProofVerifier":
+        """
+        Create a verifier from the `verifier_concurrency`, `verify_cache_size` and
+        `verify_cache_ttl` settings of the ledger service
+        """
+        ttl = config.get("verify_cache_ttl")
+        return cls(
+            name,
+            config.get("verifier_concurrency"),
+            config.get("verify_cache_size", 500),
+            float(ttl) if ttl not in (None, "") else None)
+
+    async def open(self, genesis_path: str, pools: NodePoolRegistry = None,
+                   ledger_read: Callable[..., Awaitable] = None) -> AgentLimit:
+        """
+        Open the Verifier agent wallet, if not already opened
+
+        Args:
+            genesis_path: the path to the genesis transaction file
+            pools: the shared node pool connections
+            ledger_read: an optional function performing reads through the ledger read cache
+        """
+        if not self._lock:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._agents.ready:
+                if not self._wrapper:
+                    wallet_cfg = WalletConfig(
+                        name=self._name,
+                        seed="verifier-seed-000000000000000000",
+                        genesis_path=genesis_path,
+                    )
+                    self._wrapper = AgentWrapper(
+                        wallet_cfg, CachingVerifier, "Verifier", pools=pools)
+                await self._wrapper.open()
+                self._wrapper.instance.ledger_read = ledger_read
+                self._agents.open(self._wrapper.instance)
+        return self._agents
+
+    async def verify(self, proof_req: dict, proof: dict) -> tuple:
+        """
+        Verify a proof using the opened agent
+
+        Args:
+            proof_req: the proof request
+            proof: the proof to be verified
+
+        Returns:
+            a tuple of the verification result and the revealed attributes
+        """
+        async def verify():
+            async with self._agents.checkout() as verifier:
+                result = await verifier.verify_proof(proof_req, proof)
+            return (result, revealed_attrs(proof))
+
+        digest = payload_digest({"proof_req": proof_req, "proof": proof})
+        return await self._verified.load(digest, verify)
+
+    @property
+    def status(self) -> dict:
+        """
+        Get the current utilisation of the verifier agent
+        """
+        return self._agents.status
+
+    @property
+    def cache_stats(self) -> dict:
+        """
+        Get the statistics of the verification results cache
+        """
+        return self._verified.stats
@@ -19,6 +19,8 @@
 from aiohttp import web
 
 from ..services.manager import ServiceManager
+from ..services.util import to_bool
+from .admission import admission_middleware
 from .routes import get_routes
 
 
@@ -28,7 +30,11 @@ async def init_web(manager: ServiceManager):
     """
     base = manager.env.get('WEB_BASE_HREF', '/')
 
-    app = web.Application()
+    if to_bool(manager.env.get('WEB_BIND_EXECUTOR'), True):
+        # handle service requests directly on the web server's event loop
+        manager.bind_executor()
+
+    app = web.Application(middlewares=[admission_middleware])
     app['base_href'] = base
     app['manager'] = manager
     app.add_routes(get_routes(app))
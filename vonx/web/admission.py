@@ -0,0 +1,196 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import logging
+import math
+
+from aiohttp import web
+
+from ..services.util import to_bool
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    'concurrency': 32,
+    'queue': 64,
+    'wait': 5.0,
+    'retry_after': 1,
+}
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is refused by an :class:`AdmissionLimit`
+    """
+
+    def __init__(self, retry_after: int):
+        super(Overloaded, self).__init__('Server busy')
+        self.retry_after = retry_after
+
+
+class AdmissionLimit:
+    """
+    Limit the number of requests to a route which are processed at once. Up to
+    `queue` additional requests may wait up to `wait` seconds for a free slot,
+    and any further requests are refused immediately
+
+    Args:
+        name: the name of the route
+        concurrency: the maximum number of requests processed at once
+        queue: the maximum number of requests waiting for a slot
+        wait: the maximum time in seconds a request may wait for a slot
+        retry_after: the number of seconds clients are asked to wait before retrying
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, wait: float,
+                 retry_after: int = 1):
+        self.name = name
+        self.concurrency = max(int(concurrency), 1)
+        self.queue = max(int(queue), 0)
+        self.wait = max(float(wait), 0.0)
+        self.retry_after = max(int(math.ceil(float(retry_after))), 1)
+        self._active = 0
+        self._slots = None
+        self._stats = {
+            'admitted': 0,
+            'peak_waiting': 0,
+            'shed_queue_full': 0,
+            'shed_timeout': 0,
+        }
+        self._waiting = 0
+
+    async def acquire(self) -> None:
+        """
+        Wait for a free slot, raising :class:`Overloaded` if the request is refused
+        """
+        if not self._slots:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        if self._slots.locked():
+            if self._waiting >= self.queue or not self.wait:
+                self._stats['shed_queue_full'] += 1
+                raise Overloaded(self.retry_after)
+            self._waiting += 1
+            self._stats['peak_waiting'] = max(self._stats['peak_waiting'], self._waiting)
+            acquire = asyncio.ensure_future(self._slots.acquire())
+            try:
+                await asyncio.wait_for(acquire, self.wait)
+            except asyncio.TimeoutError:
+                # before Python 3.7 the slot may be acquired just as the wait times out
+                if acquire.done() and not acquire.cancelled():
+                    self._slots.release()
+                self._stats['shed_timeout'] += 1
+                raise Overloaded(self.retry_after) from None
+            finally:
+                self._waiting -= 1
+        else:
+            await self._slots.acquire()
+        self._active += 1
+        self._stats['admitted'] += 1
+
+    def release(self) -> None:
+        """
+        Release a slot after a request has been processed
+        """
+        self._active -= 1
+        self._slots.release()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Accessor for the current load and shed counts of the route
+        """
+        stats = self._stats.copy()
+        stats['active'] = self._active
+        stats['waiting'] = self._waiting
+        stats['shed'] = stats['shed_queue_full'] + stats['shed_timeout']
+        return stats
+
+
+class AdmissionControl:
+    """
+    Manage the admission limits for a set of application routes
+
+    Args:
+        env: the application environment settings
+    """
+
+    def __init__(self, env: dict = None):
+        env = env or {}
+        self.enabled = to_bool(env.get('ADMISSION_CONTROL'), True)
+        self.defaults = DEFAULT_LIMITS.copy()
+        for key in self.defaults:
+            value = env.get('ADMISSION_' + key.upper())
+            if value is not None and value != '':
+                self.defaults[key] = value
+        self.limits = {}
+
+    def add_route(self, name: str, config: dict = None) -> AdmissionLimit:
+        """
+        Define the admission limit for a named route
+
+        Args:
+            name: the name of the route
+            config: optional overrides of the default limits
+        """
+        params = self.defaults.copy()
+        if config:
+            params.update((key, val) for (key, val) in config.items() if key in params)
+        limit = AdmissionLimit(name, **params)
+        self.limits[name] = limit
+        return limit
+
+    def get_limit(self, request: web.Request) -> AdmissionLimit:
+        """
+        Find the admission limit applying to a request, if any. Only requests which
+        submit work to the services (not GET or HEAD requests) are limited
+        """
+        if not self.enabled or request.method in ('GET', 'HEAD'):
+            return None
+        route = request.match_info.route
+        return self.limits.get(route.name) if route else None
+
+    @property
+    def stats(self) -> dict:
+        """
+        Accessor for the statistics of each limited route
+        """
+        return {name: limit.stats for name, limit in self.limits.items()}
+
+
+@web.middleware
+async def admission_middleware(request: web.Request, handler):
+    """
+    Apply the application's admission limits before a request is handled, responding
+    with HTTP status 503 and a Retry-After header when a route is overloaded
+    """
+    control = request.app.get('admission')
+    limit = control and control.get_limit(request)
+    if not limit:
+        return await handler(request)
+    try:
+        await limit.acquire()
+    except Overloaded as e:
+        LOGGER.warning('Request shed by admission control: %s', limit.name)
+        return web.json_response(
+            {'success': False, 'result': str(e)},
+            status=503,
+            headers={'Retry-After': str(e.retry_after)})
+    try:
+        return await handler(request)
+    finally:
+        limit.release()
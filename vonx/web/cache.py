@@ -0,0 +1,346 @@
+#
+# Copyright 2017-2018 Government of Canada
+# Public Services and Procurement Canada - buyandsell.gc.ca
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+import logging
+import time
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+LOGGER = logging.getLogger(__name__)
+CONDITIONAL_HEADERS = {
+    'if-match',
+    'if-modified-since',
+    'if-none-match',
+    'if-range',
+    'if-unmodified-since',
+}
+
+
+def parse_cache_control(value: str) -> dict:
+    """
+    Parse a `Cache-Control` header into a dictionary of directives
+
+    Args:
+        value: the header value
+    Returns:
+        a dict of lowercase directive names and their values (or True)
+    """
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _sep, arg = part.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') if arg else True
+    return directives
+
+
+def freshness_lifetime(headers, default_ttl: float = 0) -> float:
+    """
+    Determine how long a response may be served from a shared cache without revalidation
+
+    Args:
+        headers: the upstream response headers
+        default_ttl: the lifetime used when no explicit expiry is given
+    Returns:
+        the lifetime in seconds, or None if the response must not be stored
+    """
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in directives or 'private' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return max(float(directives[name]), 0)
+            except ValueError:
+                return 0
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+            date = headers.get('Date')
+            now = parsedate_to_datetime(date).timestamp() if date else time.time()
+            return max(expires_at - now, 0)
+        except (TypeError, ValueError):
+            return 0
+    return default_ttl
+
+
+def vary_headers(headers) -> tuple:
+    """
+    Determine the request headers which select between variants of a response
+
+    Args:
+        headers: the upstream response headers
+    Returns:
+        a sorted tuple of lowercase header names, or None if the response varies
+        on every request (`Vary: *`)
+    """
+    names = set()
+    for value in headers.getall('Vary', ()):
+        for name in value.split(','):
+            name = name.strip().lower()
+            if name == '*':
+                return None
+            if name:
+                names.add(name)
+    return tuple(sorted(names))
+
+
+class CachedResponse:
+    """
+    A stored upstream response and its freshness information
+    """
+
+    def __init__(self, status: int, reason: str, headers: CIMultiDict, body: bytes,
+                 ttl: float):
+        self.status = status
+        self.reason = reason
+        self.headers = CIMultiDict(headers)
+        self.body = body
+        self.expires = None
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers.items())
+        self.refresh(ttl)
+
+    @property
+    def etag(self) -> str:
+        """
+        Accessor for the entity tag of the response, if any
+        """
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self) -> str:
+        """
+        Accessor for the last modified time of the response, if any
+        """
+        return self.headers.get('Last-Modified')
+
+    @property
+    def fresh(self) -> bool:
+        """
+        Whether the response may be served without revalidation
+        """
+        return time.monotonic() < self.expires
+
+    @property
+    def validators(self) -> dict:
+        """
+        Get the headers for a conditional request to revalidate this response
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def refresh(self, ttl: float, headers=None) -> None:
+        """
+        Extend the lifetime of the response after a successful revalidation
+
+        Args:
+            ttl: the new freshness lifetime
+            headers: updated headers from a `304 Not Modified` response
+        """
+        if headers:
+            for name in ('Cache-Control', 'Date', 'ETag', 'Expires', 'Last-Modified'):
+                if name in headers:
+                    self.headers[name] = headers[name]
+        self.expires = time.monotonic() + (ttl or 0)
+
+    def response(self, request: web.Request = None) -> web.Response:
+        """
+        Construct a client response from the cached data, answering conditional
+        requests from the client if possible
+        """
+        if request is not None and self.etag \
+                and request.headers.get('If-None-Match') == self.etag:
+            return web.Response(status=304, headers={'ETag': self.etag})
+        return web.Response(
+            status=self.status,
+            reason=self.reason,
+            headers=self.headers,
+            body=self.body)
+
+
+class ResponseCache:
+    """
+    An in-memory cache of upstream responses bounded by total size, with
+    least-recently-used eviction and single-flight coalescing of identical misses.
+    Responses are keyed by the request headers named in their `Vary` header, as
+    well as by the request URL
+
+    Args:
+        max_size: the maximum total size of the cached responses in bytes
+        max_entry_size: the maximum size of a single response to be cached
+        default_ttl: the lifetime of responses which do not define an expiry
+    """
+
+    def __init__(self, max_size: int = 16777216, max_entry_size: int = 1048576,
+                 default_ttl: float = 0):
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._vary = OrderedDict()
+        self._size = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'coalesced': 0,
+            'stored': 0,
+            'uncacheable': 0,
+            'evicted': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'ResponseCache':
+        """
+        Create a cache from a proxy `cache` definition
+
+        Args:
+            config: the cache settings, or None if caching is disabled
+        """
+        if config is None or config is False:
+            return None
+        if config is True:
+            config = {}
+        return cls(
+            int(config.get('max_size', 16777216)),
+            int(config.get('max_entry_size', 1048576)),
+            float(config.get('default_ttl', 0)))
+
+    @property
+    def stats(self) -> dict:
+        """
+        Accessor for the cache hit and miss statistics
+        """
+        stats = self._stats.copy()
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['entries'] = len(self._entries)
+        stats['size'] = self._size
+        stats['hit_rate'] = round(
+            (stats['hits'] + stats['revalidated']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def count(self, name: str) -> None:
+        """
+        Increment a statistics counter
+        """
+        self._stats[name] += 1
+
+    def get(self, key):
+        """
+        Look up a cached response, marking it as recently used
+
+        Returns:
+            the :class:`CachedResponse`, fresh or stale, or None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry: CachedResponse) -> bool:
+        """
+        Store a response, evicting the least recently used entries as needed
+
+        Returns:
+            True if the response was stored
+        """
+        self.remove(key)
+        if entry.size > self.max_entry_size or entry.size > self.max_size:
+            self.count('uncacheable')
+            return False
+        self._entries[key] = entry
+        self._size += entry.size
+        self.count('stored')
+        while self._size > self.max_size:
+            _key, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+            self.count('evicted')
+        return True
+
+    def remove(self, key) -> None:
+        """
+        Remove a response from the cache
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def vary_key(self, base_key: tuple, headers) -> tuple:
+        """
+        Extend a cache key with the request headers named by the last response
+        for the same resource
+
+        Args:
+            base_key: the key identifying the requested resource
+            headers: the request headers
+        """
+        names = self._vary.get(base_key, ())
+        return base_key + tuple(
+            (name, ','.join(headers.getall(name, ()))) for name in names)
+
+    def set_vary(self, base_key: tuple, names: tuple) -> bool:
+        """
+        Record the request headers named by the `Vary` header of a response
+
+        Returns:
+            True if the headers differ from those previously recorded
+        """
+        changed = self._vary.get(base_key, ()) != names
+        if names:
+            self._vary[base_key] = names
+            self._vary.move_to_end(base_key)
+            while len(self._vary) > max(len(self._entries), 1000):
+                self._vary.popitem(last=False)
+        else:
+            self._vary.pop(base_key, None)
+        return changed
+
+    def pending(self, key) -> asyncio.Future:
+        """
+        Get the in-flight upstream fetch for a key, if any
+        """
+        return self._pending.get(key)
+
+    def begin(self, key) -> asyncio.Future:
+        """
+        Register an in-flight upstream fetch, which concurrent requests may wait on
+        """
+        fut = asyncio.get_event_loop().create_future()
+        self._pending[key] = fut
+        return fut
+
+    def finish(self, key, fut: asyncio.Future, entry: CachedResponse = None) -> None:
+        """
+        Complete an in-flight fetch, passing the cached response (if any) to any waiters
+        """
+        if self._pending.get(key) is fut:
+            del self._pending[key]
+        if not fut.done():
+            fut.set_result(entry)
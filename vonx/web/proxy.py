@@ -15,11 +15,17 @@
 # limitations under the License.
 #
 
+import asyncio
 import logging
 from typing import Coroutine
 
+import aiohttp
 from aiohttp import web
 from aiohttp.helpers import BasicAuth
+from multidict import CIMultiDict
+
+from .cache import (
+    CONDITIONAL_HEADERS, CachedResponse, ResponseCache, freshness_lifetime, vary_headers)
 
 LOGGER = logging.getLogger(__name__)
 REMOVE_HEADERS = {
@@ -27,64 +33,326 @@ REMOVE_HEADERS = {
     'connection',
     'forwarded',
     'host',
+    'keep-alive',
     'proxy-connection',
+    'te',
+    'trailer',
+    'transfer-encoding',
+    'upgrade',
     'via',
     'x-forwarded-for',
     'x-forwarded-host',
     'x-forwarded-port',
     'x-forwarded-proto',
 }
+REMOVE_RESPONSE_HEADERS = {
+    'connection',
+    'keep-alive',
+    'proxy-authenticate',
+    'trailer',
+    'transfer-encoding',
+    'upgrade',
+}
+DEFAULT_LIMITS = {
+    'connections': 100,
+    'connections_per_host': 20,
+    'keepalive_timeout': 30,
+    'conn_timeout': 10,
+    'read_timeout': 60,
+    'max_body_size': None,
+}
 
 
-def proxy_handler(proxy_cfg: dict) -> Coroutine:
+class LimitedBody:
     """
-    A simple web proxy, not designed for large posts. This allows an Issuer service
-    to make requests via von-x without knowing the web address of TheOrgBook, for instance
+    A request body streamed upstream which is abandoned once it exceeds a size limit,
+    including chunked uploads whose length is not known in advance
 
-    Returns:
-        a coroutine to be used by aiohttp as a request handler
+    Args:
+        content: the client request stream
+        limit: the maximum body size in bytes
+    """
+
+    def __init__(self, content: aiohttp.StreamReader, limit: int):
+        self.content = content
+        self.limit = limit
+        self.exceeded = False
+        self.size = 0
+
+    async def stream(self):
+        """
+        Yield the body as it arrives, raising an error once the limit is passed
+        """
+        while True:
+            chunk = await self.content.readany()
+            if not chunk:
+                break
+            self.size += len(chunk)
+            if self.size > self.limit:
+                self.exceeded = True
+                raise ValueError('Request body exceeds limit of {} bytes'.format(self.limit))
+            yield chunk
+
+
+class ProxyHandler:
+    """
+    A streaming web proxy. This allows an Issuer service to make requests via von-x
+    without knowing the web address of TheOrgBook, for instance.
+
+    Request bodies are piped upstream as they arrive and responses are relayed
+    as data becomes available, so memory use is bounded by the stream buffers rather
+    than the size of the document. Upstream connections are pooled per proxy.
+
+    GET responses may optionally be cached according to the upstream `Cache-Control`
+    and `ETag` headers when a `cache` section is included in the proxy definition.
+
+    Args:
+        proxy_cfg: the proxy definition, including optional `limits` and `cache` settings
     """
 
-    async def handle_request(request):
-        path = request.match_info['path']
-        target_url = proxy_cfg['url']
+    def __init__(self, proxy_cfg: dict):
+        self._config = proxy_cfg
+        self._limits = DEFAULT_LIMITS.copy()
+        self._limits.update(proxy_cfg.get('limits') or {})
+        self._auth = None
+        if 'auth' in proxy_cfg and proxy_cfg['auth'].get('type') == 'basic':
+            self._auth = BasicAuth(proxy_cfg['auth']['user'], proxy_cfg['auth']['password'])
+        self._session = None
+        self.cache = ResponseCache.from_config(proxy_cfg.get('cache'))
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Accessor for the pooled HTTP session used for upstream requests
+        """
+        if not self._session or self._session.closed:
+            limits = self._limits
+            connector = aiohttp.TCPConnector(
+                keepalive_timeout=float(limits['keepalive_timeout']),
+                limit=int(limits['connections']),
+                limit_per_host=int(limits['connections_per_host']),
+            )
+            self._session = aiohttp.ClientSession(
+                auth=self._auth,
+                auto_decompress=False,
+                conn_timeout=float(limits['conn_timeout']),
+                connector=connector,
+                read_timeout=float(limits['read_timeout']),
+            )
+        return self._session
+
+    async def close(self, _app=None) -> None:
+        """
+        Close the upstream connection pool
+        """
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def target_url(self, path: str) -> str:
+        """
+        Construct the upstream URL for a request path
+        """
+        target_url = self._config['url']
         if not target_url.endswith('/'):
             target_url += '/'
-        target_url += path
+        return target_url + path
 
-        headers = {} # use multidict?
+    @staticmethod
+    def request_headers(request: web.Request) -> CIMultiDict:
+        """
+        Filter the headers to be forwarded upstream
+        """
+        headers = CIMultiDict()
         for header_name, header_value in request.headers.items():
             if header_name.lower() not in REMOVE_HEADERS:
-                headers[header_name] = header_value
-        auth = None
-        if 'auth' in proxy_cfg and proxy_cfg['auth'].get('type') == 'basic':
-            auth = BasicAuth(proxy_cfg['auth']['user'], proxy_cfg['auth']['password'])
+                headers.add(header_name, header_value)
         # TODO set Forwarded header?
+        return headers
+
+    @staticmethod
+    def response_headers(upstream: aiohttp.ClientResponse) -> CIMultiDict:
+        """
+        Filter the headers to be relayed to the client
+        """
+        headers = CIMultiDict()
+        for header_name, header_value in upstream.headers.items():
+            if header_name.lower() not in REMOVE_RESPONSE_HEADERS:
+                headers.add(header_name, header_value)
+        return headers
+
+    async def relay(self, request: web.Request, upstream: aiohttp.ClientResponse,
+                    prefix: bytes = None) -> web.StreamResponse:
+        """
+        Stream an upstream response back to the client
+
+        Args:
+            request: the client request
+            upstream: the upstream response
+            prefix: any part of the body which has already been consumed
+        """
+        response = web.StreamResponse(
+            status=upstream.status,
+            reason=upstream.reason,
+            headers=self.response_headers(upstream)
+        )
+        await response.prepare(request)
+        if prefix:
+            await response.write(prefix)
+        while True:
+            # read whatever is buffered, so the chunk size follows the upstream rate
+            chunk = await upstream.content.readany()
+            if not chunk:
+                break
+            # waits for the transport to drain before accepting more data
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        """
+        The aiohttp request handler
+        """
+        max_body = self._limits.get('max_body_size')
+        if max_body and request.content_length and request.content_length > int(max_body):
+            return web.Response(status=413, reason='Request Entity Too Large')
+
+        target_url = self.target_url(request.match_info['path'])
+        # credentialed requests may receive per-user responses, which are not shared
+        if self.cache and request.method == 'GET' \
+                and 'no-store' not in request.headers.get('Cache-Control', '') \
+                and 'Authorization' not in request.headers \
+                and 'Cookie' not in request.headers:
+            return await self.cached_get(request, target_url)
+        return await self.handle_uncached(request, target_url)
+
+    async def cached_get(self, request: web.Request, target_url: str) -> web.StreamResponse:
+        """
+        Serve a GET request from the response cache, revalidating stale entries and
+        sharing a single upstream fetch between identical concurrent misses
+        """
+        cache = self.cache
+        base_key = (target_url, tuple(sorted(request.query.items())),
+                    request.headers.get('Accept-Encoding', ''))
+        key = cache.vary_key(base_key, request.headers)
+        entry = cache.get(key)
+        if entry and entry.fresh:
+            cache.count('hits')
+            return entry.response(request)
+
+        pending = cache.pending(key)
+        if pending:
+            cache.count('coalesced')
+            shared = await asyncio.shield(pending)
+            if shared:
+                return shared.response(request)
+            # the shared response could not be cached, fetch it separately
+            return await self.handle_uncached(request, target_url)
+
+        fut = cache.begin(key)
+        result = None
+        try:
+            headers = CIMultiDict(
+                (name, value) for name, value in self.request_headers(request).items()
+                if name.lower() not in CONDITIONAL_HEADERS)
+            if entry:
+                headers.update(entry.validators)
+            try:
+                upstream = await self.session.get(
+                    target_url, headers=headers, params=request.query)
+            except aiohttp.ClientError:
+                LOGGER.exception('Error proxying request to %s', target_url)
+                return web.Response(status=502, reason='Bad Gateway')
+            try:
+                ttl = freshness_lifetime(upstream.headers, cache.default_ttl)
+                if upstream.status == 304 and entry:
+                    cache.count('revalidated')
+                    entry.refresh(ttl, upstream.headers)
+                    result = entry
+                    return entry.response(request)
+
+                cache.count('misses')
+                vary = vary_headers(upstream.headers)
+                cacheable = upstream.status == 200 and ttl is not None and (
+                    ttl > 0 or 'ETag' in upstream.headers or 'Last-Modified' in upstream.headers)
+                # never share session cookies or responses selected by every request
+                cacheable = cacheable and vary is not None \
+                    and 'Set-Cookie' not in upstream.headers
+                if not cacheable or (upstream.content_length or 0) > cache.max_entry_size:
+                    cache.remove(key)
+                    cache.count('uncacheable')
+                    return await self.relay(request, upstream)
 
-        mgr = request.app['manager']
-        async with mgr.executor.http as session:
-            data = await session.request(
+                body = await upstream.content.read(cache.max_entry_size + 1)
+                while len(body) <= cache.max_entry_size:
+                    chunk = await upstream.content.read(cache.max_entry_size + 1 - len(body))
+                    if not chunk:
+                        break
+                    body += chunk
+                if len(body) > cache.max_entry_size:
+                    cache.remove(key)
+                    cache.count('uncacheable')
+                    return await self.relay(request, upstream, body)
+
+                headers = self.response_headers(upstream)
+                headers.popall('Content-Length', None)
+                entry = CachedResponse(upstream.status, upstream.reason, headers, body, ttl)
+                if cache.set_vary(base_key, vary):
+                    # the waiting requests may select a different variant
+                    cache.remove(key)
+                    stored = cache.put(cache.vary_key(base_key, request.headers), entry)
+                else:
+                    stored = cache.put(key, entry)
+                    if stored:
+                        result = entry
+                return entry.response(request)
+            finally:
+                upstream.release()
+        finally:
+            cache.finish(key, fut, result)
+
+    async def handle_uncached(self, request: web.Request, target_url: str) \
+            -> web.StreamResponse:
+        """
+        Stream a request to the upstream server without consulting the cache.
+        If a maximum body size is configured, the upload is abandoned with HTTP 413
+        as soon as it passes the limit
+        """
+        #pylint: disable=broad-except
+        body = limited = None
+        if request.body_exists:
+            body = request.content
+            max_body = self._limits.get('max_body_size')
+            if max_body:
+                limited = LimitedBody(request.content, int(max_body))
+                body = limited.stream()
+        try:
+            upstream = await self.session.request(
                 request.method,
                 target_url,
-                auth=auth,
-                headers=headers,
+                headers=self.request_headers(request),
                 params=request.query,
-                data=await request.content.read())
+                data=body)
+        except Exception as e:
+            if limited and limited.exceeded:
+                return web.Response(status=413, reason='Request Entity Too Large')
+            if not isinstance(e, aiohttp.ClientError):
+                raise
+            LOGGER.exception('Error proxying request to %s', target_url)
+            return web.Response(status=502, reason='Bad Gateway')
+        try:
+            if limited and limited.exceeded:
+                return web.Response(status=413, reason='Request Entity Too Large')
+            return await self.relay(request, upstream)
+        finally:
+            upstream.release()
 
-            response = web.StreamResponse(
-                status=data.status,
-                reason=data.reason,
-                headers=data.headers
-            )
-            await response.prepare(request)
 
-            while True:
-                chunk = await data.content.read(4096)
-                if not chunk:
-                    break
-                await response.write(chunk)
-                #await response.drain()
-
-        return response
+def proxy_handler(proxy_cfg: dict) -> Coroutine:
+    """
+    Create a streaming web proxy handler for a proxy definition
 
-    return handle_request
+    Returns:
+        a coroutine to be used by aiohttp as a request handler
+    """
+    return ProxyHandler(proxy_cfg).handle
@@ -22,8 +22,9 @@ from aiohttp import web, ClientRequest
 
 from vonx.services.manager import ServiceManager
 from . import views
+from .admission import AdmissionControl
 from .process import process_form
-from .proxy import proxy_handler
+from .proxy import ProxyHandler
 from .render import render_form
 
 LOGGER = logging.getLogger(__name__)
@@ -48,7 +49,18 @@ def get_custom_routes(app: web.Application) -> list:
     """
     Get the list of routes defined by the application route settings
     """
-    return RouteDefinitions.load(app['manager']).routes
+    definitions = RouteDefinitions.load(app['manager'])
+    routes = definitions.routes
+    for handler in definitions.handlers:
+        if hasattr(handler, 'close'):
+            app.on_cleanup.append(handler.close)
+    app['proxies'] = {
+        proxy['id']: handler for (proxy, handler) in zip(definitions.proxies, definitions.handlers)}
+    admission = AdmissionControl(app['manager'].env)
+    for name, config in definitions.admission.items():
+        admission.add_route(name, config)
+    app['admission'] = admission
+    return routes
 
 
 def get_routes(app: web.Application) -> list:
@@ -63,7 +75,9 @@ class RouteDefinitions:
     Manager class for loading and inspecting the application routing configuration
     """
     def __init__(self):
+        self.admission = {}
         self.forms = []
+        self.handlers = []
         self.issuers = []
         self.paths = []
         self.proxies = []
@@ -235,6 +249,15 @@ class RouteDefinitions:
         Accessor for the combined list of routes defined by our configuration
         """
         routes = []
+        self.admission = {}
+        self.handlers = []
+
+        # routes which submit work to the services are subject to admission control
+        for form in self.forms:
+            self.admission[form['name']] = form.get('admission')
+        for issuer in self.issuers:
+            for suffix in ('-issue-credential', '-issue-credential-batch', '-construct-proof'):
+                self.admission[issuer['name'] + suffix] = issuer.get('admission')
 
         routes.extend(
             web.view(form['path'], form_handler(form), name=form['name'])
@@ -244,14 +267,25 @@ class RouteDefinitions:
             web.view(issuer['path'] + '/issue-credential', views.issue_credential,
                      name=issuer['name']+'-issue-credential')
             for issuer in self.issuers)
+        routes.extend(
+            web.get(issuer['path'] + '/issue-credential/jobs/{job_id}',
+                    views.issue_credential_job,
+                    name=issuer['name']+'-issue-credential-job')
+            for issuer in self.issuers)
+        routes.extend(
+            web.post(issuer['path'] + '/issue-credential-batch', views.issue_credential_batch,
+                     name=issuer['name']+'-issue-credential-batch')
+            for issuer in self.issuers)
         routes.extend(
             web.view(issuer['path'] + '/construct-proof', views.construct_proof,
                      name=issuer['name']+'-construct-proof')
             for issuer in self.issuers)
 
-        routes.extend(
-            web.view(proxy['path']+'/{path:.*}', proxy_handler(proxy), name=proxy['name'])
-            for proxy in self.proxies)
+        for proxy in self.proxies:
+            handler = ProxyHandler(proxy)
+            self.handlers.append(handler)
+            routes.append(
+                web.view(proxy['path']+'/{path:.*}', handler.handle, name=proxy['name']))
 
         routes.extend(
             web.static(
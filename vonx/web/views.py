@@ -16,15 +16,20 @@
 #
 #pylint: disable=broad-except
 
+import asyncio
 from concurrent.futures import Future
-import json
 import logging
+import time
 
 from aiohttp import web, ClientRequest, ClientResponse
 
 from vonx.services import issuer, prover
+from vonx.services.base import ServiceStatus, ServiceStatusReq
+from vonx.services.cache import TTLCache
+from vonx.services.indy import IndyLedgerStatus, IndyLedgerStatusReq
 from vonx.services.exchange import RequestTarget
 from vonx.services.manager import ServiceManager
+from vonx.services.util import to_bool, url_allowed
 
 LOGGER = logging.getLogger(__name__)
 
@@ -76,24 +81,69 @@ async def health(request: ClientRequest) -> ClientResponse:
 
 async def status(request: ClientRequest) -> ClientResponse:
     """
-    Respond with the current status of the application in JSON format
+    Respond with the current status of the application in JSON format, including
+    the status reported by each service and the event loop statistics of this process.
+    Services are queried concurrently, and a service which does not respond within
+    the STATUS_TIMEOUT setting is reported as timed out
     """
-    #result = get_manager(request).exchange.status()
-    result = await service_request(request, 'issuer', 'status')
+    mgr = get_manager(request)
+    timeout = float(mgr.env.get('STATUS_TIMEOUT') or 5)
+
+    async def service_status(name):
+        try:
+            reply = await asyncio.wait_for(
+                service_request(request, name, ServiceStatusReq()), timeout)
+        except asyncio.TimeoutError:
+            return {'error': 'timeout'}
+        if isinstance(reply, ServiceStatus):
+            return reply.status
+        return {'error': str(reply)}
+
+    names = mgr.service_names
+    replies = await asyncio.gather(*(service_status(name) for name in names))
+    result = dict(zip(names, replies))
+    web_status = {'pid': mgr.proc_locals['pid']}
+    loop_status = mgr.executor.loop_status
+    if loop_status:
+        web_status['loop'] = loop_status
+    proxy_caches = {
+        proxy_id: handler.cache.stats
+        for proxy_id, handler in request.app.get('proxies', {}).items() if handler.cache}
+    if proxy_caches:
+        web_status['proxy_cache'] = proxy_caches
+    admission = request.app.get('admission')
+    if admission and admission.limits:
+        web_status['admission'] = admission.stats
+    if len(web_status) > 1:
+        result['web'] = web_status
     return web.json_response(result)
 
 
 async def ledger_status(request: ClientRequest) -> ClientResponse:
     """
-    Respond with the status JSON retrieved from the Indy ledger (von-network)
+    Respond with the status JSON retrieved from the Indy ledger (von-network).
+    Each web worker keeps a local copy for as long as the ledger service considers
+    it current, and concurrent requests share a single request to the service
     """
-    #pylint: disable=broad-except
-    result = await service_request(request, 'ledger', 'ledger-status')
-    try:
-        jresult = json.loads(result)
-        return web.json_response(jresult)
-    except Exception:
-        return web.Response(text=result)
+    ploc = get_manager(request).proc_locals
+    if 'ledger_status' not in ploc:
+        ploc['ledger_status'] = TTLCache(1)
+    cache = ploc['ledger_status']
+
+    async def fetch():
+        reply = await service_request(request, 'ledger', IndyLedgerStatusReq())
+        if isinstance(reply, IndyLedgerStatus):
+            remain = reply.ttl - (time.time() - reply.fetched)
+            if remain > 0:
+                cache.put('status', reply, remain)
+        return reply
+
+    reply = await cache.load('status', fetch, store=lambda _reply: False)
+    if isinstance(reply, IndyLedgerStatus):
+        max_age = max(int(reply.ttl - (time.time() - reply.fetched)), 0)
+        return web.json_response(
+            reply.status, headers={'Cache-Control': 'max-age={}'.format(max_age)})
+    return web.json_response({'error': str(reply)}, status=503)
 
 
 async def hello(request: ClientRequest) -> ClientResponse:
@@ -139,7 +189,9 @@ async def construct_proof(request: ClientRequest) -> ClientResponse:
 async def issue_credential(request: ClientRequest) -> ClientResponse:
     """
     Ask the :class:`IssuerManager` service to issue a credential to the Holder
-    (TheOrgBook) and respond with the result
+    (TheOrgBook) and respond with the result. If the `async` query parameter is set,
+    or the request includes `Prefer: respond-async`, the credential is issued in the
+    background and a job ID is returned immediately with HTTP status 202
     """
     schema_name = request.query.get('schema')
     schema_version = request.query.get('version') or None
@@ -150,12 +202,18 @@ async def issue_credential(request: ClientRequest) -> ClientResponse:
         return web.Response(
             text='Request body must contain the schema attributes as a JSON object',
             status=400)
+    cred_request = issuer.IssueCredRequest(
+        schema_name, schema_version, params,
+        idempotency_key=request.headers.get('Idempotency-Key'))
+    if to_bool(request.query.get('async')) or \
+            'respond-async' in request.headers.get('Prefer', ''):
+        return await submit_issue_credential_job(request, cred_request)
     try:
-        result = await service_request(
-            request, 'issuer',
-            issuer.IssueCredRequest(schema_name, schema_version, params))
+        result = await service_request(request, 'issuer', cred_request)
         if isinstance(result, issuer.IssueCredResponse):
             ret = {'success': True, 'result': result.value}
+        elif isinstance(result, issuer.IdempotencyConflict):
+            return web.json_response({'success': False, 'result': result.value}, status=422)
         elif isinstance(result, issuer.IssuerError):
             ret = {'success': False, 'result': result.value}
         else:
@@ -164,3 +222,112 @@ async def issue_credential(request: ClientRequest) -> ClientResponse:
         LOGGER.exception('Error while issuing credential')
         ret = {'success': False, 'result': str(e)}
     return web.json_response(ret)
+
+
+async def submit_issue_credential_job(
+        request: ClientRequest, cred_request: issuer.IssueCredRequest) -> ClientResponse:
+    """
+    Submit a credential to be issued in the background and respond with the job ID
+    and the location of the job status. A callback URL must match the
+    ISSUER_CALLBACK_ALLOW setting
+    """
+    callback_url = request.query.get('callback') or None
+    if callback_url and not url_allowed(
+            callback_url, get_manager(request).env.get('ISSUER_CALLBACK_ALLOW')):
+        return web.Response(text="Parameter 'callback' is not a permitted URL", status=400)
+    try:
+        result = await service_request(
+            request, 'issuer', issuer.IssueCredJobRequest(cred_request, callback_url))
+    except Exception as e:
+        LOGGER.exception('Error while submitting credential issuance job')
+        return web.json_response({'success': False, 'result': str(e)}, status=500)
+    if isinstance(result, issuer.IssueCredJob):
+        location = '{}/jobs/{}'.format(request.path, result.job_id)
+        return web.json_response(
+            {'success': True, 'job_id': result.job_id, 'status_url': location},
+            status=202, headers={'Location': location})
+    if isinstance(result, issuer.IdempotencyConflict):
+        return web.json_response({'success': False, 'result': result.value}, status=422)
+    if isinstance(result, issuer.IssuerError):
+        return web.json_response({'success': False, 'result': result.value}, status=503)
+    return web.json_response(
+        {'success': False, 'result': 'Unexpected result from issuer: {}'.format(result)},
+        status=500)
+
+
+async def issue_credential_job(request: ClientRequest) -> ClientResponse:
+    """
+    Respond with the status of a background credential issuance job, including
+    the result once it has completed
+    """
+    job_id = request.match_info['job_id']
+    result = await service_request(request, 'issuer', issuer.IssueCredJobStatusRequest(job_id))
+    if isinstance(result, issuer.IssueCredJob):
+        return web.json_response(result.as_dict())
+    if isinstance(result, issuer.IssuerError):
+        return web.json_response({'success': False, 'result': result.value}, status=404)
+    return web.json_response(
+        {'success': False, 'result': 'Unexpected result from issuer: {}'.format(result)},
+        status=500)
+
+
+def validate_credential_item(item) -> str:
+    """
+    Check the shape of a single entry in a batch credential request
+
+    Returns:
+        an error message, or None if the entry is valid
+    """
+    if not isinstance(item, dict):
+        return 'Credential entry must be a JSON object'
+    if not item.get('schema') or not isinstance(item['schema'], str):
+        return "Credential entry must define a 'schema' name"
+    if item.get('version') is not None and not isinstance(item['version'], str):
+        return "Credential entry 'version' must be a string"
+    if not isinstance(item.get('attributes'), dict):
+        return "Credential entry must define 'attributes' as a JSON object"
+    return None
+
+
+async def issue_credential_batch(request: ClientRequest) -> ClientResponse:
+    """
+    Ask the :class:`IssuerManager` service to issue a batch of credentials to the Holder
+    (TheOrgBook) and respond with the result for each credential. The request body is
+    a JSON list of objects with `schema`, `version` (optional) and `attributes` properties.
+    An invalid entry is reported in its own result without affecting the others
+    """
+    params = await request.json()
+    if not isinstance(params, list):
+        return web.Response(
+            text='Request body must contain a JSON list of credential objects',
+            status=400)
+    results = [None] * len(params)
+    cred_requests = []
+    for idx, item in enumerate(params):
+        error = validate_credential_item(item)
+        if error:
+            results[idx] = {'success': False, 'status': 400, 'result': error}
+        else:
+            cred_requests.append((idx, issuer.IssueCredRequest(
+                item['schema'], item.get('version') or None, item['attributes'])))
+    if not cred_requests:
+        return web.json_response({'success': True, 'result': results})
+    try:
+        result = await service_request(
+            request, 'issuer',
+            issuer.IssueCredBatchRequest([cred_req for (_idx, cred_req) in cred_requests]))
+        if isinstance(result, issuer.IssueCredBatchResponse):
+            for (idx, _cred_req), item in zip(cred_requests, result.results):
+                if isinstance(item, issuer.IssueCredResponse):
+                    results[idx] = {'success': True, 'result': item.value}
+                else:
+                    results[idx] = {'success': False, 'result': item.value}
+            ret = {'success': True, 'result': results}
+        elif isinstance(result, issuer.IssuerError):
+            ret = {'success': False, 'result': result.value}
+        else:
+            raise ValueError('Unexpected result from issuer: {}'.format(result))
+    except Exception as e:
+        LOGGER.exception('Error while issuing credential batch')
+        ret = {'success': False, 'result': str(e)}
+    return web.json_response(ret)